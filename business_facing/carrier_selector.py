@@ -1,103 +1,102 @@
+from bisect import bisect_left
+from typing import Dict, Any
+
+import numpy as np
+
+from factor_registry import factor_registry
+
+# Distance bands as inclusive upper bounds (km); distances beyond the last
+# bound fall in the final, very-long-distance band
+DISTANCE_BANDS_KM = (50, 150, 300)
+
+# Per band: the carrier whose max range decides the band, then the match
+# (vehicle_type, reasoning, feasibility_score, eco_impact) when the distance
+# is within that range and when it is not
+CARRIER_RULES = (
+    ("ev",
+     ("ev", "EV optimal for short distance ({distance_km}km)", 0.95, "minimal"),
+     ("hybrid", "Hybrid best for medium distance ({distance_km}km)", 0.9, "low")),
+    ("ev",
+     ("ev", "EV suitable for medium distance ({distance_km}km)", 0.8, "minimal"),
+     ("hybrid", "Hybrid optimal for medium-long distance ({distance_km}km)", 0.85, "low")),
+    ("ev",
+     ("ev", "EV at range limit for long distance ({distance_km}km)", 0.6, "minimal"),
+     ("hybrid", "Hybrid for long distance ({distance_km}km)", 0.75, "medium")),
+    ("hybrid",
+     ("hybrid", "Hybrid for very long distance ({distance_km}km)", 0.7, "medium"),
+     ("diesel", "Diesel required for very long distance ({distance_km}km)", 0.9, "high")),
+)
+
+# Outcome code = 2 * band + (0 within range, 1 beyond it)
+_OUTCOMES = [outcome for _, within, beyond in CARRIER_RULES for outcome in (within, beyond)]
+OUTCOME_VEHICLES = np.array([o[0] for o in _OUTCOMES])
+OUTCOME_SCORES = np.array([o[2] for o in _OUTCOMES], dtype=np.float64)
+OUTCOME_ECO_IMPACT = np.array([o[3] for o in _OUTCOMES])
+_BAND_EDGES = np.array(DISTANCE_BANDS_KM, dtype=np.float64)
+
+# (factor revision, ranges as a list, ranges as an array)
+_band_ranges = (None, [], np.zeros(0))
+
+def _deciding_ranges():
+    """Max range (km) of each band's deciding carrier for the current factors."""
+    global _band_ranges
+    factors = factor_registry.current
+    if _band_ranges[0] != factors.revision:
+        ranges = [factors.carriers[carrier]["max_range_km"] for carrier, _, _ in CARRIER_RULES]
+        _band_ranges = (factors.revision, ranges, np.array(ranges, dtype=np.float64))
+    return _band_ranges[1], _band_ranges[2]
+
 def match_green_carrier(distance_km):
     """
     Match the most eco-friendly vehicle type based on delivery distance.
-    
+
     Args:
         distance_km: Distance in kilometers
-        
+
     Returns:
         dict: Contains vehicle_type, reasoning, and feasibility_score
     """
-    # Vehicle specifications and constraints
-    vehicles = {
-        "ev": {
-            "max_range_km": 300,  # Typical EV range
-            "emission_factor": 0,  # g/km
-            "eco_score": 10,  # Highest eco-friendliness
-            "availability": 0.7,  # 70% of routes have EV availability
-            "cost_factor": 1.2  # 20% more expensive than diesel
-        },
-        "hybrid": {
-            "max_range_km": 800,  # Hybrid range
-            "emission_factor": 90,  # g/km
-            "eco_score": 7,
-            "availability": 0.9,  # 90% availability
-            "cost_factor": 1.1  # 10% more expensive
-        },
-        "diesel": {
-            "max_range_km": 1200,  # Diesel range
-            "emission_factor": 192,  # g/km
-            "eco_score": 3,
-            "availability": 1.0,  # 100% availability
-            "cost_factor": 1.0  # Base cost
-        }
+    ranges, _ = _deciding_ranges()
+    band = bisect_left(DISTANCE_BANDS_KM, distance_km)
+    if distance_km != distance_km:
+        band = len(DISTANCE_BANDS_KM)  # NaN falls through every band check
+    vehicle_type, reasoning, feasibility_score, eco_impact = \
+        CARRIER_RULES[band][1 if distance_km <= ranges[band] else 2]
+    return {
+        "vehicle_type": vehicle_type,
+        "reasoning": reasoning.format(distance_km=distance_km),
+        "feasibility_score": feasibility_score,
+        "eco_impact": eco_impact
     }
-    
-    # Distance-based logic
-    if distance_km <= 50:
-        # Short distance: Prefer EV, fallback to hybrid
-        if distance_km <= vehicles["ev"]["max_range_km"]:
-            return {
-                "vehicle_type": "ev",
-                "reasoning": f"EV optimal for short distance ({distance_km}km)",
-                "feasibility_score": 0.95,
-                "eco_impact": "minimal"
-            }
-        else:
-            return {
-                "vehicle_type": "hybrid",
-                "reasoning": f"Hybrid best for medium distance ({distance_km}km)",
-                "feasibility_score": 0.9,
-                "eco_impact": "low"
-            }
-    
-    elif distance_km <= 150:
-        # Medium distance: Hybrid preferred, EV if available
-        if distance_km <= vehicles["ev"]["max_range_km"]:
-            return {
-                "vehicle_type": "ev",
-                "reasoning": f"EV suitable for medium distance ({distance_km}km)",
-                "feasibility_score": 0.8,
-                "eco_impact": "minimal"
-            }
-        else:
-            return {
-                "vehicle_type": "hybrid",
-                "reasoning": f"Hybrid optimal for medium-long distance ({distance_km}km)",
-                "feasibility_score": 0.85,
-                "eco_impact": "low"
-            }
-    
-    elif distance_km <= 300:
-        # Long distance: Hybrid or diesel based on availability
-        if distance_km <= vehicles["ev"]["max_range_km"]:
-            return {
-                "vehicle_type": "ev",
-                "reasoning": f"EV at range limit for long distance ({distance_km}km)",
-                "feasibility_score": 0.6,
-                "eco_impact": "minimal"
-            }
-        else:
-            return {
-                "vehicle_type": "hybrid",
-                "reasoning": f"Hybrid for long distance ({distance_km}km)",
-                "feasibility_score": 0.75,
-                "eco_impact": "medium"
-            }
-    
-    else:
-        # Very long distance: Diesel or hybrid
-        if distance_km <= vehicles["hybrid"]["max_range_km"]:
-            return {
-                "vehicle_type": "hybrid",
-                "reasoning": f"Hybrid for very long distance ({distance_km}km)",
-                "feasibility_score": 0.7,
-                "eco_impact": "medium"
-            }
-        else:
-            return {
-                "vehicle_type": "diesel",
-                "reasoning": f"Diesel required for very long distance ({distance_km}km)",
-                "feasibility_score": 0.9,
-                "eco_impact": "high"
-            } 
\ No newline at end of file
+
+def match_green_carrier_batch(distances_km, with_reasoning: bool = True) -> Dict[str, Any]:
+    """
+    Match carriers for an array of distances in one pass.
+    Results match match_green_carrier element by element.
+
+    Args:
+        distances_km: Distances in kilometers (any array shape)
+        with_reasoning: Also format the per-distance reasoning strings
+
+    Returns:
+        dict: vehicle_type, feasibility_score and eco_impact arrays, the
+        outcome codes, and reasoning (same shape) when requested
+    """
+    _, ranges = _deciding_ranges()
+    distances_km = np.asarray(distances_km)
+    # side="left" keeps the inclusive upper bounds; NaN sorts past every edge
+    band = np.searchsorted(_BAND_EDGES, distances_km, side="left")
+    codes = 2 * band + ~(distances_km <= ranges[band])
+    result = {
+        "vehicle_type": OUTCOME_VEHICLES[codes],
+        "feasibility_score": OUTCOME_SCORES[codes],
+        "eco_impact": OUTCOME_ECO_IMPACT[codes],
+        "codes": codes
+    }
+    if with_reasoning:
+        templates = [outcome[1] for outcome in _OUTCOMES]
+        result["reasoning"] = np.array(
+            [templates[code].format(distance_km=d) for code, d in zip(codes.ravel().tolist(), distances_km.ravel().tolist())],
+            dtype=object
+        ).reshape(distances_km.shape)
+    return result
@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from typing import Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Consecutive upstream failures (errors or over-budget calls) that open the breaker
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+# Seconds the breaker stays open before letting a probe request through
+BREAKER_RESET_TIMEOUT_S = float(os.getenv("BREAKER_RESET_TIMEOUT_S", "30"))
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    - requests flow; failures are counted
+    open      - requests are rejected until reset_timeout_s has passed
+    half_open - a single probe request is allowed; its outcome closes or
+                re-opens the breaker
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout_s: float = BREAKER_RESET_TIMEOUT_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            self._state = "half_open"
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a call may be made to the protected service.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Record a healthy call; closes a half-open breaker."""
+        with self._lock:
+            if self._state != "closed":
+                logger.info(f"Circuit breaker '{self.name}' closed")
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed or over-budget call; may open the breaker."""
+        with self._lock:
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == "half_open" or (state == "closed" and self._consecutive_failures >= self.failure_threshold):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self.times_opened += 1
+                logger.warning(f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} consecutive failures")
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot when the allowed call was never made."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self) -> None:
+        """Force the breaker closed and clear counters."""
+        with self._lock:
+            self._state = "closed"
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self.rejected = 0
+            self.times_opened = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return breaker state and counters for monitoring.
+        """
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout_s,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened
+            }
@@ -0,0 +1,18 @@
+"""
+Helpers shared by the test scripts.
+
+The scripts also run on their own (python test_x.py), so helpers are plain
+functions imported with `from conftest import ...` rather than fixtures.
+"""
+
+import os
+
+# Wall-clock assertions only run when benchmarks are asked for
+BENCHMARKS = os.getenv("ROUTEZERO_BENCHMARKS", "false").lower() in ("1", "true", "yes")
+
+def random_points(rng, prefix, count, lat, lon, spread):
+    """count items with ids prefix0.., scattered uniformly within spread degrees of (lat, lon)"""
+    return [
+        {"id": f"{prefix}{i}", "lat": lat + rng.uniform(-spread, spread), "lon": lon + rng.uniform(-spread, spread)}
+        for i in range(count)
+    ]
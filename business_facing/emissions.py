@@ -1,3 +1,71 @@
+import numpy as np
+
+from factor_registry import factor_registry
+
+EMISSION_LEVELS = np.array(["low", "medium", "high"])
+
+def round_decimals(values, decimals=2):
+    """
+    Round an array exactly like Python's round(value, decimals).
+    Args:
+        values: Float array
+        decimals: Number of decimal places
+    Returns:
+        np.ndarray: Rounded values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        return np.float64(round(float(values), decimals))
+    rounded = np.round(values, decimals)
+    # np.round scales by 10**decimals first, so it can disagree with the
+    # correctly rounded builtin only for values within float error of a tie
+    scaled = values * 10 ** decimals
+    distance_to_tie = np.abs(scaled - np.floor(scaled) - 0.5)
+    near_tie = distance_to_tie <= 1e-7 * np.maximum(1.0, np.abs(scaled))
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), decimals) for v in values[near_tie]]
+    return rounded
+
+def round_grams(values):
+    """
+    Round emissions to 2 decimals exactly like Python's round(value, 2).
+    """
+    return round_decimals(values, 2)
+
+def emissions_array(distances_km, vehicle_types, table):
+    """
+    Vectorized emissions for arrays of distances and vehicle types.
+    Args:
+        distances_km: Distances in kilometers (array-like)
+        vehicle_types: Vehicle type names or codes per distance, or a single vehicle type
+        table: Compiled factor table of the transport mode (factor_registry.ModeTable)
+    Returns:
+        tuple: (emissions_grams float array, level index array into EMISSION_LEVELS)
+    """
+    distances_km = np.asarray(distances_km, dtype=np.float64)
+    codes = np.broadcast_to(table.encode(vehicle_types), distances_km.shape)
+    emissions_grams = round_grams(distances_km * table.factors[codes])
+    level_index = np.searchsorted(table.thresholds, emissions_grams, side="left")
+    return emissions_grams, level_index
+
+def calculate_emissions_batch(distances_km, vehicle_types="car", mode="last_mile"):
+    """
+    Calculate CO2 emissions for many trips at once.
+    Results match calculate_emissions element by element.
+    Args:
+        distances_km: Distances in kilometers (array-like)
+        vehicle_types: Vehicle type (or factor table code) per distance, or one type for all
+        mode: "last_mile" or "freight"
+    Returns:
+        dict: emissions_grams (float array) and emission_level (string array)
+    """
+    table = factor_registry.current.mode(mode)
+    emissions_grams, level_index = emissions_array(distances_km, vehicle_types, table)
+    return {
+        "emissions_grams": emissions_grams,
+        "emission_level": EMISSION_LEVELS[level_index]
+    }
+
 def calculate_emissions(distance_km, vehicle_type="car", mode="last_mile"):
     """
     Calculate CO2 emissions for a given distance and vehicle type.
@@ -9,31 +77,8 @@ def calculate_emissions(distance_km, vehicle_type="car", mode="last_mile"):
     Returns:
         dict: Contains emissions_grams and emission_level
     """
-    if mode == "freight":
-        # Freight emission factors (g/km)
-        factor = {
-            "heavy_truck": 550,
-            "rail_freight": 20,
-            "ship_barge": 10
-        }
-        thresholds = {"low": 1000, "medium": 10000}
-    else:
-        # Last-mile emission factors (g/km)
-        factor = {
-            "car": 192,
-            "hybrid": 90,
-            "ev": 0
-        }
-        thresholds = {"low": 50, "medium": 150}
-    emissions_grams = round(distance_km * factor.get(vehicle_type, list(factor.values())[0]), 2)
-    # Determine emission level
-    if emissions_grams <= thresholds["low"]:
-        emission_level = "low"
-    elif emissions_grams <= thresholds["medium"]:
-        emission_level = "medium"
-    else:
-        emission_level = "high"
+    result = calculate_emissions_batch([distance_km], [vehicle_type], mode)
     return {
-        "emissions_grams": emissions_grams,
-        "emission_level": emission_level
+        "emissions_grams": float(result["emissions_grams"][0]),
+        "emission_level": str(result["emission_level"][0])
     }
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, Any, Optional, Tuple, List
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMISSION_FACTORS_PATH = os.getenv(
+    "EMISSION_FACTORS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "emission_factors.json")
+)
+# Seconds between checks of the config file's mtime (0 disables automatic reload)
+EMISSION_FACTORS_RELOAD_S = float(os.getenv("EMISSION_FACTORS_RELOAD_S", "30"))
+
+class ModeTable:
+    """
+    Emission factors and level thresholds for one transport mode, compiled
+    into arrays indexed by an integer vehicle code.
+    """
+
+    def __init__(self, name: str, factors: Dict[str, float], thresholds: Dict[str, float],
+                 default_vehicle: str, payload_capacity_kg: Optional[Dict[str, float]] = None,
+                 payload_coefficient: float = 0.0):
+        if not factors:
+            raise ValueError(f"Mode '{name}' has no emission factors")
+        if default_vehicle not in factors:
+            raise ValueError(f"Mode '{name}' default vehicle '{default_vehicle}' has no factor")
+        if not thresholds["low"] <= thresholds["medium"]:
+            raise ValueError(f"Mode '{name}' thresholds must satisfy low <= medium")
+        self.name = name
+        self.vehicles: Tuple[str, ...] = tuple(factors)
+        self.vehicle_index = {vehicle: i for i, vehicle in enumerate(self.vehicles)}
+        self.default_vehicle = default_vehicle
+        self.default_index = self.vehicle_index[default_vehicle]
+        self.factors = np.array([float(factors[v]) for v in self.vehicles], dtype=np.float64)
+        self.thresholds = np.array([float(thresholds["low"]), float(thresholds["medium"])], dtype=np.float64)
+        # Capacity 0 disables the payload adjustment for that vehicle
+        self.payload_capacity_kg = np.array(
+            [float((payload_capacity_kg or {}).get(v, 0)) for v in self.vehicles], dtype=np.float64
+        )
+        self.payload_coefficient = float(payload_coefficient)
+        # Tables are shared by every request using this version; keep them immutable
+        for table in (self.factors, self.thresholds, self.payload_capacity_kg):
+            table.setflags(write=False)
+
+    def index_of(self, vehicle: str) -> int:
+        """Vehicle code, falling back to the default vehicle for unknown types."""
+        return self.vehicle_index.get(vehicle, self.default_index)
+
+    def factor(self, vehicle: str) -> float:
+        """Emission factor (g/km) for a vehicle type."""
+        return float(self.factors[self.index_of(vehicle)])
+
+    def encode(self, vehicle_types) -> np.ndarray:
+        """
+        Map vehicle type names (or already-encoded integer codes) to vehicle codes.
+
+        Raises:
+            ValueError: If an integer code is out of range
+        """
+        vehicle_types = np.asarray(vehicle_types)
+        if np.issubdtype(vehicle_types.dtype, np.integer):
+            if vehicle_types.size and (vehicle_types.min() < 0 or vehicle_types.max() >= len(self.vehicles)):
+                raise ValueError(f"Vehicle codes for mode '{self.name}' must be in [0, {len(self.vehicles)})")
+            return vehicle_types.astype(np.intp, copy=False)
+        codes = np.full(vehicle_types.shape, self.default_index, dtype=np.intp)
+        # One vectorized comparison per known vehicle type
+        for i, vehicle in enumerate(self.vehicles):
+            codes[vehicle_types == vehicle] = i
+        return codes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "default_vehicle": self.default_vehicle,
+            "factors_g_per_km": dict(zip(self.vehicles, self.factors.tolist())),
+            "thresholds_g": {"low": float(self.thresholds[0]), "medium": float(self.thresholds[1])},
+            "payload_capacity_kg": dict(zip(self.vehicles, self.payload_capacity_kg.tolist())),
+            "payload_coefficient": self.payload_coefficient
+        }
+
+class SegmentModel:
+    """
+    Per-segment emission adjustments for road gradient and speed class.
+    """
+
+    def __init__(self, gradient_per_percent: float, max_grade_percent: float,
+                 min_gradient_multiplier: float, speed_bands_kmh: List[float],
+                 speed_multipliers: List[float]):
+        if len(speed_multipliers) != len(speed_bands_kmh) + 1:
+            raise ValueError("speed_multipliers must have one more entry than speed_bands_kmh")
+        if list(speed_bands_kmh) != sorted(speed_bands_kmh):
+            raise ValueError("speed_bands_kmh must be ascending")
+        self.gradient_per_percent = float(gradient_per_percent)
+        self.max_grade_percent = float(max_grade_percent)
+        self.min_gradient_multiplier = float(min_gradient_multiplier)
+        self.speed_bands_kmh = np.array(speed_bands_kmh, dtype=np.float64)
+        self.speed_multipliers = np.array(speed_multipliers, dtype=np.float64)
+        self.speed_bands_kmh.setflags(write=False)
+        self.speed_multipliers.setflags(write=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "gradient_per_percent": self.gradient_per_percent,
+            "max_grade_percent": self.max_grade_percent,
+            "min_gradient_multiplier": self.min_gradient_multiplier,
+            "speed_bands_kmh": self.speed_bands_kmh.tolist(),
+            "speed_multipliers": self.speed_multipliers.tolist()
+        }
+
+class FactorSet:
+    """
+    One immutable, versioned compilation of the emission factor config.
+    """
+
+    def __init__(self, version: str, modes: Dict[str, ModeTable], segment_model: SegmentModel,
+                 carriers: Dict[str, Dict[str, Any]], revision: int = 0, source: Optional[str] = None):
+        self.version = version
+        self.modes = modes
+        self.segment_model = segment_model
+        self.carriers = carriers
+        self.revision = revision
+        self.source = source
+        self.loaded_at = time.time()
+
+    def mode(self, name: str) -> ModeTable:
+        """Table for a transport mode; anything other than "freight" is last-mile."""
+        return self.modes["freight" if name == "freight" else "last_mile"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "revision": self.revision,
+            "loaded_at": self.loaded_at,
+            "modes": {name: table.to_dict() for name, table in self.modes.items()},
+            "segment_model": self.segment_model.to_dict(),
+            "carriers": self.carriers
+        }
+
+def compile_factors(config: Dict[str, Any], revision: int = 0, source: Optional[str] = None) -> FactorSet:
+    """
+    Validate a factor config and compile it into lookup tables.
+
+    Raises:
+        ValueError: If the config is malformed
+    """
+    try:
+        modes = {
+            name: ModeTable(name, spec["factors_g_per_km"], spec["thresholds_g"], spec["default_vehicle"],
+                            spec.get("payload_capacity_kg"), spec.get("payload_coefficient", 0.0))
+            for name, spec in config["modes"].items()
+        }
+        segment_model = SegmentModel(**config["segment_model"])
+        for required in ("last_mile", "freight"):
+            if required not in modes:
+                raise ValueError(f"Missing required mode '{required}'")
+        last_mile = modes["last_mile"]
+        carriers = {}
+        for name, spec in config["carriers"].items():
+            emission_vehicle = spec["emission_vehicle"]
+            if emission_vehicle not in last_mile.vehicle_index:
+                raise ValueError(f"Carrier '{name}' references unknown vehicle '{emission_vehicle}'")
+            carriers[name] = {
+                **spec,
+                "max_range_km": float(spec["max_range_km"]),
+                "emission_factor": last_mile.factor(emission_vehicle)
+            }
+        return FactorSet(str(config["version"]), modes, segment_model, carriers, revision, source)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid emission factor config: missing or malformed {e}")
+
+class FactorRegistry:
+    """
+    Process-wide holder of the current FactorSet.
+
+    Reloads compile a complete new FactorSet and swap it in with a single
+    reference assignment, so a caller that reads `current` once sees one
+    consistent version. A config that fails to load never replaces the
+    version in use.
+    """
+
+    def __init__(self, path: str = EMISSION_FACTORS_PATH, reload_interval_s: float = EMISSION_FACTORS_RELOAD_S):
+        self.path = path
+        self.reload_interval_s = reload_interval_s
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.reload_errors = 0
+        self._factors = self.reload()
+
+    @property
+    def current(self) -> FactorSet:
+        if self.reload_interval_s > 0 and time.monotonic() >= self._next_check:
+            self._reload_if_changed()
+        return self._factors
+
+    def _reload_if_changed(self) -> None:
+        self._next_check = time.monotonic() + self.reload_interval_s
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Cannot stat emission factor config {self.path}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            # Remember the broken file so it is not re-parsed on every check
+            self._mtime = mtime
+            logger.error(f"Keeping emission factors {self._factors.version}: {e}")
+
+    def reload(self) -> FactorSet:
+        """
+        Load and compile the config file and make it current.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the config is invalid
+        """
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path) as f:
+                    config = json.load(f)
+                previous = getattr(self, "_factors", None)
+                factors = compile_factors(config, previous.revision + 1 if previous else 1, self.path)
+            except OSError as e:
+                self.reload_errors += 1
+                raise OSError(f"Failed to read emission factors from {self.path}: {e}")
+            except ValueError as e:
+                self.reload_errors += 1
+                raise ValueError(f"Failed to load emission factors from {self.path}: {e}")
+            self._mtime = mtime
+            self._factors = factors
+        logger.info(f"Loaded emission factors version {factors.version} (revision {factors.revision})")
+        return factors
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the active version for monitoring.
+        """
+        factors = self._factors
+        return {
+            "path": self.path,
+            "version": factors.version,
+            "revision": factors.revision,
+            "loaded_at": factors.loaded_at,
+            "reload_errors": self.reload_errors
+        }
+
+factor_registry = FactorRegistry()
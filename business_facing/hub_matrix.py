@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Precomputed hub-to-hub distance/duration matrix.
+
+Build the matrix file (run from the backend directory):
+
+    python hub_matrix.py build                 # haversine estimate, no API calls
+    python hub_matrix.py build --source ors    # road distances via ORS matrix
+
+The API loads the file at startup and answers inter-hub lookups in O(1).
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+import argparse
+from typing import List, Dict, Any, Optional
+import logging
+
+import numpy as np
+
+from fleet_emissions import FREIGHT_AVG_SPEEDS_KMH, haversine_km_array
+from emissions import round_grams
+from factor_registry import factor_registry
+
+logger = logging.getLogger(__name__)
+
+HUBS_PATH = os.getenv("HUBS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pickup_hubs.json"))
+HUB_MATRIX_PATH = os.getenv("HUB_MATRIX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "hub_matrix.bin"))
+
+# File layout: magic, version, hub count, header length, JSON header,
+# then float32 distances_km[n][n] and durations_min[n][n] (little endian)
+MAGIC = b"RZHM"
+VERSION = 1
+_PREAMBLE = struct.Struct("<4sIII")
+
+def load_hubs(path: str = HUBS_PATH) -> List[Dict[str, Any]]:
+    """
+    Load hub definitions (name, type, region, [lng, lat] coordinates).
+    """
+    with open(path) as f:
+        return json.load(f)
+
+class HubMatrix:
+    """
+    Dense hub-to-hub matrix of road distance (km) and duration (min).
+
+    Per-mode freight emissions are derived from distance on lookup, so the
+    matrix stores two float32 values per hub pair.
+    """
+
+    def __init__(self, hubs: List[Dict[str, Any]], distances_km: np.ndarray,
+                 durations_min: np.ndarray, metadata: Optional[Dict[str, Any]] = None):
+        n = len(hubs)
+        if distances_km.shape != (n, n) or durations_min.shape != (n, n):
+            raise ValueError(f"Matrix shape does not match {n} hubs")
+        self.hubs = hubs
+        self.distances_km = distances_km
+        self.durations_min = durations_min
+        self.metadata = metadata or {}
+        self._index = {hub["name"]: i for i, hub in enumerate(hubs)}
+
+    def __len__(self) -> int:
+        return len(self.hubs)
+
+    def hub_index(self, hub: str) -> int:
+        """
+        Resolve a hub name or numeric index.
+
+        Raises:
+            KeyError: If the hub is unknown
+        """
+        if hub in self._index:
+            return self._index[hub]
+        if hub.isdigit() and int(hub) < len(self.hubs):
+            return int(hub)
+        raise KeyError(f"Unknown hub: {hub}")
+
+    def lookup(self, source: str, destination: str) -> Dict[str, Any]:
+        """
+        Distance, duration and per-mode freight emissions between two hubs.
+
+        Raises:
+            KeyError: If either hub is unknown
+        """
+        i, j = self.hub_index(source), self.hub_index(destination)
+        distance_km = float(self.distances_km[i, j])
+        if np.isnan(distance_km):
+            raise KeyError(f"No route between {self.hubs[i]['name']} and {self.hubs[j]['name']}")
+        freight = factor_registry.current.mode("freight")
+        emissions_by_mode = dict(zip(freight.vehicles, round_grams(distance_km * freight.factors).tolist()))
+        return {
+            "source": self.hubs[i]["name"],
+            "destination": self.hubs[j]["name"],
+            "distance_km": round(distance_km, 2),
+            "duration_min": round(float(self.durations_min[i, j]), 1),
+            "emissions_by_mode": emissions_by_mode,
+            "recommended_mode": min(emissions_by_mode, key=emissions_by_mode.get),
+            "matrix_source": self.metadata.get("source")
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Write the matrix in the compact binary format.
+        """
+        header = json.dumps({"hubs": self.hubs, "metadata": self.metadata}).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(self.hubs), len(header)))
+            f.write(header)
+            f.write(np.ascontiguousarray(self.distances_km, dtype="<f4").tobytes())
+            f.write(np.ascontiguousarray(self.durations_min, dtype="<f4").tobytes())
+        # Atomic replace so running workers never read a partial file
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HubMatrix":
+        """
+        Memory-map a matrix file; pages are read lazily on lookup.
+
+        Raises:
+            ValueError: If the file is not a hub matrix of a supported version
+        """
+        with open(path, "rb") as f:
+            magic, version, n, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} hub matrix file")
+            header = json.loads(f.read(header_len))
+        offset = _PREAMBLE.size + header_len
+        data = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(2, n, n))
+        return cls(header["hubs"], data[0], data[1], header.get("metadata"))
+
+def estimate_hub_matrix(hubs: List[Dict[str, Any]], circuity: Optional[float] = None) -> HubMatrix:
+    """
+    Build the matrix from haversine distance x road circuity at truck speed.
+    """
+    if circuity is None:
+        from route_handler import ROUTE_ESTIMATE_CIRCUITY
+        circuity = ROUTE_ESTIMATE_CIRCUITY
+    coords = np.array([hub["coordinates"] for hub in hubs], dtype=np.float64).reshape(-1, 2)
+    lngs, lats = coords[:, 0], coords[:, 1]
+    distances_km = haversine_km_array(lngs[:, None], lats[:, None], lngs[None, :], lats[None, :]) * circuity
+    durations_min = distances_km / FREIGHT_AVG_SPEEDS_KMH["heavy_truck"] * 60
+    metadata = {"source": "estimate", "circuity": circuity, "created_at": time.time()}
+    return HubMatrix(hubs, distances_km.astype(np.float32), durations_min.astype(np.float32), metadata)
+
+async def fetch_hub_matrix_ors(hubs: List[Dict[str, Any]]) -> HubMatrix:
+    """
+    Build the matrix from ORS matrix calls over square blocks of hubs.
+
+    Raises:
+        RuntimeError: If the routing service is unavailable or fails
+    """
+    from route_handler import get_matrix_block_async, ORS_MATRIX_MAX_CELLS, close_async_client
+    n = len(hubs)
+    coords = [list(hub["coordinates"]) for hub in hubs]
+    block = max(1, int(ORS_MATRIX_MAX_CELLS ** 0.5))
+    distances_km = np.full((n, n), np.nan, dtype=np.float32)
+    durations_min = np.full((n, n), np.nan, dtype=np.float32)
+    try:
+        for i in range(0, n, block):
+            for j in range(0, n, block):
+                distances, durations = await get_matrix_block_async(coords[i:i + block], coords[j:j + block])
+                # Unroutable cells (None) stay NaN
+                distances_km[i:i + block, j:j + block] = np.array(distances, dtype=np.float64) / 1000
+                durations_min[i:i + block, j:j + block] = np.array(durations, dtype=np.float64) / 60
+                logger.info(f"Fetched hub matrix block ({i}, {j})")
+    finally:
+        await close_async_client()
+    return HubMatrix(hubs, distances_km, durations_min, {"source": "ors", "created_at": time.time()})
+
+def load_hub_matrix(path: str = HUB_MATRIX_PATH, hubs_path: str = HUBS_PATH) -> Optional[HubMatrix]:
+    """
+    Load the precomputed matrix, or estimate one from the hub list if missing.
+    """
+    if os.path.exists(path):
+        try:
+            matrix = HubMatrix.load(path)
+            logger.info(f"Loaded hub matrix with {len(matrix)} hubs from {path}")
+            return matrix
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load hub matrix from {path}: {e}")
+    try:
+        hubs = load_hubs(hubs_path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load hubs from {hubs_path}: {e}")
+        return None
+    logger.warning(f"No hub matrix at {path}; estimating one for {len(hubs)} hubs")
+    return estimate_hub_matrix(hubs)
+
+_hub_matrix: Optional[HubMatrix] = None
+
+def get_hub_matrix() -> Optional[HubMatrix]:
+    """
+    Return the process-wide hub matrix, loading it on first use.
+    """
+    global _hub_matrix
+    if _hub_matrix is None:
+        _hub_matrix = load_hub_matrix()
+    return _hub_matrix
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute the hub-to-hub matrix")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build the matrix file")
+    build.add_argument("--source", choices=["estimate", "ors"], default="estimate")
+    build.add_argument("--hubs", default=HUBS_PATH)
+    build.add_argument("--out", default=HUB_MATRIX_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    hubs = load_hubs(args.hubs)
+    if args.source == "ors":
+        matrix = asyncio.run(fetch_hub_matrix_ors(hubs))
+    else:
+        matrix = estimate_hub_matrix(hubs)
+    matrix.save(args.out)
+    print(f"Wrote {len(matrix)}x{len(matrix)} hub matrix to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
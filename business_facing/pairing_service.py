@@ -0,0 +1,282 @@
+"""
+Live reverse-logistics pairing kept up to date from delivery/return events.
+
+/reverse-logistics pairs a whole batch from scratch. The order system
+instead streams deliveries and returns all day, so PairingService keeps
+every open item in a spatial grid and repairs only the pairs an event
+touches:
+
+- a new item pairs with the nearest free counterpart within 3 km; if there
+  is none, it takes a paired neighbour whose partner can move to another
+  free item (a short augmenting path, looking at no more than
+  PAIRING_AUGMENT_MAX_VISITS neighbours)
+- a removed item frees its partner, which is placed the same way
+- an update is a removal followed by an add at the new location
+
+The pairing stays maximal (no free delivery is within 3 km of a free
+return), and each event only looks at the grid cells around the items it
+moves. Free items also sit in grids of their own, so searches for a free
+counterpart skip paired items, and an area with no free counterpart left
+is recognized without visiting its pairs.
+"""
+
+import os
+import math
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+from reverse_logistics import PAIRING_RADIUS_KM, build_paired_route
+from spatial_index import SpatialGrid, EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Paired neighbours an augmenting-path search may visit per placement
+PAIRING_AUGMENT_MAX_VISITS = int(os.getenv("PAIRING_AUGMENT_MAX_VISITS", "64"))
+
+KINDS = ("delivery", "return")
+EVENT_OPS = ("add", "update", "remove")
+DELIVERY, RETURN = 0, 1
+
+class PairingService:
+    """
+    Deliveries and returns with their current pairing, updated per event.
+    """
+
+    def __init__(self, radius_km: float = PAIRING_RADIUS_KM):
+        self.radius_km = radius_km
+        # Haversine term of the radius: closer points have a smaller one
+        self._max_hav = math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Per kind: id -> (item, insertion sequence, lat and lon in radians, cos(lat))
+        self._items: Tuple[Dict[str, tuple], ...] = ({}, {})
+        self._grids = (SpatialGrid(self.radius_km), SpatialGrid(self.radius_km))
+        # Per kind, unpaired items only: within one radius, and within the
+        # three radii an augmenting path can reach
+        self._free = (SpatialGrid(self.radius_km), SpatialGrid(self.radius_km))
+        self._free_reach = (SpatialGrid(3 * self.radius_km), SpatialGrid(3 * self.radius_km))
+        # Per kind: id -> (partner id, distance_km)
+        self._partner: Tuple[Dict[str, Tuple[str, float]], ...] = ({}, {})
+        self._seq = 0
+        self._formed: List[Tuple[str, str]] = []
+        self._broken: List[Tuple[str, str]] = []
+        self.events = 0
+        self.pairs_formed = 0
+        self.pairs_broken = 0
+        self.candidates_checked = 0
+
+    def _set_free(self, kind: int, item_id: str, free: bool) -> None:
+        for grid in (self._free[kind], self._free_reach[kind]):
+            if free:
+                item = self._items[kind][item_id][0]
+                grid.insert(item_id, item["lat"], item["lon"])
+            else:
+                grid.remove(item_id)
+
+    def _within(self, a: tuple, b: tuple) -> Optional[float]:
+        """Distance in km between two stored items, or None beyond the radius."""
+        hav = math.sin((b[2] - a[2]) / 2) ** 2 + a[4] * b[4] * math.sin((b[3] - a[3]) / 2) ** 2
+        if hav > self._max_hav:
+            return None
+        return 2 * math.asin(math.sqrt(hav)) * EARTH_RADIUS_KM
+
+    def _pair(self, kind: int, item_id: str, other_id: str, distance: float) -> None:
+        self._partner[kind][item_id] = (other_id, distance)
+        self._partner[1 - kind][other_id] = (item_id, distance)
+        self._set_free(kind, item_id, False)
+        self._set_free(1 - kind, other_id, False)
+        self._formed.append((item_id, other_id) if kind == DELIVERY else (other_id, item_id))
+
+    def _unpair(self, kind: int, item_id: str) -> str:
+        other_id, _ = self._partner[kind].pop(item_id)
+        del self._partner[1 - kind][other_id]
+        self._set_free(kind, item_id, True)
+        self._set_free(1 - kind, other_id, True)
+        self._broken.append((item_id, other_id) if kind == DELIVERY else (other_id, item_id))
+        return other_id
+
+    def _nearest_free(self, kind: int, entry: tuple) -> Optional[Tuple[str, float]]:
+        """Closest unpaired item of the other kind within the radius (earliest added on ties)."""
+        other = 1 - kind
+        best, best_key = None, None
+        for other_id in self._free[other].near(entry[0]["lat"], entry[0]["lon"]):
+            self.candidates_checked += 1
+            candidate = self._items[other][other_id]
+            distance = self._within(entry, candidate)
+            if distance is not None and (best_key is None or (distance, candidate[1]) < best_key):
+                best, best_key = (other_id, distance), (distance, candidate[1])
+        return best
+
+    def _place(self, kind: int, item_id: str) -> None:
+        """Pair a free item, moving at most one existing pair to make room."""
+        entry = self._items[kind][item_id]
+        nearest = self._nearest_free(kind, entry)
+        if nearest is not None:
+            self._pair(kind, item_id, *nearest)
+            return
+
+        # Augmenting path: take a paired neighbour whose partner can re-pair.
+        # The partner's new counterpart lies within three radii of this item,
+        # so a saturated area needs no search at all
+        other = 1 - kind
+        lat, lon = entry[0]["lat"], entry[0]["lon"]
+        if next(iter(self._free_reach[other].near(lat, lon)), None) is None:
+            return
+        best, best_key = None, None
+        visits = 0
+        for other_id in self._grids[other].near(lat, lon):
+            visits += 1
+            if visits > PAIRING_AUGMENT_MAX_VISITS:
+                break
+            self.candidates_checked += 1
+            if other_id not in self._partner[other]:
+                continue
+            candidate = self._items[other][other_id]
+            distance = self._within(entry, candidate)
+            if distance is None:
+                continue
+            partner_id, partner_distance = self._partner[other][other_id]
+            alternative = self._nearest_free(kind, self._items[kind][partner_id])
+            if alternative is None:
+                continue
+            added = distance + alternative[1] - partner_distance
+            if best_key is None or (added, candidate[1]) < best_key:
+                best, best_key = (other_id, distance, partner_id, alternative), (added, candidate[1])
+        if best is not None:
+            other_id, distance, partner_id, (free_id, free_distance) = best
+            self._unpair(kind, partner_id)
+            self._pair(kind, partner_id, free_id, free_distance)
+            self._pair(kind, item_id, other_id, distance)
+
+    def _remove(self, kind: int, item_id: str) -> bool:
+        if item_id not in self._items[kind]:
+            return False
+        other_id = self._unpair(kind, item_id) if item_id in self._partner[kind] else None
+        self._grids[kind].remove(item_id)
+        self._set_free(kind, item_id, False)
+        del self._items[kind][item_id]
+        if other_id is not None:
+            self._place(1 - kind, other_id)
+        return True
+
+    def _add(self, kind: int, item: Dict[str, Any]) -> None:
+        item_id = item["id"]
+        self._remove(kind, item_id)
+        self._seq += 1
+        lat, lon = math.radians(item["lat"]), math.radians(item["lon"])
+        self._items[kind][item_id] = (item, self._seq, lat, lon, math.cos(lat))
+        self._grids[kind].insert(item_id, item["lat"], item["lon"])
+        self._set_free(kind, item_id, True)
+        self._place(kind, item_id)
+
+    @staticmethod
+    def _validate(event: Dict[str, Any]) -> None:
+        if event.get("op") not in EVENT_OPS:
+            raise ValueError(f"Unknown event op '{event.get('op')}'. Use one of: {', '.join(EVENT_OPS)}")
+        if event.get("kind") not in KINDS:
+            raise ValueError(f"Unknown item kind '{event.get('kind')}'. Use one of: {', '.join(KINDS)}")
+        if not event.get("id"):
+            raise ValueError("Each event must have an 'id'")
+        if event["op"] != "remove":
+            lat, lon = event.get("lat"), event.get("lon")
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) for v in (lat, lon)) \
+                    or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"Event for {event['kind']} '{event['id']}' needs a valid 'lat' and 'lon'")
+
+    def apply(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply delivery/return events in order.
+
+        Args:
+            events: {"op": "add" | "update" | "remove", "kind": "delivery" |
+                    "return", "id", "lat", "lon"}; add and update both
+                    upsert, removing an unknown id is ignored
+
+        Returns:
+            dict: Applied and ignored counts, pairs formed and broken by these
+            events, and the current totals
+
+        Raises:
+            ValueError: If any event is malformed (nothing is applied)
+        """
+        for event in events:
+            self._validate(event)
+        with self._lock:
+            self._formed, self._broken = [], []
+            ignored = 0
+            for event in events:
+                kind = KINDS.index(event["kind"])
+                if event["op"] == "remove":
+                    ignored += not self._remove(kind, event["id"])
+                else:
+                    item = {k: v for k, v in event.items() if k not in ("op", "kind")}
+                    self._add(kind, item)
+            self.events += len(events)
+            self.pairs_formed += len(self._formed)
+            self.pairs_broken += len(self._broken)
+            return {
+                "applied": len(events) - ignored,
+                "ignored": ignored,
+                "pairs_formed": [{"delivery_id": d, "return_id": r} for d, r in self._formed],
+                "pairs_broken": [{"delivery_id": d, "return_id": r} for d, r in self._broken],
+                **self._totals()
+            }
+
+    def _totals(self) -> Dict[str, Any]:
+        deliveries, returns = len(self._items[DELIVERY]), len(self._items[RETURN])
+        pairs = len(self._partner[DELIVERY])
+        return {
+            "total_pairs": pairs,
+            "total_deliveries": deliveries,
+            "total_returns": returns,
+            "pairing_efficiency": round(pairs / min(deliveries, returns) * 100, 1) if min(deliveries, returns) > 0 else 0
+        }
+
+    def plan(self) -> Dict[str, Any]:
+        """
+        The current pairing, in the same shape as optimize_reverse_pickup.
+        """
+        with self._lock:
+            deliveries, returns = self._items
+            paired_routes = []
+            total_distance = 0.0
+            for delivery_id, (delivery, *_) in deliveries.items():
+                if delivery_id in self._partner[DELIVERY]:
+                    return_id, distance = self._partner[DELIVERY][delivery_id]
+                    paired_routes.append(build_paired_route(delivery, returns[return_id][0], distance))
+                    total_distance += distance
+            return {
+                "mode": "incremental",
+                "paired_routes": paired_routes,
+                "unpaired_deliveries": [d for i, (d, *_) in deliveries.items() if i not in self._partner[DELIVERY]],
+                "unpaired_returns": [r for i, (r, *_) in returns.items() if i not in self._partner[RETURN]],
+                "total_distance_km": round(total_distance, 2),
+                **self._totals()
+            }
+
+    def clear(self) -> None:
+        """Drop every delivery, return and pair."""
+        with self._lock:
+            self._reset()
+        logger.info("Cleared reverse-logistics pairing state")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return service counters for monitoring.
+        """
+        with self._lock:
+            return {
+                "deliveries": len(self._items[DELIVERY]),
+                "returns": len(self._items[RETURN]),
+                "pairs": len(self._partner[DELIVERY]),
+                "events": self.events,
+                "pairs_formed": self.pairs_formed,
+                "pairs_broken": self.pairs_broken,
+                "candidates_checked": self.candidates_checked
+            }
+
+# Process-wide service fed by the order event stream
+pairing_service = PairingService()
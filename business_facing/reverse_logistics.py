@@ -1,5 +1,17 @@
+import heapq
 import math
 
+import numpy as np
+
+from spatial_index import SpatialGrid, EARTH_RADIUS_KM
+
+# Maximum distance (km) between a delivery and the return it is paired with
+PAIRING_RADIUS_KM = 3.0
+
+# greedy: each delivery in input order takes its nearest unused return
+# optimal: most pairs possible, then least total distance
+PAIRING_MODES = ("greedy", "optimal")
+
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the distance between two points on Earth using the Haversine formula.
@@ -13,7 +25,10 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     """
     # Convert latitude and longitude from degrees to radians
     lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
+    return _haversine_rad(lat1, lon1, lat2, lon2)
+
+def _haversine_rad(lat1, lon1, lat2, lon2):
+    """Haversine distance in kilometers between points given in radians."""
     # Haversine formula
     dlat = lat2 - lat1
     dlon = lon2 - lon1
@@ -25,79 +40,301 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     
     return c * r
 
-def optimize_reverse_pickup(deliveries, returns):
+def candidate_pairs(deliveries, returns):
     """
-    Pair returns with deliveries if they are within 3 km of each other.
+    All delivery/return pairs within the pairing radius.
+    
+    Deliveries are grouped by grid cell and each group is measured against
+    the returns around its cell in one vectorized block.
     
-    Args:
-        deliveries: List of delivery locations with coordinates
-                   Format: [{"id": "d1", "lat": 12.9716, "lon": 77.6413}, ...]
-        returns: List of return locations with coordinates
-                Format: [{"id": "r1", "lat": 12.9750, "lon": 77.6450}, ...]
-        
     Returns:
-        dict: Contains paired_routes and unpaired_items
+        tuple: Delivery indices, return indices and distances (km) as arrays
     """
-    paired_routes = []
-    unpaired_deliveries = []
-    unpaired_returns = []
+    grid = SpatialGrid(PAIRING_RADIUS_KM)
+    for j, return_item in enumerate(returns):
+        grid.insert(j, return_item["lat"], return_item["lon"])
+    groups = {}
+    for i, delivery in enumerate(deliveries):
+        groups.setdefault(grid.cell_of(delivery["lat"], delivery["lon"]), []).append(i)
+    
+    return_lat = np.radians(np.array([r["lat"] for r in returns], dtype=np.float64))
+    return_lon = np.radians(np.array([r["lon"] for r in returns], dtype=np.float64))
+    delivery_lat = np.radians(np.array([d["lat"] for d in deliveries], dtype=np.float64))
+    delivery_lon = np.radians(np.array([d["lon"] for d in deliveries], dtype=np.float64))
+    
+    blocks = []
+    for cell, members in groups.items():
+        nearby = np.fromiter(grid.near_cell(cell), dtype=np.int64)
+        if not len(nearby):
+            continue
+        members = np.array(members, dtype=np.int64)
+        lat1, lon1 = delivery_lat[members][:, None], delivery_lon[members][:, None]
+        lat2, lon2 = return_lat[nearby][None, :], return_lon[nearby][None, :]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0))) * EARTH_RADIUS_KM
+        rows, cols = np.nonzero(distance <= PAIRING_RADIUS_KM)
+        blocks.append((members[rows], nearby[cols], distance[rows, cols]))
+    
+    if not blocks:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return tuple(np.concatenate(parts) for parts in zip(*blocks))
+
+def build_paired_route(delivery, return_item, distance):
+    """
+    One combined delivery + pickup entry of a pairing result.
+    
+    Args:
+        delivery: Delivery with id, lat and lon
+        return_item: Return with id, lat and lon
+        distance: Distance between them in kilometers
+    """
+    return {
+        "delivery_id": delivery["id"],
+        "return_id": return_item["id"],
+        "delivery_coords": [delivery["lat"], delivery["lon"]],
+        "return_coords": [return_item["lat"], return_item["lon"]],
+        "distance_km": round(distance, 2),
+        "route_type": "paired_delivery_return"
+    }
+
+def _greedy_pairs(deliveries, returns):
+    """Each delivery, in input order, takes its nearest unused return."""
+    pairs = []
     
     # Track which deliveries and returns have been paired
     used_deliveries = set()
     used_returns = set()
     
-    # Check each delivery against each return
-    for delivery in deliveries:
+    # Index returns so each delivery only measures the returns around it
+    return_rad = [(math.radians(r["lat"]), math.radians(r["lon"])) for r in returns]
+    grid = SpatialGrid(PAIRING_RADIUS_KM)
+    for j, return_item in enumerate(returns):
+        grid.insert(j, return_item["lat"], return_item["lon"])
+    
+    for i, delivery in enumerate(deliveries):
         if delivery["id"] in used_deliveries:
             continue
             
-        best_return = None
+        best = None
         best_distance = float('inf')
+        lat1, lon1 = math.radians(delivery["lat"]), math.radians(delivery["lon"])
         
-        for return_item in returns:
-            if return_item["id"] in used_returns:
+        # Input order, so ties go to the earliest return as in a full scan
+        for j in sorted(grid.near(delivery["lat"], delivery["lon"])):
+            if returns[j]["id"] in used_returns:
                 continue
                 
-            # Calculate distance using haversine formula
-            distance = haversine_distance(
-                delivery["lat"], delivery["lon"],
-                return_item["lat"], return_item["lon"]
-            )
+            distance = _haversine_rad(lat1, lon1, *return_rad[j])
             
             # If within 3 km and better than previous best
-            if distance <= 3.0 and distance < best_distance:
-                best_return = return_item
+            if distance <= PAIRING_RADIUS_KM and distance < best_distance:
+                best = j
                 best_distance = distance
         
-        # If we found a suitable return, create a paired route
-        if best_return:
-            paired_routes.append({
-                "delivery_id": delivery["id"],
-                "return_id": best_return["id"],
-                "delivery_coords": [delivery["lat"], delivery["lon"]],
-                "return_coords": [best_return["lat"], best_return["lon"]],
-                "distance_km": round(best_distance, 2),
-                "route_type": "paired_delivery_return"
-            })
+        # If we found a suitable return, pair them
+        if best is not None:
+            pairs.append((i, best, best_distance))
             
             # Mark as used
             used_deliveries.add(delivery["id"])
-            used_returns.add(best_return["id"])
-        else:
-            # No suitable return found for this delivery
-            unpaired_deliveries.append(delivery)
+            used_returns.add(returns[best]["id"])
+            grid.remove(best)
     
-    # Add remaining unpaired returns
-    for return_item in returns:
-        if return_item["id"] not in used_returns:
-            unpaired_returns.append(return_item)
+    return pairs
+
+def min_cost_matching(edges, n_cols, pair_value):
+    """
+    Maximum-cardinality, minimum-cost bipartite matching on a sparse graph.
     
-    return {
+    Shortest augmenting paths with dual potentials (Jonker-Volgenant on
+    sparse rows). Every row also has a private column standing for "left
+    unmatched" that costs pair_value, so with pair_value above any path's
+    total cost the matching first maximizes pairs, then minimizes cost.
+    Each row's Dijkstra stops at the first free column it reaches, so the
+    work stays local when free columns are nearby.
+    
+    Args:
+        edges: Per row, a list of (column, non-negative cost)
+        n_cols: Number of columns
+        pair_value: Cost of leaving a row unmatched
+        
+    Returns:
+        list: Matched column per row, or -1
+    """
+    n_rows = len(edges)
+    size = n_cols + n_rows
+    u = [0.0] * n_rows
+    v = [0.0] * size
+    row4col = [-1] * size
+    col4row = [-1] * n_rows
+    dist = [math.inf] * size
+    path = [-1] * size
+    done = [False] * size
+    # Each row's own unmatched column goes last in its edge list
+    row_edges = [row + [(n_cols + i, pair_value)] for i, row in enumerate(edges)]
+    push, pop = heapq.heappush, heapq.heappop
+    
+    for cur in range(n_rows):
+        touched = []
+        settled_rows = []
+        heap = []
+        i, min_val = cur, 0.0
+        while True:
+            ui = min_val - u[i]
+            for j, cost in row_edges[i]:
+                reduced = ui + cost - v[j]
+                if reduced < dist[j] and not done[j]:
+                    if dist[j] == math.inf:
+                        touched.append(j)
+                    dist[j] = reduced
+                    path[j] = i
+                    push(heap, (reduced, j))
+            while True:
+                min_val, j = pop(heap)
+                if not done[j] and min_val == dist[j]:
+                    break
+            done[j] = True
+            i = row4col[j]
+            if i == -1:
+                break
+            settled_rows.append(i)
+        sink = j
+        
+        # Keep reduced costs non-negative and zero on matched edges
+        u[cur] += min_val
+        for i in settled_rows:
+            u[i] += min_val - dist[col4row[i]]
+        for j in touched:
+            if done[j]:
+                v[j] -= min_val - dist[j]
+                done[j] = False
+            dist[j] = math.inf
+        
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur:
+                break
+    
+    return [j if j < n_cols else -1 for j in col4row]
+
+def _optimal_pairs(deliveries, returns):
+    """Most pairs possible, then least total distance; independent of input order."""
+    delivery_idx, return_idx, distances = candidate_pairs(deliveries, returns)
+    
+    # Like the greedy pass, an id is paired at most once: match first occurrences
+    first_delivery, first_return = {}, {}
+    for i, delivery in enumerate(deliveries):
+        first_delivery.setdefault(delivery["id"], i)
+    for j, return_item in enumerate(returns):
+        first_return.setdefault(return_item["id"], j)
+    keep = (np.isin(delivery_idx, list(first_delivery.values()))
+            & np.isin(return_idx, list(first_return.values())))
+    delivery_idx, return_idx, distances = delivery_idx[keep], return_idx[keep], distances[keep]
+    
+    # Rows are the smaller side, so there are fewer searches
+    by_delivery = len(first_delivery) <= len(first_return)
+    row_idx, col_idx = (delivery_idx, return_idx) if by_delivery else (return_idx, delivery_idx)
+    order = np.argsort(row_idx, kind="stable")
+    row_idx, col_idx, distances = row_idx[order], col_idx[order], distances[order]
+    rows, starts = np.unique(row_idx, return_index=True)
+    ends = np.append(starts[1:], len(row_idx)).tolist()
+    cols, costs = col_idx.tolist(), distances.tolist()
+    row_edges = [list(zip(cols[a:b], costs[a:b])) for a, b in zip(starts.tolist(), ends)]
+    
+    # One more pair must outweigh any difference in total distance
+    pair_value = PAIRING_RADIUS_KM * (len(rows) + 1) + 1
+    matched = min_cost_matching(row_edges, len(returns) if by_delivery else len(deliveries), pair_value)
+    
+    pairs = []
+    for row, edges, col in zip(rows.tolist(), row_edges, matched):
+        if col != -1:
+            distance = next(cost for j, cost in edges if j == col)
+            pairs.append((row, col, distance) if by_delivery else (col, row, distance))
+    pairs.sort()
+    return pairs
+
+def _check_mode(mode):
+    if mode not in PAIRING_MODES:
+        raise ValueError(f"Unknown pairing mode '{mode}'. Use one of: {', '.join(PAIRING_MODES)}")
+
+def pair_returns(deliveries, returns, mode="greedy"):
+    """
+    Pair deliveries and returns without building the response.
+    
+    Returns:
+        list: (delivery index, return index, distance_km) per pair, in
+        delivery order
+        
+    Raises:
+        ValueError: If mode is unknown
+    """
+    _check_mode(mode)
+    return _greedy_pairs(deliveries, returns) if mode == "greedy" else _optimal_pairs(deliveries, returns)
+
+def pairing_result(deliveries, returns, mode, pairs, greedy_pairs=None):
+    """
+    Response of optimize_reverse_pickup for the given pairs.
+    
+    Args:
+        pairs: (delivery index, return index, distance_km) per pair
+        greedy_pairs: Greedy pairs to compare against in optimal mode
+    """
+    paired_routes = [build_paired_route(deliveries[i], returns[j], distance) for i, j, distance in pairs]
+    total_distance = sum(distance for _, _, distance in pairs)
+    
+    # Add remaining unpaired deliveries and returns. As in the input-order
+    # scan, a delivery whose id was paired earlier is skipped, while copies
+    # before the paired one stay unpaired
+    paired_at = {}
+    for i, _, _ in pairs:
+        delivery_id = deliveries[i]["id"]
+        paired_at[delivery_id] = min(i, paired_at.get(delivery_id, i))
+    used_returns = {returns[j]["id"] for _, j, _ in pairs}
+    unpaired_deliveries = [d for i, d in enumerate(deliveries) if i < paired_at.get(d["id"], len(deliveries))]
+    unpaired_returns = [r for r in returns if r["id"] not in used_returns]
+    
+    result = {
+        "mode": mode,
         "paired_routes": paired_routes,
         "unpaired_deliveries": unpaired_deliveries,
         "unpaired_returns": unpaired_returns,
         "total_pairs": len(paired_routes),
         "total_deliveries": len(deliveries),
         "total_returns": len(returns),
+        "total_distance_km": round(total_distance, 2),
         "pairing_efficiency": round(len(paired_routes) / min(len(deliveries), len(returns)) * 100, 1) if min(len(deliveries), len(returns)) > 0 else 0
-    } 
\ No newline at end of file
+    }
+    if greedy_pairs is not None:
+        greedy_distance = sum(distance for _, _, distance in greedy_pairs)
+        result["greedy_pairs"] = len(greedy_pairs)
+        result["greedy_distance_km"] = round(greedy_distance, 2)
+        result["extra_pairs"] = len(pairs) - len(greedy_pairs)
+        # Negative when the extra pairs add more distance than re-pairing saves
+        result["distance_saved_km"] = round(greedy_distance - total_distance, 2)
+    return result
+
+def optimize_reverse_pickup(deliveries, returns, mode="greedy"):
+    """
+    Pair returns with deliveries if they are within 3 km of each other.
+    
+    Args:
+        deliveries: List of delivery locations with coordinates
+                   Format: [{"id": "d1", "lat": 12.9716, "lon": 77.6413}, ...]
+        returns: List of return locations with coordinates
+                Format: [{"id": "r1", "lat": 12.9750, "lon": 77.6450}, ...]
+        mode: "greedy" (default) or "optimal"
+        
+    Returns:
+        dict: Contains paired_routes and unpaired_items; in optimal mode
+        also the greedy pairing's totals and the gain over it
+        
+    Raises:
+        ValueError: If mode is unknown
+    """
+    _check_mode(mode)
+    greedy = _greedy_pairs(deliveries, returns)
+    pairs = greedy if mode == "greedy" else _optimal_pairs(deliveries, returns)
+    return pairing_result(deliveries, returns, mode, pairs, greedy if mode == "optimal" else None)
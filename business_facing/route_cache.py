@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Any, Optional, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Decimal places kept when quantizing coordinates (4 ≈ 11 m at the equator)
+ROUTE_CACHE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "4"))
+ROUTE_CACHE_TTL_S = float(os.getenv("ROUTE_CACHE_TTL_S", "3600"))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "10000"))
+
+def quantize_coordinates(coords: List[float], precision: int = ROUTE_CACHE_PRECISION) -> Tuple[float, float]:
+    """
+    Round [lng, lat] coordinates so nearby lookups share a cache entry.
+
+    Args:
+        coords: [lng, lat] coordinates
+        precision: Number of decimal places to keep
+
+    Returns:
+        tuple: Rounded (lng, lat)
+    """
+    return (round(float(coords[0]), precision), round(float(coords[1]), precision))
+
+def make_route_key(source: List[float], destination: List[float], profile: str,
+                   alternatives: Optional[Dict[str, Any]] = None,
+                   precision: int = ROUTE_CACHE_PRECISION,
+                   geometry: Hashable = None) -> Tuple:
+    """
+    Build the cache key for a route lookup.
+
+    Args:
+        source: [lng, lat] coordinates of the source
+        destination: [lng, lat] coordinates of the destination
+        profile: Routing profile (e.g. "driving-car")
+        alternatives: Alternative route settings sent upstream
+        precision: Number of decimal places to keep
+        geometry: Geometry mode (and settings) the cached result was shaped for
+
+    Returns:
+        tuple: Hashable key
+    """
+    alternatives_key = tuple(sorted((alternatives or {}).items()))
+    return (
+        quantize_coordinates(source, precision),
+        quantize_coordinates(destination, precision),
+        profile,
+        alternatives_key,
+        geometry
+    )
+
+class RouteCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for routing results.
+
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = ROUTE_CACHE_MAX_ENTRIES, ttl_s: float = ROUTE_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for key, or None on a miss or expired entry.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        """
+        Store value under key, evicting the least recently used entries if full.
+        """
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters for monitoring.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+# Process-wide cache used by route_handler
+route_cache = RouteCache()
@@ -0,0 +1,156 @@
+import math
+from typing import List, Dict, Any, Optional
+
+# How route geometry is carried through the pipeline:
+#   none       - no geometry (summary only)
+#   simplified - GeoJSON LineString reduced with Douglas-Peucker
+#   polyline   - Google encoded polyline string (precision 5)
+#   full       - GeoJSON LineString as returned by the routing backend
+GEOMETRY_MODES = ("none", "simplified", "polyline", "full")
+DEFAULT_GEOMETRY_MODE = "none"
+DEFAULT_SIMPLIFY_TOLERANCE_M = 10.0
+POLYLINE_PRECISION = 5
+
+_METERS_PER_DEG_LAT = 111320.0
+
+def validate_geometry_mode(mode: str) -> None:
+    """
+    Validate a geometry mode name.
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in GEOMETRY_MODES:
+        raise ValueError(f"Invalid geometry mode '{mode}'. Must be one of: {list(GEOMETRY_MODES)}")
+
+def _perpendicular_distance_m(point: List[float], start: List[float], end: List[float], lng_scale: float) -> float:
+    """Distance from point to segment start-end on a local equirectangular plane."""
+    px, py = point[0] * lng_scale, point[1] * _METERS_PER_DEG_LAT
+    ax, ay = start[0] * lng_scale, start[1] * _METERS_PER_DEG_LAT
+    bx, by = end[0] * lng_scale, end[1] * _METERS_PER_DEG_LAT
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def douglas_peucker(coordinates: List[List[float]], tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> List[List[float]]:
+    """
+    Simplify a [lng, lat(, ele)] line with the Douglas-Peucker algorithm.
+
+    Args:
+        coordinates: Line coordinates
+        tolerance_m: Maximum deviation of the simplified line in meters
+
+    Returns:
+        List of retained coordinates (endpoints always kept)
+    """
+    n = len(coordinates)
+    if n <= 2 or tolerance_m <= 0:
+        return list(coordinates)
+
+    mean_lat = sum(c[1] for c in coordinates) / n
+    lng_scale = _METERS_PER_DEG_LAT * math.cos(math.radians(mean_lat))
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    # Iterative to avoid recursion limits on long routes
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance, index = 0.0, None
+        for i in range(first + 1, last):
+            distance = _perpendicular_distance_m(coordinates[i], coordinates[first], coordinates[last], lng_scale)
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if index is not None and max_distance > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [c for c, kept in zip(coordinates, keep) if kept]
+
+def encode_polyline(coordinates: List[List[float]], precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode [lng, lat] coordinates as a Google encoded polyline.
+
+    The polyline stores (lat, lng) pairs, matching the ORS "json" format.
+    """
+    factor = 10 ** precision
+    encoded = []
+    previous_lat = previous_lng = 0
+    for coord in coordinates:
+        lat = int(round(coord[1] * factor))
+        lng = int(round(coord[0] * factor))
+        for delta in (lat - previous_lat, lng - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                encoded.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            encoded.append(chr(value + 63))
+        previous_lat, previous_lng = lat, lng
+    return "".join(encoded)
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[List[float]]:
+    """
+    Decode a Google encoded polyline into [lng, lat] coordinates.
+    """
+    factor = 10 ** precision
+    coordinates = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append([lng / factor, lat / factor])
+    return coordinates
+
+def shape_feature(summary: Dict[str, Any], geometry: Optional[Dict[str, Any]],
+                  mode: str, tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> Dict[str, Any]:
+    """
+    Build a slim route Feature carrying geometry in the requested mode.
+
+    Args:
+        summary: Route summary ({"distance": m, "duration": s})
+        geometry: GeoJSON LineString from the backend, or None
+        mode: One of GEOMETRY_MODES
+        tolerance_m: Douglas-Peucker tolerance for "simplified"
+
+    Returns:
+        Dict: Feature; encoded polylines go in properties["polyline"]
+    """
+    feature = {
+        "type": "Feature",
+        "geometry": None,
+        "properties": {"summary": summary}
+    }
+    coordinates = (geometry or {}).get("coordinates")
+    if not coordinates or mode == "none":
+        return feature
+    if mode == "polyline":
+        feature["properties"]["polyline"] = encode_polyline(coordinates)
+    elif mode == "simplified":
+        feature["geometry"] = {"type": "LineString", "coordinates": douglas_peucker(coordinates, tolerance_m)}
+    else:
+        feature["geometry"] = geometry
+    return feature
+
+def geometry_output(feature: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Geometry fields to add to an enriched route option, if any.
+    """
+    if feature.get("geometry"):
+        return {"geometry": feature["geometry"]}
+    if feature["properties"].get("polyline"):
+        return {"polyline": feature["properties"]["polyline"]}
+    return {}
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, Hashable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite file shared by all workers on a host; empty string disables the store
+ROUTE_STORE_PATH = os.getenv(
+    "ROUTE_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "route_cache.sqlite3")
+)
+ROUTE_STORE_TTL_S = float(os.getenv("ROUTE_STORE_TTL_S", "86400"))
+ROUTE_STORE_MAX_ENTRIES = int(os.getenv("ROUTE_STORE_MAX_ENTRIES", "200000"))
+# Writes between automatic compactions
+ROUTE_STORE_COMPACT_EVERY = int(os.getenv("ROUTE_STORE_COMPACT_EVERY", "1000"))
+
+def serialize_key(key: Hashable) -> str:
+    """
+    Turn a route cache key (nested tuples of numbers/strings) into a stable string.
+    """
+    return json.dumps(key, separators=(",", ":"))
+
+class RouteStore:
+    """
+    Persistent route cache in SQLite, shared read-mostly between workers.
+
+    The database runs in WAL mode so readers in other processes are never
+    blocked by a writer. Expired rows are ignored on read and removed by
+    compact(), which also trims the table to max_entries (soonest-expiring
+    rows first).
+    """
+
+    def __init__(self, path: str = ROUTE_STORE_PATH, ttl_s: float = ROUTE_STORE_TTL_S,
+                 max_entries: int = ROUTE_STORE_MAX_ENTRIES,
+                 compact_every: int = ROUTE_STORE_COMPACT_EVERY):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.compact_every = compact_every
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writes_since_compact = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS routes_expires_at ON routes (expires_at)")
+        self.compact()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; only close() touches it from another
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Return (value, remaining_ttl_s) for key, or None if missing or expired.
+        """
+        now = time.time()
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM routes WHERE key = ? AND expires_at > ?",
+                (serialize_key(key), now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Route store read failed: {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1] - now
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        """
+        Store value under key; compacts every compact_every writes.
+        """
+        expires_at = time.time() + (self.ttl_s if ttl_s is None else ttl_s)
+        try:
+            with self._write_lock:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO routes (key, value, expires_at) VALUES (?, ?, ?)",
+                    (serialize_key(key), json.dumps(value, separators=(",", ":")), expires_at)
+                )
+                self.writes += 1
+                self._writes_since_compact += 1
+                should_compact = self._writes_since_compact >= self.compact_every
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Route store write failed: {e}")
+            return
+        if should_compact:
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Delete expired rows and trim to max_entries.
+
+        Returns:
+            int: Number of rows removed
+        """
+        try:
+            with self._write_lock:
+                conn = self._connection()
+                removed = conn.execute("DELETE FROM routes WHERE expires_at <= ?", (time.time(),)).rowcount
+                overflow = conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    removed += conn.execute(
+                        "DELETE FROM routes WHERE key IN "
+                        "(SELECT key FROM routes ORDER BY expires_at LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+                self._writes_since_compact = 0
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Route store compaction failed: {e}")
+            return 0
+        if removed:
+            logger.info(f"Route store compaction removed {removed} entries")
+        return removed
+
+    def clear(self) -> None:
+        """Delete every stored route and reset counters."""
+        with self._write_lock:
+            self._connection().execute("DELETE FROM routes")
+        self.hits = self.misses = self.writes = self.errors = 0
+
+    def close(self) -> None:
+        """Close the connections of every thread that used the store."""
+        with self._write_lock, self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return store counters for monitoring.
+        """
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors
+        }
+
+def open_route_store(path: str = ROUTE_STORE_PATH) -> Optional[RouteStore]:
+    """
+    Open the persistent route store, or return None if disabled or unavailable.
+    """
+    if not path:
+        return None
+    try:
+        return RouteStore(path)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to open route store at {path}: {e}")
+        return None
+
+# Process-wide store used by route_handler; None until init_route_store()
+# runs at startup, or when disabled
+route_store: Optional[RouteStore] = None
+
+def init_route_store(path: str = ROUTE_STORE_PATH) -> Optional[RouteStore]:
+    """
+    Open the process-wide route store if it is not open yet.
+    """
+    global route_store
+    if route_store is None:
+        route_store = open_route_store(path)
+    return route_store
+
+def close_route_store() -> None:
+    """Close the process-wide route store; lookups fall back to memory only."""
+    global route_store
+    if route_store is not None:
+        route_store.close()
+        route_store = None
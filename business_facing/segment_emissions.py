@@ -0,0 +1,110 @@
+from typing import List, Dict, Any, Optional
+import logging
+
+import numpy as np
+
+from emissions import round_grams
+from factor_registry import factor_registry
+from fleet_emissions import haversine_km_array
+
+logger = logging.getLogger(__name__)
+
+def segment_lengths_km(coords: np.ndarray) -> np.ndarray:
+    """
+    Great-circle length of each segment of a [lng, lat(, ele)] coordinate array.
+    """
+    return haversine_km_array(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+def integrate_emissions(coordinates: List[List[float]], vehicle_type: str = "car",
+                        mode: str = "last_mile", distance_m: Optional[float] = None,
+                        duration_s: Optional[float] = None,
+                        segment_speeds_kmh: Optional[List[float]] = None,
+                        payload_kg: float = 0.0) -> Dict[str, Any]:
+    """
+    Integrate emissions along a route LineString, segment by segment.
+
+    Each segment's grams are length x factor x gradient multiplier x speed
+    class multiplier x payload multiplier. Gradient is only applied when the
+    coordinates carry elevation ([lng, lat, ele]). When distance_m is given,
+    segment lengths are scaled to match it, so a flat route at a neutral
+    speed with no payload integrates to the distance-based estimate.
+
+    Args:
+        coordinates: Route coordinates
+        vehicle_type: Vehicle type of the transport mode
+        mode: "last_mile" or "freight"
+        distance_m: Road distance of the route from the routing summary
+        duration_s: Route duration; with distance_m gives the average speed
+        segment_speeds_kmh: Per-segment speeds, overriding the average speed
+        payload_kg: Carried payload
+
+    Returns:
+        dict: total_grams, segments_grams and the applied adjustments
+
+    Raises:
+        ValueError: If the coordinates or segment speeds are invalid
+    """
+    coords = np.asarray(coordinates, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[0] < 2 or coords.shape[1] < 2:
+        raise ValueError("coordinates must be a LineString with at least two [lng, lat] points")
+
+    factors = factor_registry.current
+    table = factors.mode(mode)
+    model = factors.segment_model
+    vehicle_index = table.index_of(vehicle_type)
+
+    geometry_lengths_km = segment_lengths_km(coords)
+    geometry_km = float(geometry_lengths_km.sum())
+    lengths_km = geometry_lengths_km
+    if distance_m is not None and geometry_km > 0:
+        lengths_km = geometry_lengths_km * (distance_m / 1000 / geometry_km)
+    route_km = float(lengths_km.sum())
+
+    has_elevation = coords.shape[1] >= 3
+    if has_elevation:
+        horizontal_m = np.maximum(geometry_lengths_km * 1000, 1e-6)
+        grade_percent = np.clip(
+            np.diff(coords[:, 2]) / horizontal_m * 100, -model.max_grade_percent, model.max_grade_percent
+        )
+        gradient_multiplier = np.maximum(
+            model.min_gradient_multiplier, 1 + model.gradient_per_percent * grade_percent
+        )
+    else:
+        gradient_multiplier = np.ones_like(lengths_km)
+
+    if segment_speeds_kmh is not None:
+        speeds_kmh = np.asarray(segment_speeds_kmh, dtype=np.float64)
+        if speeds_kmh.shape != lengths_km.shape:
+            raise ValueError("segment_speeds_kmh must have one speed per segment")
+    elif distance_m and duration_s:
+        speeds_kmh = np.full_like(lengths_km, (distance_m / 1000) / (duration_s / 3600))
+    else:
+        speeds_kmh = None
+    if speeds_kmh is not None:
+        speed_multiplier = model.speed_multipliers[np.searchsorted(model.speed_bands_kmh, speeds_kmh, side="left")]
+    else:
+        speed_multiplier = np.ones_like(lengths_km)
+
+    capacity_kg = float(table.payload_capacity_kg[vehicle_index])
+    load_fraction = min(max(payload_kg / capacity_kg, 0.0), 1.0) if capacity_kg > 0 else 0.0
+    payload_multiplier = 1 + table.payload_coefficient * load_fraction
+
+    factor = float(table.factors[vehicle_index])
+    segment_grams = lengths_km * factor * gradient_multiplier * speed_multiplier * payload_multiplier
+    total_grams = float(segment_grams.sum())
+    baseline_grams = route_km * factor
+    average_speed_multiplier = float(np.average(speed_multiplier, weights=lengths_km)) if route_km > 0 else 1.0
+
+    return {
+        "total_grams": float(round_grams(total_grams)),
+        "segments_grams": round_grams(segment_grams).tolist(),
+        "distance_km": round(route_km, 3),
+        "vehicle_type": table.vehicles[vehicle_index],
+        "adjustments": {
+            "gradient_applied": has_elevation,
+            "average_speed_multiplier": round(average_speed_multiplier, 4),
+            "payload_multiplier": round(payload_multiplier, 4),
+            "vs_distance_model": round(total_grams / baseline_grams, 4) if baseline_grams > 0 else 1.0
+        },
+        "factor_version": factors.version
+    }
@@ -10,7 +10,9 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from emissions import calculate_emissions
+    import numpy as np
+    from emissions import calculate_emissions, calculate_emissions_batch
+    from fleet_emissions import calculate_freight_emissions, calculate_freight_emissions_batch
     print("✓ Successfully imported emissions module")
 except ImportError as e:
     print(f"✗ Failed to import emissions module: {e}")
@@ -112,6 +114,45 @@ def test_return_format():
     print("✓ Return format is correct")
     print(f"  Sample result: {result}")
 
+def _reference_level(grams, low, medium):
+    if grams <= low:
+        return "low"
+    if grams <= medium:
+        return "medium"
+    return "high"
+
+def test_batch_matches_scalar():
+    """Test that the vectorized calculator matches per-trip results exactly"""
+    print("\n--- Testing Batch Emissions ---")
+    
+    rng = np.random.default_rng(7)
+    # Random distances plus values whose products land on .xx5 rounding ties
+    distances = np.concatenate([
+        rng.uniform(0, 5, 5000),
+        rng.integers(0, 100000, 5000) / 1000,
+        [0.0, 2.675 / 192, 50 / 192, 150 / 192, 151 / 192, 1.0, 1000 / 550]
+    ])
+    vehicles = rng.choice(["car", "hybrid", "ev", "bike"], distances.size)
+    
+    batch = calculate_emissions_batch(distances, vehicles)
+    factors = {"car": 192, "hybrid": 90, "ev": 0}
+    for distance, vehicle, grams, level in zip(distances, vehicles, batch["emissions_grams"], batch["emission_level"]):
+        expected = round(float(distance) * factors.get(vehicle, 192), 2)
+        assert grams == expected, f"{distance}km {vehicle}: {grams} != {expected}"
+        assert level == _reference_level(expected, 50, 150)
+        assert calculate_emissions(float(distance), str(vehicle)) == {"emissions_grams": expected, "emission_level": level}
+    
+    freight_vehicles = rng.choice(["heavy_truck", "rail_freight", "ship_barge"], distances.size)
+    freight = calculate_freight_emissions_batch(distances * 100, freight_vehicles)
+    mode_batch = calculate_emissions_batch(distances * 100, freight_vehicles, mode="freight")
+    assert np.array_equal(freight["emissions_grams"], mode_batch["emissions_grams"])
+    for i in range(0, distances.size, 97):
+        scalar = calculate_freight_emissions(float(distances[i] * 100), str(freight_vehicles[i]))
+        assert scalar["emissions_grams"] == freight["emissions_grams"][i]
+        assert scalar["freight_emission_level"] == freight["freight_emission_level"][i]
+    
+    print(f"✓ {distances.size} last-mile and freight trips match the scalar results")
+
 if __name__ == "__main__":
     print("RouteZero Emissions Test")
     print("=" * 40)
@@ -121,6 +162,7 @@ if __name__ == "__main__":
         test_vehicle_types()
         test_edge_cases()
         test_return_format()
+        test_batch_matches_scalar()
         
         print("\n" + "=" * 40)
         print("✓ All emissions tests completed successfully!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming emissions aggregator
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from emissions_aggregator import EmissionsAggregator, RegionResolver
+    print("✓ Successfully imported emissions_aggregator")
+except ImportError as e:
+    print(f"✗ Failed to import emissions_aggregator: {e}")
+    sys.exit(1)
+
+# A fixed day boundary keeps bucket arithmetic predictable
+T0 = 1_700_000_000 - 1_700_000_000 % 86400
+
+def test_totals_and_breakdowns():
+    """Test that recorded trips roll up by region and vehicle type"""
+    print("\n--- Testing Totals and Breakdowns ---")
+
+    aggregator = EmissionsAggregator(max_regions=8, max_vehicles=8)
+    aggregator.record("Bangalore", "ev", 10.0, 0.0, 1920.0, source="route_options", timestamp=T0 + 10)
+    aggregator.record("Bangalore", "hybrid", 20.0, 1800.0, 2040.0, source="route_options", timestamp=T0 + 70)
+    aggregator.record("Mumbai", "rail_freight", 500.0, 10000.0, 265000.0, source="freight_options", timestamp=T0 + 3700)
+
+    kpis = aggregator.query("hour", buckets=2, now=T0 + 3800)
+    assert kpis["totals"] == {"trips": 3, "distance_km": 530.0, "emissions_grams": 11800.0, "emissions_saved_grams": 268960.0}
+    assert kpis["by_region"]["Bangalore"]["trips"] == 2
+    assert kpis["by_vehicle"]["rail_freight"]["emissions_grams"] == 10000.0
+    assert [b["trips"] for b in kpis["series"]] == [2, 1], "One bucket per hour, oldest first"
+
+    minutes = aggregator.query("minute", buckets=60, now=T0 + 100)
+    assert [b["trips"] for b in minutes["series"]] == [1, 1]
+    assert aggregator.stats()["recorded_by_source"] == {"route_options": 2, "freight_options": 1}
+    print(f"✓ Totals: {kpis['totals']}")
+
+def test_window_excludes_old_buckets():
+    """Test that buckets outside the window or overwritten by the ring are ignored"""
+    print("\n--- Testing Window Expiry ---")
+
+    aggregator = EmissionsAggregator(resolutions={"hour": (3600, 24)})
+    aggregator.record("Delhi", "car", 5.0, 960.0, timestamp=T0)
+    aggregator.record("Delhi", "car", 5.0, 960.0, timestamp=T0 + 5 * 3600)
+
+    assert aggregator.query("hour", buckets=3, now=T0 + 5 * 3600)["totals"]["trips"] == 1
+    assert aggregator.query("hour", buckets=24, now=T0 + 5 * 3600)["totals"]["trips"] == 2
+
+    # 24 hours later the first bucket's slot is reused
+    aggregator.record("Delhi", "car", 5.0, 960.0, timestamp=T0 + 24 * 3600)
+    kpis = aggregator.query("hour", now=T0 + 24 * 3600)
+    assert kpis["totals"]["trips"] == 2, "Expired bucket must be reset before reuse"
+    print("✓ Old buckets excluded and recycled")
+
+def test_bounded_keys():
+    """Test that keys beyond capacity are folded into "other" """
+    print("\n--- Testing Bounded Keys ---")
+
+    aggregator = EmissionsAggregator(max_regions=3, max_vehicles=4)
+    for region in ("A", "B", "C", "D"):
+        aggregator.record(region, "car", 1.0, 192.0, timestamp=T0)
+
+    by_region = aggregator.query("day", buckets=1, now=T0)["by_region"]
+    assert set(by_region) == {"A", "B", "other"}
+    assert by_region["other"]["trips"] == 2
+    print(f"✓ Regions tracked: {sorted(by_region)}")
+
+def test_invalid_query():
+    """Test query validation"""
+    print("\n--- Testing Invalid Queries ---")
+
+    aggregator = EmissionsAggregator()
+    for resolution, buckets in (("week", None), ("hour", 0), ("hour", 10_000)):
+        try:
+            aggregator.query(resolution, buckets)
+            assert False, f"{resolution}/{buckets} should be rejected"
+        except ValueError:
+            pass
+    print("✓ Invalid resolution and bucket counts rejected")
+
+def test_region_resolver():
+    """Test nearest-hub region attribution"""
+    print("\n--- Testing Region Resolver ---")
+
+    resolver = RegionResolver([
+        {"region": "Bangalore", "coordinates": [77.6413, 12.9716]},
+        {"region": "Mumbai", "coordinates": [72.8777, 19.0760]}
+    ])
+    assert resolver.region_for([77.59, 12.93]) == "Bangalore"
+    assert resolver.region_for([72.9, 19.1]) == "Mumbai"
+    assert resolver.region_for([0.0, 0.0]) == "other"
+    print("✓ Coordinates attributed to the nearest hub region")
+
+def test_reverse_logistics_recorded():
+    """Test that /reverse-logistics pickups show up in /kpis/emissions"""
+    print("\n--- Testing Reverse-Logistics Recording ---")
+
+    import asyncio
+    from main import ReverseLogisticsRequest, reverse_logistics_optimization, emissions_kpis
+
+    request = ReverseLogisticsRequest(
+        deliveries=[{"id": "d1", "lat": 12.9716, "lon": 77.6413}],
+        returns=[{"id": "r1", "lat": 12.9750, "lon": 77.6450}],
+        vehicle_type="hybrid"
+    )
+    before = asyncio.run(emissions_kpis())
+    response = asyncio.run(reverse_logistics_optimization(request))
+    after = asyncio.run(emissions_kpis())
+
+    pair = response["data"]["paired_routes"][0]
+    assert after["totals"]["trips"] == before["totals"]["trips"] + 1
+    assert after["totals"]["distance_km"] > before["totals"]["distance_km"]
+    assert after["totals"]["emissions_saved_grams"] > before["totals"]["emissions_saved_grams"]
+    hybrid = (after["by_vehicle"]["hybrid"]["distance_km"]
+              - before["by_vehicle"].get("hybrid", {"distance_km": 0.0})["distance_km"])
+    assert abs(hybrid - pair["distance_km"]) < 0.01
+    print(f"✓ Pair of {pair['distance_km']} km recorded for the hybrid pickup vehicle")
+
+if __name__ == "__main__":
+    print("RouteZero Emissions Aggregator Test")
+    print("=" * 40)
+
+    try:
+        test_totals_and_breakdowns()
+        test_window_excludes_old_buckets()
+        test_bounded_keys()
+        test_invalid_query()
+        test_region_resolver()
+        test_reverse_logistics_recorded()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the emission factor registry
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import numpy as np
+    from factor_registry import FactorRegistry, EMISSION_FACTORS_PATH
+    from emissions import emissions_array
+    print("✓ Successfully imported factor_registry")
+except ImportError as e:
+    print(f"✗ Failed to import factor_registry: {e}")
+    sys.exit(1)
+
+def _write_config(path, config):
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+def _base_config():
+    with open(EMISSION_FACTORS_PATH) as f:
+        return json.load(f)
+
+def test_compiled_tables():
+    """Test that factors compile to integer-indexed tables"""
+    print("\n--- Testing Compiled Tables ---")
+
+    factors = FactorRegistry(EMISSION_FACTORS_PATH, reload_interval_s=0).current
+    last_mile = factors.mode("last_mile")
+
+    assert last_mile.vehicles == ("car", "hybrid", "ev")
+    assert last_mile.factor("hybrid") == 90.0
+    assert last_mile.factor("unknown") == 192.0, "Unknown vehicles use the default factor"
+    assert list(last_mile.encode(["ev", "car", "bike"])) == [2, 0, 0]
+    assert factors.carriers["diesel"]["emission_factor"] == 192.0
+
+    # Pre-encoded codes skip the name lookup entirely
+    grams, levels = emissions_array([1.0, 1.0], np.array([0, 1]), last_mile)
+    assert list(grams) == [192.0, 90.0] and list(levels) == [2, 1]
+    print(f"✓ Version {factors.version}: {dict(zip(last_mile.vehicles, last_mile.factors))}")
+
+def test_reload_swaps_version():
+    """Test that a reload publishes a new version and keeps old snapshots intact"""
+    print("\n--- Testing Hot Reload ---")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "factors.json")
+        config = _base_config()
+        _write_config(path, config)
+        registry = FactorRegistry(path, reload_interval_s=0)
+        before = registry.current
+
+        config["version"] = "test.2"
+        config["modes"]["last_mile"]["factors_g_per_km"]["car"] = 170
+        _write_config(path, config)
+        registry.reload()
+        after = registry.current
+
+    assert after.version == "test.2" and after.revision == before.revision + 1
+    assert after.mode("last_mile").factor("car") == 170.0
+    assert before.mode("last_mile").factor("car") == 192.0, "In-flight snapshot must not change"
+    print(f"✓ Revision {before.revision} -> {after.revision}, car factor 192 -> 170")
+
+def test_invalid_config_keeps_current():
+    """Test that a broken config never replaces the active version"""
+    print("\n--- Testing Invalid Config ---")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "factors.json")
+        _write_config(path, _base_config())
+        registry = FactorRegistry(path, reload_interval_s=0)
+
+        broken = _base_config()
+        del broken["modes"]["freight"]["thresholds_g"]
+        _write_config(path, broken)
+        try:
+            registry.reload()
+            raised = False
+        except ValueError:
+            raised = True
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        try:
+            registry.reload()
+        except ValueError:
+            pass
+
+    assert raised, "Invalid config should be rejected"
+    assert registry.current.revision == 1 and registry.reload_errors == 2
+    print("✓ Invalid configs rejected; revision 1 still active")
+
+def test_automatic_reload_on_change():
+    """Test that the registry picks up config file changes on its own"""
+    print("\n--- Testing Automatic Reload ---")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "factors.json")
+        config = _base_config()
+        _write_config(path, config)
+        registry = FactorRegistry(path, reload_interval_s=0.01)
+
+        config["version"] = "test.auto"
+        _write_config(path, config)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+        registry._next_check = 0.0
+        current = registry.current
+
+    assert current.version == "test.auto", "Changed file should be loaded on access"
+    print(f"✓ Picked up version {current.version}")
+
+if __name__ == "__main__":
+    print("RouteZero Emission Factor Registry Test")
+    print("=" * 40)
+
+    try:
+        test_compiled_tables()
+        test_reload_swaps_version()
+        test_invalid_config_keeps_current()
+        test_automatic_reload_on_change()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for fleet-aware vehicle assignment
+"""
+
+import sys
+import os
+import time
+import itertools
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import numpy as np
+    from fleet_assignment import assign_fleet, solve_assignment, compile_inventory
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported fleet_assignment")
+except ImportError as e:
+    print(f"✗ Failed to import fleet_assignment: {e}")
+    sys.exit(1)
+
+def _objective(assignment, d, factors, ranges, costs, counts, overflow):
+    k = len(factors)
+    if any(j < k and d[i] > ranges[j] for i, j in enumerate(assignment)):
+        return None
+    if any(list(assignment).count(j) > counts[j] for j in range(k)):
+        return None
+    unassigned = sum(1 for j in assignment if j == k)
+    grams = sum(d[i] * (factors[j] if j < k else overflow) for i, j in enumerate(assignment))
+    cost = sum(d[i] * (costs[j] if j < k else max(costs)) for i, j in enumerate(assignment))
+    return (unassigned, round(grams, 6), round(cost, 6))
+
+def test_matches_exhaustive_search():
+    """Test that the solver is optimal on small instances"""
+    print("\n--- Testing Optimality ---")
+
+    rng = np.random.default_rng(2)
+    for trial in range(400):
+        n, k = int(rng.integers(1, 7)), int(rng.integers(1, 4))
+        d = np.round(rng.uniform(0, 400, n))
+        factors = rng.choice([0.0, 50.0, 90.0, 192.0], k)
+        if trial % 2:
+            # Tied distances with uneven factors: reassignment chains that
+            # cost exactly nothing must not count as savings
+            d = np.where(rng.random(n) < 0.6, 50.0 * rng.integers(1, 6, n), np.round(rng.uniform(0, 400, n), 2))
+            factors = np.round(rng.uniform(0, 200, k), 2)
+        ranges = rng.choice([100.0, 300.0, 800.0], k)
+        costs = rng.choice([1.0, 1.1, 1.2], k)
+        counts = rng.integers(0, 3, k)
+
+        solved = solve_assignment(d, factors, ranges, costs, counts, 192.0)
+        best = min(
+            score for score in (
+                _objective(a, d, factors, ranges, costs, counts, 192.0)
+                for a in itertools.product(range(k + 1), repeat=n)
+            ) if score is not None
+        )
+        assert _objective(solved, d, factors, ranges, costs, counts, 192.0) == best, (d, factors, counts)
+
+    # The 71.81 km route saves most on the only vehicle
+    solved = solve_assignment(np.array([50.0, 50.0, 71.81]), np.array([17.16]), np.array([800.0]),
+                              np.array([1.0]), np.array([1]), 192.0)
+    assert solved.tolist() == [1, 1, 0], solved
+    print("✓ 400 random instances match exhaustive search")
+
+def test_respects_inventory_and_range():
+    """Test that counts and ranges hold and EVs go where they save most"""
+    print("\n--- Testing Inventory Limits ---")
+
+    distances = [20, 40, 60, 250, 400, 900]
+    result = assign_fleet(distances, [
+        {"vehicle_type": "ev", "count": 2},
+        {"vehicle_type": "hybrid", "count": 2},
+        {"vehicle_type": "diesel", "count": 1}
+    ])
+
+    # EVs take the longest routes within their range; the shortest route is
+    # is left over since uncovered routes cost more to outsource the longer they are
+    assert result["vehicle"] == [None, "hybrid", "ev", "ev", "hybrid", "diesel"]
+    assert [g["assigned"] for g in result["groups"]] == [2, 2, 1]
+    assert result["unassigned_routes"] == 1
+    assert result["overbooked_by_isolated"] == {"ev": 2}
+    assert result["emissions_grams"][0] == 0 and result["emissions_saved_grams"] > 0
+    print(f"✓ {result['vehicle']}")
+
+def test_scales_to_thousands_of_routes():
+    """Test that a hub-sized batch needs little search work per route"""
+    print("\n--- Testing Performance ---")
+
+    rng = np.random.default_rng(4)
+    distances = rng.uniform(1, 1000, 5000)
+    groups = compile_inventory([
+        {"vehicle_type": "ev", "count": 800},
+        {"vehicle_type": "ev", "name": "ev_long_range", "count": 200, "max_range_km": 500},
+        {"vehicle_type": "hybrid", "count": 1500},
+        {"vehicle_type": "diesel", "count": 3000}
+    ])
+    counters = {}
+    start = time.perf_counter()
+    columns = ("emission_factor", "max_range_km", "cost_factor", "count")
+    assignment = solve_assignment(distances, *(np.array([g[c] for g in groups]) for c in columns), 192.0, counters)
+    elapsed = time.perf_counter() - start
+
+    n, k = len(distances), len(groups)
+    assert (assignment < k).all()
+    # Few Bellman-Ford passes and short reassignment chains per route
+    assert counters["passes"] <= 3 * n, counters
+    assert counters["heap_pushes"] <= 2 * k * n and counters["heap_pops"] <= counters["heap_pushes"], counters
+    if BENCHMARKS:
+        assert elapsed < 5, f"5000 routes took {elapsed:.2f}s"
+    print(f"✓ 5000 routes assigned in {elapsed:.2f}s, {counters['passes']} passes, {counters['heap_pops']} heap pops")
+
+def test_invalid_inventory():
+    """Test that unknown vehicle types and bad counts are rejected"""
+    print("\n--- Testing Invalid Inventory ---")
+
+    for inventory in ([{"vehicle_type": "rocket", "count": 1}], [{"vehicle_type": "ev", "count": -1}],
+                      [{"vehicle_type": "ev", "count": 1}, {"vehicle_type": "ev", "count": 2}]):
+        try:
+            assign_fleet([10], inventory)
+            assert False, f"{inventory} should be rejected"
+        except ValueError:
+            pass
+    print("✓ Invalid inventories rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Fleet Assignment Test")
+    print("=" * 40)
+
+    try:
+        test_matches_exhaustive_search()
+        test_respects_inventory_and_range()
+        test_scales_to_thousands_of_routes()
+        test_invalid_inventory()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the multimodal freight network planner
+"""
+
+import sys
+import os
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from freight_network import FreightNetwork, get_freight_network
+    from hub_matrix import load_hubs
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported freight_network")
+except ImportError as e:
+    print(f"✗ Failed to import freight_network: {e}")
+    sys.exit(1)
+
+# Two rail yards joined by rail and by a slower, cleaner waterway via a port
+SMALL_NETWORK = {
+    "version": "test",
+    "circuity": {"heavy_truck": 1.0, "rail_freight": 1.0, "ship_barge": 1.0},
+    "access_max_km": 50,
+    "access_max_terminals": 2,
+    "transfer": {"duration_min": 60, "handling_grams": 100},
+    "terminals": [
+        {"id": "A", "name": "Yard A", "coordinates": [77.0, 20.0], "modes": ["rail_freight", "ship_barge"]},
+        {"id": "B", "name": "Yard B", "coordinates": [81.0, 20.0], "modes": ["rail_freight"]},
+        {"id": "P", "name": "Port P", "coordinates": [80.9, 20.0], "modes": ["rail_freight", "ship_barge"]}
+    ],
+    "links": [
+        {"from": "A", "to": "B", "mode": "rail_freight"},
+        {"from": "A", "to": "P", "mode": "ship_barge"},
+        {"from": "P", "to": "B", "mode": "rail_freight"}
+    ]
+}
+
+def _dominates(a, b):
+    return a[0] <= b[0] and a[1] <= b[1] and a != b
+
+def test_pareto_front():
+    """Test that the front is sorted, non-dominated and bracketed by the two picks"""
+    print("\n--- Testing Pareto Front ---")
+
+    network = FreightNetwork(SMALL_NETWORK)
+    plan = network.plan([76.9, 20.0], [81.1, 20.0])
+    front = [(p["emissions_grams"], p["duration_min"]) for p in plan["pareto_front"]]
+
+    assert len(front) >= 2, "Rail, barge and truck should trade off emissions and time"
+    assert front == sorted(front), "Front should be ordered by emissions"
+    assert not any(_dominates(a, b) for a in front for b in front)
+    assert plan["lowest_emission"] is plan["pareto_front"][0]
+    assert plan["fastest"] is plan["pareto_front"][-1]
+    assert "ship_barge" in plan["lowest_emission"]["modes"]
+    assert plan["lowest_emission"]["emissions_grams"] < plan["truck_only"]["emissions_grams"]
+    print(f"✓ {len(front)} Pareto paths: {front}")
+
+def test_legs_add_up():
+    """Test that leg-by-leg values sum to the path totals"""
+    print("\n--- Testing Leg Breakdown ---")
+
+    network = FreightNetwork(SMALL_NETWORK)
+    path = network.plan([76.9, 20.0], [81.1, 20.0])["lowest_emission"]
+    legs = path["legs"]
+    travel = [leg for leg in legs if leg["type"] == "leg"]
+
+    assert legs[0]["from"] == "origin" and legs[-1]["to"] == "destination"
+    assert path["transfers"] == len(legs) - len(travel) > 0
+    assert abs(sum(leg["emissions_grams"] for leg in legs) - path["emissions_grams"]) < 0.01
+    assert abs(sum(leg["duration_min"] for leg in legs) - path["duration_min"]) < 0.05
+    # Consecutive legs meet at the same place
+    for previous, leg in zip(travel, travel[1:]):
+        assert previous["to"] == leg["from"]
+    print(f"✓ {len(travel)} legs, {path['transfers']} transfers, {path['emissions_grams']}g")
+
+def test_out_of_network_falls_back_to_truck():
+    """Test that points far from every terminal still get a truck-only plan"""
+    print("\n--- Testing Truck Fallback ---")
+
+    network = FreightNetwork(SMALL_NETWORK)
+    plan = network.plan([70.0, 30.0], [71.0, 30.0])
+    assert len(plan["pareto_front"]) == 1
+    assert plan["lowest_emission"]["modes"] == ["heavy_truck"]
+    assert plan["lowest_emission"]["emissions_grams"] == plan["truck_only"]["emissions_grams"]
+    print("✓ Truck-only plan returned outside the network")
+
+def test_inland_route_avoids_barge():
+    """Test that an inland lane is not sent by barge on the shipped network"""
+    print("\n--- Testing Shipped Network ---")
+
+    network = get_freight_network()
+    hubs = {hub["region"]: hub["coordinates"] for hub in load_hubs()}
+    plan = network.plan(hubs["Delhi"], hubs["Nagpur"])
+    assert plan["lowest_emission"]["modes"] == ["heavy_truck", "rail_freight"]
+    assert plan["lowest_emission"]["percent_emissions_saved"] > 50
+
+    # Few non-dominated labels per state: the search stays near linear in
+    # the network size
+    states = network.stats()["states"]
+    start = time.perf_counter()
+    settled = [network.plan(source, destination)["labels_settled"]
+               for source in hubs.values() for destination in hubs.values()]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(settled)
+    assert max(settled) <= 4 * (states + 1), f"A plan settled {max(settled)} labels for {states} states"
+    if BENCHMARKS:
+        assert elapsed_ms < 20, f"Average plan took {elapsed_ms:.1f}ms"
+    print(f"✓ Delhi -> Nagpur by rail; at most {max(settled)} labels, average plan {elapsed_ms:.2f}ms")
+
+def test_invalid_network():
+    """Test that links to unknown terminals are rejected"""
+    print("\n--- Testing Invalid Network ---")
+
+    broken = {**SMALL_NETWORK, "links": [{"from": "A", "to": "Z", "mode": "rail_freight"}]}
+    try:
+        FreightNetwork(broken)
+        assert False, "Unknown terminal should be rejected"
+    except ValueError:
+        pass
+    print("✓ Invalid network rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Freight Network Test")
+    print("=" * 40)
+
+    try:
+        test_pareto_front()
+        test_legs_add_up()
+        test_out_of_network_falls_back_to_truck()
+        test_inland_route_avoids_barge()
+        test_invalid_network()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed hub-to-hub matrix
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from hub_matrix import HubMatrix, load_hubs, estimate_hub_matrix
+    from fleet_emissions import mock_freight_route
+    print("✓ Successfully imported hub_matrix")
+except ImportError as e:
+    print(f"✗ Failed to import hub_matrix: {e}")
+    sys.exit(1)
+
+def test_estimate_matches_freight_model():
+    """Test that estimated distances follow the haversine freight model"""
+    print("\n--- Testing Estimated Matrix ---")
+    
+    hubs = load_hubs()
+    matrix = estimate_hub_matrix(hubs, circuity=1.0)
+    
+    route = matrix.lookup(hubs[0]["name"], hubs[1]["name"])
+    expected = mock_freight_route(hubs[0]["coordinates"], hubs[1]["coordinates"], "heavy_truck")
+    assert abs(route["distance_km"] - expected["distance_km"]) < 0.05, "Distance should match mock_freight_route"
+    assert abs(route["duration_min"] - expected["duration_min"]) < 0.2, "Duration should match truck speed"
+    # Emissions use the unrounded distance, so allow for the 0.005 km display rounding
+    assert abs(route["emissions_by_mode"]["heavy_truck"] - route["distance_km"] * 550) <= 550 * 0.005
+    assert route["recommended_mode"] == "ship_barge"
+    assert matrix.lookup("0", "0")["distance_km"] == 0.0
+    print(f"✓ {route['source']} -> {route['destination']}: {route['distance_km']} km")
+
+def test_binary_round_trip():
+    """Test saving and memory-mapping the binary file"""
+    print("\n--- Testing Binary File Round Trip ---")
+    
+    hubs = load_hubs()
+    matrix = estimate_hub_matrix(hubs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hub_matrix.bin")
+        matrix.save(path)
+        loaded = HubMatrix.load(path)
+        
+        assert len(loaded) == len(hubs)
+        assert (loaded.distances_km == matrix.distances_km).all()
+        assert loaded.lookup(hubs[2]["name"], hubs[5]["name"]) == matrix.lookup(hubs[2]["name"], hubs[5]["name"])
+        size = os.path.getsize(path)
+        del loaded
+    print(f"✓ {len(hubs)}x{len(hubs)} matrix round-tripped through a {size}-byte file")
+    
+    try:
+        matrix.lookup("Unknown Hub", hubs[0]["name"])
+        assert False, "Unknown hub should raise"
+    except KeyError:
+        print("✓ Unknown hubs rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Hub Matrix Test")
+    print("=" * 40)
+    
+    try:
+        test_estimate_matches_freight_model()
+        test_binary_round_trip()
+        
+        print("\n" + "=" * 40)
+        print("✓ All hub matrix tests completed successfully!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the local road-graph routing backend
+"""
+
+import sys
+import os
+import csv
+import random
+import heapq
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from local_router import RoadGraph
+    print("✓ Successfully imported local_router")
+except ImportError as e:
+    print(f"✗ Failed to import local_router: {e}")
+    sys.exit(1)
+
+def build_grid_csv(path, size=12, seed=7):
+    """Write a size x size street grid around Bangalore with random speeds"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "source_lng", "source_lat", "target_lng", "target_lat", "speed_kmh", "oneway"])
+        for i in range(size):
+            for j in range(size):
+                for di, dj in ((1, 0), (0, 1)):
+                    ni, nj = i + di, j + dj
+                    if ni >= size or nj >= size:
+                        continue
+                    writer.writerow([
+                        f"n{i}_{j}", f"n{ni}_{nj}",
+                        77.60 + i * 0.005, 12.90 + j * 0.005,
+                        77.60 + ni * 0.005, 12.90 + nj * 0.005,
+                        rng.choice([20, 30, 50, 80]),
+                        "false"
+                    ])
+
+def reference_duration(graph, source, target):
+    """Plain Dijkstra used as ground truth"""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == target:
+            return d
+        if d > dist[u]:
+            continue
+        for v, (duration, _) in graph.out_edges[u].items():
+            if d + duration < dist.get(v, float("inf")):
+                dist[v] = d + duration
+                heapq.heappush(heap, (d + duration, v))
+    return None
+
+def load_graph():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "road_graph.csv")
+        build_grid_csv(path)
+        return RoadGraph.from_edge_list(path)
+
+def test_search_algorithms_agree():
+    """Test A*, bidirectional Dijkstra and CH against plain Dijkstra"""
+    print("\n--- Testing Shortest Path Algorithms ---")
+    
+    graph = load_graph()
+    plain = load_graph()
+    graph.contract()
+    rng = random.Random(1)
+    n = len(graph.node_coords)
+    
+    for _ in range(40):
+        s, t = rng.randrange(n), rng.randrange(n)
+        expected = reference_duration(graph, s, t)
+        for name, path in (
+            ("astar", graph.astar(s, t)),
+            ("bidirectional", plain.bidirectional_dijkstra(s, t)),
+            ("contraction hierarchy", graph.shortest_path(s, t))
+        ):
+            assert path[0] == s and path[-1] == t, f"{name} path should connect endpoints"
+            duration = graph.path_cost(path)[0]
+            assert abs(duration - expected) < 1e-6, f"{name} should find the fastest path"
+    print("✓ A*, bidirectional Dijkstra and CH match plain Dijkstra on 40 queries")
+
+def test_route_feature_collection():
+    """Test the ORS-shaped FeatureCollection with alternatives"""
+    print("\n--- Testing Route Output Shape ---")
+    
+    graph = load_graph()
+    routes = graph.route([77.6001, 12.9002], [77.6549, 12.9551], {"share_factor": 0.6, "target_count": 3})
+    
+    assert routes["type"] == "FeatureCollection"
+    assert 1 <= len(routes["features"]) <= 3
+    durations = [f["properties"]["summary"]["duration"] for f in routes["features"]]
+    assert durations[0] == min(durations), "First route should be the fastest"
+    for feature in routes["features"]:
+        assert feature["geometry"]["type"] == "LineString"
+        assert feature["properties"]["summary"]["distance"] > 0
+    print(f"✓ Returned {len(routes['features'])} routes with durations {durations}")
+    
+    try:
+        graph.route([10.0, 10.0], [77.6549, 12.9551])
+        assert False, "Far-away points should be rejected"
+    except RuntimeError:
+        print("✓ Points off the road graph are rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Local Router Test")
+    print("=" * 40)
+    
+    try:
+        test_search_algorithms_agree()
+        test_route_feature_collection()
+        
+        print("\n" + "=" * 40)
+        print("✓ All local router tests completed successfully!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
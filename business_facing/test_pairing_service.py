@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for the live reverse-logistics pairing service
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from pairing_service import PairingService, PAIRING_AUGMENT_MAX_VISITS
+    from reverse_logistics import haversine_distance
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported pairing_service")
+except ImportError as e:
+    print(f"✗ Failed to import pairing_service: {e}")
+    sys.exit(1)
+
+def _event(op, kind, item_id, lat=None, lon=None):
+    event = {"op": op, "kind": kind, "id": item_id}
+    if lat is not None:
+        event.update(lat=lat, lon=lon)
+    return event
+
+def _assert_maximal(plan):
+    """Every pair is within 3 km and no free delivery is within 3 km of a free return"""
+    for pair in plan["paired_routes"]:
+        assert haversine_distance(*pair["delivery_coords"], *pair["return_coords"]) <= 3.0
+    for delivery in plan["unpaired_deliveries"]:
+        for return_item in plan["unpaired_returns"]:
+            assert haversine_distance(delivery["lat"], delivery["lon"], return_item["lat"], return_item["lon"]) > 3.0
+
+def test_remove_frees_partner():
+    """Removing a paired item lets its partner pair with the next closest item"""
+    print("\nTesting re-pairing after removal...")
+    service = PairingService()
+    service.apply([
+        _event("add", "delivery", "d1", 12.9716, 77.6413),
+        _event("add", "return", "r1", 12.9750, 77.6450),
+        _event("add", "return", "r2", 12.9800, 77.6500),
+    ])
+    plan = service.plan()
+    assert [(p["delivery_id"], p["return_id"]) for p in plan["paired_routes"]] == [("d1", "r1")]
+
+    result = service.apply([_event("remove", "return", "r1"), _event("remove", "return", "missing")])
+    assert result["applied"] == 1 and result["ignored"] == 1
+    assert result["pairs_broken"] == [{"delivery_id": "d1", "return_id": "r1"}]
+    assert result["pairs_formed"] == [{"delivery_id": "d1", "return_id": "r2"}]
+    print("✓ Partner re-paired, unknown removal ignored")
+
+def test_augmenting_path():
+    """A new item can take a paired neighbour whose partner moves to a free item"""
+    print("\nTesting augmenting path on insert...")
+    service = PairingService()
+    # d1 sits between r1 (close) and r2 (2.2 km east); d2 only reaches r1
+    service.apply([
+        _event("add", "return", "r1", 12.9700, 77.6000),
+        _event("add", "delivery", "d1", 12.9700, 77.6050),
+        _event("add", "return", "r2", 12.9700, 77.6250),
+    ])
+    assert service.plan()["total_pairs"] == 1
+    service.apply([_event("add", "delivery", "d2", 12.9700, 77.5800)])
+    pairs = {(p["delivery_id"], p["return_id"]) for p in service.plan()["paired_routes"]}
+    assert pairs == {("d2", "r1"), ("d1", "r2")}, pairs
+    print("✓ Both deliveries paired after one move")
+
+def test_invariant_under_random_events():
+    """Random adds, updates and removes keep the pairing valid and maximal"""
+    print("\nTesting random event stream...")
+    service = PairingService()
+    rng = random.Random(3)
+    live = {"delivery": set(), "return": set()}
+    for step in range(2000):
+        kind = rng.choice(["delivery", "return"])
+        roll = rng.random()
+        if roll < 0.6 or not live[kind]:
+            item_id = f"{kind[0]}{step}"
+            service.apply([_event("add", kind, item_id, 12.97 + rng.uniform(-0.1, 0.1), 77.59 + rng.uniform(-0.1, 0.1))])
+            live[kind].add(item_id)
+        elif roll < 0.8:
+            item_id = rng.choice(sorted(live[kind]))
+            service.apply([_event("remove", kind, item_id)])
+            live[kind].remove(item_id)
+        else:
+            item_id = rng.choice(sorted(live[kind]))
+            service.apply([_event("update", kind, item_id, 12.97 + rng.uniform(-0.1, 0.1), 77.59 + rng.uniform(-0.1, 0.1))])
+        if step % 250 == 0:
+            _assert_maximal(service.plan())
+    plan = service.plan()
+    _assert_maximal(plan)
+    assert plan["total_deliveries"] == len(live["delivery"])
+    assert plan["total_returns"] == len(live["return"])
+    print(f"✓ {plan['total_pairs']} pairs after 2000 events")
+
+def test_malformed_batch_is_rejected():
+    """A bad event rejects the whole batch"""
+    print("\nTesting event validation...")
+    service = PairingService()
+    for bad in (_event("move", "delivery", "d1", 1.0, 1.0),
+                _event("add", "parcel", "d1", 1.0, 1.0),
+                _event("add", "delivery", "d1"),
+                _event("add", "delivery", "d1", 91.0, 1.0)):
+        try:
+            service.apply([_event("add", "return", "r1", 1.0, 1.0), bad])
+            assert False, f"Accepted {bad}"
+        except ValueError:
+            pass
+    assert service.stats()["returns"] == 0
+    print("✓ Malformed events rejected before anything is applied")
+
+def test_event_speed():
+    """Single events stay cheap with a city's worth of open items, sparse or saturated"""
+    print("\nTesting per-event speed...")
+    service = PairingService()
+    rng = random.Random(1)
+    point = lambda: (19.07 + rng.uniform(-0.25, 0.25), 72.88 + rng.uniform(-0.25, 0.25))
+    service.apply([_event("add", "delivery", f"d{i}", *point()) for i in range(20000)]
+                  + [_event("add", "return", f"r{i}", *point()) for i in range(5000)])
+
+    checked = service.candidates_checked
+    start = time.perf_counter()
+    for k in range(500):
+        service.apply([_event("add", "return", f"x{k}", *point())])
+        service.apply([_event("remove", "delivery", f"d{k}")])
+    per_event_ms = (time.perf_counter() - start) / 1000 * 1000
+    per_event_checked = (service.candidates_checked - checked) / 1000
+    _assert_maximal(service.plan())
+    assert per_event_checked < 500, f"{per_event_checked:.0f} candidates checked per event"
+    if BENCHMARKS:
+        assert per_event_ms < 20, f"{per_event_ms:.1f}ms per event"
+    print(f"✓ {per_event_ms:.2f}ms, {per_event_checked:.0f} candidates per event with "
+          f"{service.stats()['deliveries']} deliveries")
+
+    # Every delivery in a small area paired: new returns find no free
+    # delivery, and nothing can be displaced to make room
+    service = PairingService()
+    dense = lambda: (19.07 + rng.uniform(-0.1, 0.1), 72.88 + rng.uniform(-0.1, 0.1))
+    service.apply([_event("add", "delivery", f"d{i}", *dense()) for i in range(3000)]
+                  + [_event("add", "return", f"r{i}", *dense()) for i in range(3000)])
+    checked = service.candidates_checked
+    start = time.perf_counter()
+    for k in range(500):
+        service.apply([_event("add", "return", f"x{k}", *dense())])
+        service.apply([_event("remove", "return", f"x{k}")])
+    per_event_ms = (time.perf_counter() - start) / 1000 * 1000
+    per_event_checked = (service.candidates_checked - checked) / 1000
+    _assert_maximal(service.plan())
+    assert per_event_checked < 2 * PAIRING_AUGMENT_MAX_VISITS, f"{per_event_checked:.0f} candidates checked per event"
+    if BENCHMARKS:
+        assert per_event_ms < 5, f"{per_event_ms:.1f}ms per event"
+    print(f"✓ Saturated: {per_event_ms:.2f}ms, {per_event_checked:.0f} candidates per event")
+
+if __name__ == "__main__":
+    print("RouteZero Pairing Service Test")
+    print("=" * 40)
+
+    try:
+        test_remove_frees_partner()
+        test_augmenting_path()
+        test_invariant_under_random_events()
+        test_malformed_batch_is_rejected()
+        test_event_speed()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for capacity-constrained return bundling
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from return_bundling import bundle_reverse_pickups, bundle_returns, BUNDLE_CANDIDATE_STOPS
+    from reverse_logistics import haversine_distance, optimize_reverse_pickup
+    from conftest import BENCHMARKS, random_points
+    print("✓ Successfully imported return_bundling")
+except ImportError as e:
+    print(f"✗ Failed to import return_bundling: {e}")
+    sys.exit(1)
+
+HUBS = [{"name": "Test Hub", "region": "Bangalore", "coordinates": [77.5946, 12.9716]}]
+
+def _loop_km(bundle):
+    points = [bundle["delivery_coords"]] + bundle["return_coords"] + [bundle["delivery_coords"]]
+    return sum(haversine_distance(*a, *b) for a, b in zip(points, points[1:]))
+
+def _check_feasible(result, deliveries, returns, volume, weight):
+    """Each return once, within 3 km of its stop, loads within capacity and detours as reported"""
+    stops = {d["id"]: d for d in deliveries}
+    sizes = {r["id"]: r for r in returns}
+    seen = set()
+    loads = {}
+    for bundle in result["bundles"]:
+        stop = stops[bundle["delivery_id"]]
+        for return_id in bundle["return_ids"]:
+            assert return_id not in seen
+            seen.add(return_id)
+            item = sizes[return_id]
+            assert haversine_distance(stop["lat"], stop["lon"], item["lat"], item["lon"]) <= 3.0
+        route = bundle["route_id"] if bundle["route_id"] is not None else ("stop", bundle["delivery_id"])
+        load = loads.setdefault(route, [0.0, 0.0])
+        load[0] += bundle["volume_l"]
+        load[1] += bundle["weight_kg"]
+        assert abs(_loop_km(bundle) - bundle["distance_km"]) < 0.01
+    for load in loads.values():
+        assert load[0] <= volume + 1e-6 and load[1] <= weight + 1e-6, load
+    assert result["bundled_returns"] == result["trips_avoided"] == len(seen)
+    assert {r["id"] for r in result["unpaired_returns"]} == {r["id"] for r in returns} - seen
+
+def test_cluster_on_one_stop():
+    """A van passing a cluster of returns picks them all up"""
+    print("\nTesting a return cluster around one stop...")
+    deliveries = [{"id": "d1", "lat": 12.9716, "lon": 77.6413}]
+    returns = [{"id": f"r{k}", "lat": 12.9716 + 0.002 * k, "lon": 77.6413 + 0.001 * k} for k in range(1, 6)]
+    assert optimize_reverse_pickup(deliveries, returns)["total_pairs"] == 1
+
+    result = bundle_reverse_pickups(deliveries, returns, hubs=HUBS)
+    assert result["total_bundles"] == 1
+    assert sorted(result["bundles"][0]["return_ids"]) == [r["id"] for r in returns]
+    assert result["trips_avoided"] == 5
+    assert result["km_avoided"] > 0 and result["baseline_km"] > result["total_distance_km"]
+    _check_feasible(result, deliveries, returns, 600, 250)
+
+    # Only two 20 L returns fit in 45 L
+    small = bundle_reverse_pickups(deliveries, returns, vehicle={"volume_l": 45}, hubs=HUBS)
+    assert small["bundled_returns"] == 2 and len(small["unpaired_returns"]) == 3
+    print(f"✓ 5 returns on one stop, {result['km_avoided']} km avoided; 2 fit in a small van")
+
+def test_route_shares_capacity():
+    """Stops on one route share a vehicle; stops without a route do not"""
+    print("\nTesting shared route capacity...")
+    deliveries = [
+        {"id": "d1", "lat": 12.9700, "lon": 77.6000, "route_id": "van-1"},
+        {"id": "d2", "lat": 12.9900, "lon": 77.6200, "route_id": "van-1"},
+        {"id": "d3", "lat": 12.9900, "lon": 77.6000},
+    ]
+    returns = [
+        {"id": "r1", "lat": 12.9705, "lon": 77.6005, "weight_kg": 30},
+        {"id": "r2", "lat": 12.9905, "lon": 77.6205, "weight_kg": 30},
+        {"id": "r3", "lat": 12.9905, "lon": 77.6005, "weight_kg": 30},
+    ]
+    result = bundle_reverse_pickups(deliveries, returns, vehicle={"weight_kg": 40}, hubs=HUBS)
+    bundled = {r for bundle in result["bundles"] for r in bundle["return_ids"]}
+    assert "r3" in bundled and len(bundled & {"r1", "r2"}) == 1, bundled
+    assert result["routes"][0]["route_id"] == "van-1" and result["routes"][0]["weight_utilization"] == 75.0
+    _check_feasible(result, deliveries, returns, 600, 40)
+
+    for bad in ({"volume_l": 0}, {"weight_kg": -1}, {"volume_l": "big"}):
+        try:
+            bundle_reverse_pickups(deliveries, returns, vehicle=bad, hubs=HUBS)
+            assert False, f"Accepted vehicle {bad}"
+        except ValueError:
+            pass
+    print("✓ One of two returns on the shared route, invalid capacities rejected")
+
+def test_random_batches_are_feasible():
+    """Random batches respect capacity and never detour more than separate round trips"""
+    print("\nTesting random batches...")
+    rng = random.Random(2)
+    for trial in range(30):
+        deliveries = random_points(rng, "d", rng.randint(1, 60), 12.97, 77.59, 0.05)
+        for delivery in deliveries:
+            if rng.random() < 0.5:
+                delivery["route_id"] = f"van-{rng.randint(1, 5)}"
+        returns = random_points(rng, "r", rng.randint(1, 80), 12.97, 77.59, 0.05)
+        for return_item in returns:
+            return_item["volume_l"] = rng.choice([5, 20, 60])
+            return_item["weight_kg"] = rng.uniform(0.5, 15)
+        volume, weight = rng.choice([(100, 40), (600, 250)])
+        result = bundle_reverse_pickups(deliveries, returns, vehicle={"volume_l": volume, "weight_kg": weight},
+                                        hubs=HUBS)
+        _check_feasible(result, deliveries, returns, volume, weight)
+
+        # With room to spare, every return near some stop is bundled, and no
+        # more detour than a round trip from its nearest stop
+        roomy = bundle_reverse_pickups(deliveries, returns, vehicle={"volume_l": 1e6, "weight_kg": 1e6}, hubs=HUBS)
+        nearest = [min(haversine_distance(d["lat"], d["lon"], r["lat"], r["lon"]) for d in deliveries) for r in returns]
+        assert roomy["bundled_returns"] == sum(km <= 3.0 for km in nearest)
+        assert roomy["total_distance_km"] <= 2 * sum(km for km in nearest if km <= 3.0) + 0.01
+    print("✓ Capacity and radius respected in 30 random trials")
+
+def test_city_scale():
+    """20k deliveries and 5k returns bundle with work proportional to the candidate stops"""
+    print("\nTesting city-scale input...")
+    rng = random.Random(9)
+    deliveries = random_points(rng, "d", 20000, 19.07, 72.88, 0.25)
+    returns = random_points(rng, "r", 5000, 19.07, 72.88, 0.25)
+    counters = {}
+    start = time.perf_counter()
+    bundles = bundle_returns(deliveries, returns, counters=counters)
+    elapsed = time.perf_counter() - start
+
+    bundled = sum(len(picked) for _, picked, _ in bundles)
+    candidates = BUNDLE_CANDIDATE_STOPS * len(returns)
+    assert bundled > 4500
+    # One costing per candidate stop for construction and each relocate pass
+    assert counters["insertions"] <= (counters["passes"] + 2) * candidates, counters
+    assert counters["heap_pops"] <= 2 * candidates, counters
+    if BENCHMARKS:
+        assert elapsed < 20, f"Bundling took {elapsed:.1f}s"
+    print(f"✓ {bundled} returns on {len(bundles)} stops in {elapsed:.2f}s, "
+          f"{counters['insertions']} insertions costed")
+
+if __name__ == "__main__":
+    print("RouteZero Return Bundling Test")
+    print("=" * 40)
+
+    try:
+        test_cluster_on_one_stop()
+        test_route_shares_capacity()
+        test_random_batches_are_feasible()
+        test_city_scale()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
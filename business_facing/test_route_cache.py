@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the route result cache
+"""
+
+import sys
+import os
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from route_cache import RouteCache, make_route_key, quantize_coordinates
+    print("✓ Successfully imported route_cache")
+except ImportError as e:
+    print(f"✗ Failed to import route_cache: {e}")
+    sys.exit(1)
+
+ALTERNATIVES = {"share_factor": 0.6, "target_count": 3}
+
+def test_key_quantization():
+    """Test that nearby coordinates share a key and settings do not"""
+    print("\n--- Testing Key Quantization ---")
+    
+    assert quantize_coordinates([77.64131, 12.97162], 3) == (77.641, 12.972)
+    
+    key_a = make_route_key([77.64131, 12.97162], [72.8777, 19.0760], "driving-car", ALTERNATIVES, 3)
+    key_b = make_route_key([77.64129, 12.97158], [72.8777, 19.0760], "driving-car", ALTERNATIVES, 3)
+    assert key_a == key_b, "Coordinates within precision should share a key"
+    print("✓ Nearby coordinates share a key")
+    
+    key_profile = make_route_key([77.64131, 12.97162], [72.8777, 19.0760], "driving-hgv", ALTERNATIVES, 3)
+    key_alts = make_route_key([77.64131, 12.97162], [72.8777, 19.0760], "driving-car", None, 3)
+    assert key_a != key_profile, "Profile should be part of the key"
+    assert key_a != key_alts, "Alternative settings should be part of the key"
+    print("✓ Profile and alternatives are part of the key")
+
+def test_ttl_expiry():
+    """Test that entries expire after their TTL"""
+    print("\n--- Testing TTL Expiry ---")
+    
+    cache = RouteCache(max_entries=10, ttl_s=0.05)
+    cache.set("k", {"features": []})
+    assert cache.get("k") == {"features": []}, "Fresh entry should hit"
+    time.sleep(0.06)
+    assert cache.get("k") is None, "Expired entry should miss"
+    assert cache.stats()["expirations"] == 1
+    print("✓ Entries expire after TTL")
+
+def test_lru_eviction_and_counters():
+    """Test LRU eviction order and hit/miss counters"""
+    print("\n--- Testing LRU Eviction ---")
+    
+    cache = RouteCache(max_entries=2, ttl_s=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")        # "a" becomes most recently used
+    cache.set("c", 3)     # evicts "b"
+    
+    assert cache.get("b") is None, "Least recently used entry should be evicted"
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    print(f"✓ LRU eviction and counters correct: {stats}")
+
+if __name__ == "__main__":
+    print("RouteZero Route Cache Test")
+    print("=" * 40)
+    
+    try:
+        test_key_quantization()
+        test_ttl_expiry()
+        test_lru_eviction_and_counters()
+        
+        print("\n" + "=" * 40)
+        print("✓ All route cache tests completed successfully!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
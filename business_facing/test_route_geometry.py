@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for route geometry slimming
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from route_geometry import douglas_peucker, encode_polyline, decode_polyline, shape_feature
+    from route_handler import optimize_route_response
+    print("✓ Successfully imported route_geometry")
+except ImportError as e:
+    print(f"✗ Failed to import route_geometry: {e}")
+    sys.exit(1)
+
+def test_polyline_round_trip():
+    """Test encoding against the reference Google polyline example"""
+    print("\n--- Testing Encoded Polyline ---")
+    
+    coords = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+    encoded = encode_polyline(coords)
+    assert encoded == "_p~iF~ps|U_ulLnnqC_mqNvxq`@", f"Unexpected encoding: {encoded}"
+    assert decode_polyline(encoded) == coords, "Decoding should round-trip"
+    print(f"✓ Encoded polyline: {encoded}")
+
+def test_douglas_peucker():
+    """Test that near-collinear points are dropped and corners kept"""
+    print("\n--- Testing Douglas-Peucker Simplification ---")
+    
+    # Straight line east with 1 m jitter, then a right-angle turn north
+    line = [[77.60 + i * 0.001, 12.90 + (0.000009 if i % 2 else 0)] for i in range(11)]
+    line += [[77.61, 12.90 + i * 0.001] for i in range(1, 11)]
+    simplified = douglas_peucker(line, tolerance_m=5)
+    
+    assert simplified == [line[0], line[10], line[-1]], f"Expected endpoints and corner, got {simplified}"
+    assert douglas_peucker(line, tolerance_m=0) == line, "Zero tolerance keeps every point"
+    print(f"✓ Simplified {len(line)} points to {len(simplified)}")
+
+def test_response_slimming():
+    """Test that each geometry mode keeps only what it needs"""
+    print("\n--- Testing Response Slimming ---")
+    
+    coords = [[77.60 + i * 0.001, 12.90] for i in range(50)]
+    geojson = {"type": "FeatureCollection", "features": [{
+        "type": "Feature",
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "properties": {"summary": {"distance": 5400.0, "duration": 600.0}, "segments": [{"steps": []}]}
+    }]}
+    
+    none = optimize_route_response(geojson, "none")["features"][0]
+    assert none["geometry"] is None and none["properties"] == {"summary": {"distance": 5400.0, "duration": 600.0}}
+    
+    simplified = optimize_route_response(geojson, "simplified", 5)["features"][0]
+    assert simplified["geometry"]["coordinates"] == [coords[0], coords[-1]]
+    
+    polyline = optimize_route_response(geojson, "polyline")["features"][0]
+    assert decode_polyline(polyline["properties"]["polyline"]) == [[round(c[0], 5), c[1]] for c in coords]
+    
+    # ORS "json" format already carries an encoded polyline
+    ors_json = {"routes": [{"summary": {"distance": 5400.0, "duration": 600.0}, "geometry": "_p~iF~ps|U"}]}
+    passthrough = optimize_route_response(ors_json, "polyline")["features"][0]
+    assert passthrough["properties"]["polyline"] == "_p~iF~ps|U"
+    assert optimize_route_response(ors_json, "none")["features"][0]["properties"] == {"summary": {"distance": 5400.0, "duration": 600.0}}
+    print("✓ Geometry modes keep only the requested data")
+
+if __name__ == "__main__":
+    print("RouteZero Route Geometry Test")
+    print("=" * 40)
+    
+    try:
+        test_polyline_round_trip()
+        test_douglas_peucker()
+        test_response_slimming()
+        
+        print("\n" + "=" * 40)
+        print("✓ All route geometry tests completed successfully!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
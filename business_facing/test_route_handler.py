@@ -5,13 +5,19 @@ Test script for the refactored route_handler.py
 
 import sys
 import os
+import time
+import asyncio
+import threading
 from typing import List
 
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from route_handler import get_routes_safe, validate_coordinates
+    import httpx
+    import route_handler
+    from route_handler import get_routes_safe, get_routes_safe_async, validate_coordinates
+    from route_handler import plan_matrix_chunks, get_route_matrix_async
     print("✓ Successfully imported route_handler")
 except ImportError as e:
     print(f"✗ Failed to import route_handler: {e}")
@@ -106,6 +112,310 @@ def test_error_handling():
     else:
         print("✗ Should have handled empty coordinates")
 
+def _mock_ors_client(handler):
+    """Install a pooled async client backed by an in-process mock transport"""
+    route_handler.route_cache.clear()
+    route_handler.routing_breaker.reset()
+    route_handler.directions_scheduler.reset()
+    route_handler.matrix_scheduler.reset()
+    if route_handler.route_store.route_store is not None:
+        route_handler.route_store.route_store.clear()
+    route_handler._async_client = httpx.AsyncClient(
+        base_url="https://ors.test",
+        transport=httpx.MockTransport(handler)
+    )
+
+def test_async_routes_concurrent():
+    """Test that concurrent async lookups overlap instead of queueing"""
+    print("\n--- Testing Async Route Concurrency ---")
+    
+    async def handler(request):
+        await asyncio.sleep(0.2)  # Simulated upstream latency
+        return httpx.Response(200, json={
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": [[2.35, 48.85], [3.37, 43.29]]},
+                "properties": {"summary": {"distance": 750000.0, "duration": 27000.0}, "segments": []}
+            }]
+        })
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                get_routes_safe_async([2.3522, 48.8566], [3.3792 + i * 0.01, 43.2965]) for i in range(10)
+            ])
+            return results, time.perf_counter() - start
+        finally:
+            await route_handler.close_async_client()
+    
+    original_key = route_handler.ORS_API_KEY
+    route_handler.ORS_API_KEY = "test-key"
+    try:
+        results, elapsed = asyncio.run(run())
+    finally:
+        route_handler.ORS_API_KEY = original_key
+    
+    assert all(r["success"] for r in results), "All lookups should succeed"
+    assert results[0]["data"]["features"][0]["properties"] == {"summary": {"distance": 750000.0, "duration": 27000.0}}
+    print(f"✓ 10 concurrent lookups took {elapsed:.2f}s")
+    assert elapsed < 1.0, "Concurrent lookups should not run back to back"
+
+def test_async_error_contract():
+    """Test that the async path reports errors like get_routes_safe"""
+    print("\n--- Testing Async Error Contract ---")
+    
+    async def handler(request):
+        return httpx.Response(429, json={"error": "Quota exceeded"})
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            upstream = await get_routes_safe_async([2.3522, 48.8566], [3.3792, 43.2965])
+            invalid = await get_routes_safe_async([200.0, 48.8566], [3.3792, 43.2965])
+            return upstream, invalid
+        finally:
+            await route_handler.close_async_client()
+    
+    original_key = route_handler.ORS_API_KEY
+    route_handler.ORS_API_KEY = "test-key"
+    try:
+        upstream, invalid = asyncio.run(run())
+    finally:
+        route_handler.ORS_API_KEY = original_key
+    
+    assert not upstream["success"] and upstream["error"].startswith("Route service error"), "Upstream errors should be reported"
+    assert not invalid["success"] and invalid["error"] == "Invalid source coordinates", "Invalid input should be rejected"
+    print("✓ Async errors follow the get_routes_safe contract")
+
+def test_async_coalescing():
+    """Test that identical in-flight lookups share one upstream call"""
+    print("\n--- Testing Async Request Coalescing ---")
+    
+    calls = []
+    
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.1)
+        return httpx.Response(503, text="Service Unavailable")
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            return await asyncio.gather(*[
+                get_routes_safe_async([2.3522, 48.8566], [3.3792, 43.2965]) for _ in range(10)
+            ])
+        finally:
+            await route_handler.close_async_client()
+    
+    original_key = route_handler.ORS_API_KEY
+    route_handler.ORS_API_KEY = "test-key"
+    try:
+        results = asyncio.run(run())
+    finally:
+        route_handler.ORS_API_KEY = original_key
+    
+    assert len(calls) == 1, f"Expected one upstream call, got {len(calls)}"
+    assert all(r == results[0] for r in results), "Every waiter should receive the shared error"
+    assert not route_handler._inflight_async, "In-flight table should be empty afterwards"
+    print("✓ 10 identical lookups made 1 upstream call and shared its error")
+
+def test_sync_coalescing():
+    """Test that identical lookups from threads share one call"""
+    print("\n--- Testing Sync Request Coalescing ---")
+    
+    calls = []
+    started = threading.Event()
+    
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"type": "FeatureCollection", "features": []}
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(route_handler.coalesce("k", fetch)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(route_handler.coalesce("k", fetch))) for _ in range(5)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+    
+    assert len(calls) == 1, f"Expected one call, got {len(calls)}"
+    assert len(results) == 6 and all(r is results[0] for r in results), "All callers should share the result"
+    print("✓ 6 threaded lookups made 1 call")
+
+def test_matrix_chunk_planning():
+    """Test that OD pairs pack into bounded matrix requests"""
+    print("\n--- Testing Matrix Chunk Planning ---")
+    
+    hub = [77.6413, 12.9716]
+    pairs = [(hub, [77.60 + i * 0.001, 12.90]) for i in range(500)]
+    chunks = plan_matrix_chunks(pairs, max_cells=3500)
+    assert len(chunks) == 1, "One hub to 500 customers should fit in one request"
+    assert len(chunks[0]["sources"]) == 1 and len(chunks[0]["destinations"]) == 500
+    
+    pairs = [([77.0 + i * 0.01, 12.0], [78.0 + i * 0.01, 13.0]) for i in range(500)]
+    chunks = plan_matrix_chunks(pairs, max_cells=3500)
+    assert all(len(c["sources"]) * len(c["destinations"]) <= 3500 for c in chunks)
+    assert sorted(cell[0] for c in chunks for cell in c["cells"]) == list(range(500))
+    print(f"✓ 500 distinct pairs planned into {len(chunks)} requests")
+
+def test_route_matrix_async():
+    """Test batch lookups against a mocked matrix endpoint"""
+    print("\n--- Testing Batch Route Matrix ---")
+    
+    calls = []
+    
+    async def handler(request):
+        import json
+        body = json.loads(request.content)
+        calls.append(body)
+        n_src, n_dst = len(body["sources"]), len(body["destinations"])
+        distances = [[1000.0 * (s + 1) + d for d in range(n_dst)] for s in range(n_src)]
+        durations = [[60.0 * (s + 1) for d in range(n_dst)] for s in range(n_src)]
+        distances[0][0] = None  # Unroutable cell
+        return httpx.Response(200, json={"distances": distances, "durations": durations})
+    
+    pairs = [([77.6413, 12.9716], [77.60 + i * 0.01, 12.90]) for i in range(20)]
+    pairs.append(([200.0, 12.0], [77.60, 12.90]))
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            return await get_route_matrix_async(pairs)
+        finally:
+            await route_handler.close_async_client()
+    
+    original_key = route_handler.ORS_API_KEY
+    route_handler.ORS_API_KEY = "test-key"
+    try:
+        matrix = asyncio.run(run())
+    finally:
+        route_handler.ORS_API_KEY = original_key
+    
+    results = matrix["results"]
+    assert matrix["upstream_calls"] == 1 and len(calls) == 1
+    assert "error" in results[0], "Unroutable pair should report an error"
+    assert results[5]["summary"] == {"distance": 1005.0, "duration": 60.0}
+    assert results[20] == {"error": "Invalid source coordinates"}
+    print(f"✓ {len(pairs)} pairs resolved with {matrix['upstream_calls']} upstream call")
+
+def test_latency_budget_fallback():
+    """Test that slow upstream calls are answered with a flagged estimate"""
+    print("\n--- Testing Latency Budget Fallback ---")
+    
+    async def handler(request):
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json={"routes": [{"summary": {"distance": 1200.0, "duration": 180.0}}]})
+    
+    source, destination = [77.6413, 12.9716], [77.5946, 12.9352]
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            start = time.perf_counter()
+            first = await get_routes_safe_async(source, destination)
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(0.4)  # Let the background upstream call finish
+            second = await get_routes_safe_async(source, destination)
+            return first, elapsed, second
+        finally:
+            await route_handler.close_async_client()
+    
+    original = route_handler.ORS_API_KEY, route_handler.ROUTE_LATENCY_BUDGET_S
+    route_handler.ORS_API_KEY, route_handler.ROUTE_LATENCY_BUDGET_S = "test-key", 0.05
+    try:
+        first, elapsed, second = asyncio.run(run())
+    finally:
+        route_handler.ORS_API_KEY, route_handler.ROUTE_LATENCY_BUDGET_S = original
+    
+    estimate = first["data"]["features"][0]["properties"]
+    assert first["success"] and estimate["estimated"] is True, "Over-budget lookup should return an estimate"
+    assert elapsed < 0.25, f"Estimate should be returned within the budget, took {elapsed:.2f}s"
+    assert second["data"]["features"][0]["properties"] == {"summary": {"distance": 1200.0, "duration": 180.0}}
+    print(f"✓ Estimate ({estimate['summary']}) returned in {elapsed:.2f}s; real route cached afterwards")
+
+def test_breaker_opens_on_upstream_failures():
+    """Test that repeated upstream failures open the breaker"""
+    print("\n--- Testing Circuit Breaker ---")
+    
+    calls = []
+    
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(502, text="Bad Gateway")
+    
+    async def run():
+        _mock_ors_client(handler)
+        try:
+            results = []
+            for i in range(8):
+                results.append(await get_routes_safe_async([77.6413, 12.9716], [77.60 + i * 0.01, 12.93]))
+            return results
+        finally:
+            await route_handler.close_async_client()
+    
+    breaker = route_handler.routing_breaker
+    original_key = route_handler.ORS_API_KEY
+    route_handler.ORS_API_KEY = "test-key"
+    try:
+        results = asyncio.run(run())
+        stats = breaker.stats()
+    finally:
+        route_handler.ORS_API_KEY = original_key
+        breaker.reset()
+    
+    threshold = breaker.failure_threshold
+    assert len(calls) == threshold, f"Upstream should stop being called after {threshold} failures"
+    assert all(not r["success"] for r in results[:threshold]), "Failures before opening keep the error contract"
+    assert all(r["data"]["features"][0]["properties"]["estimated"] for r in results[threshold:])
+    assert stats["state"] == "open"
+    print(f"✓ Breaker opened after {threshold} failures and served estimates")
+
+def test_quota_exhaustion_fallback():
+    """Test that interactive lookups get an estimate once the directions quota is spent"""
+    print("\n--- Testing Quota Exhaustion Fallback ---")
+    
+    calls = []
+    
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"routes": [{"summary": {"distance": 1200.0, "duration": 180.0}}]})
+    
+    async def run():
+        _mock_ors_client(handler)
+        for bucket in route_handler.directions_scheduler.buckets:
+            bucket.tokens = 0.0
+        try:
+            interactive = await get_routes_safe_async([77.6413, 12.9716], [77.5946, 12.9352])
+            batch = await get_routes_safe_async([77.6413, 12.9716], [77.6046, 12.9352], priority="batch")
+            return interactive, batch
+        finally:
+            route_handler.directions_scheduler.reset()
+            await route_handler.close_async_client()
+    
+    scheduler = route_handler.directions_scheduler
+    original = route_handler.ORS_API_KEY, dict(scheduler.max_wait_s)
+    route_handler.ORS_API_KEY = "test-key"
+    scheduler.max_wait_s.update({"interactive": 0.5, "batch": 0.5})
+    try:
+        interactive, batch = asyncio.run(run())
+        breaker_state = route_handler.routing_breaker.state
+    finally:
+        route_handler.ORS_API_KEY = original[0]
+        scheduler.max_wait_s.update(original[1])
+    
+    assert not calls, "No upstream call should be made without quota"
+    assert interactive["success"] and interactive["data"]["features"][0]["properties"]["estimated"]
+    assert not batch["success"] and "quota exhausted" in batch["error"]
+    assert breaker_state == "closed", "Quota rejections are not upstream failures"
+    print("✓ Interactive lookup estimated, batch lookup rejected, breaker untouched")
+
 if __name__ == "__main__":
     print("RouteZero Route Handler Test")
     print("=" * 40)
@@ -114,6 +424,15 @@ if __name__ == "__main__":
         test_coordinate_validation()
         test_route_handling()
         test_error_handling()
+        test_async_routes_concurrent()
+        test_async_error_contract()
+        test_async_coalescing()
+        test_sync_coalescing()
+        test_matrix_chunk_planning()
+        test_route_matrix_async()
+        test_latency_budget_fallback()
+        test_breaker_opens_on_upstream_failures()
+        test_quota_exhaustion_fallback()
         
         print("\n" + "=" * 40)
         print("✓ All tests completed successfully!")
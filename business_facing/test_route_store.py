@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent route store
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import route_handler
+    import route_store
+    from route_store import RouteStore
+    print("✓ Successfully imported route_store")
+except ImportError as e:
+    print(f"✗ Failed to import route_store: {e}")
+    sys.exit(1)
+
+KEY = ((77.6413, 12.9716), (77.5946, 12.9352), "driving-car", (("share_factor", 0.6),), "none")
+ROUTES = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "geometry": None, "properties": {"summary": {"distance": 6200.0, "duration": 840.0}}}
+]}
+
+def test_survives_reopen():
+    """Test that a new store instance (e.g. restarted worker) sees old entries"""
+    print("\n--- Testing Persistence Across Restarts ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "routes.sqlite3")
+        RouteStore(path).set(KEY, ROUTES)
+        
+        reopened = RouteStore(path)
+        value, remaining = reopened.get(KEY)
+        assert value == ROUTES, "Route should survive reopening the store"
+        assert 0 < remaining <= reopened.ttl_s
+        print("✓ Stored route served after reopening")
+
+def test_expiry_and_compaction():
+    """Test TTL expiry and size-bounded compaction"""
+    print("\n--- Testing Expiry and Compaction ---")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RouteStore(os.path.join(tmp, "routes.sqlite3"), max_entries=3, compact_every=1000)
+        store.set(("expired",), ROUTES, ttl_s=0.01)
+        for i in range(5):
+            store.set(("route", i), ROUTES, ttl_s=100 + i)
+        time.sleep(0.02)
+        
+        assert store.get(("expired",)) is None, "Expired entry should not be served"
+        removed = store.compact()
+        assert removed == 3 and len(store) == 3, f"Expected 3 removed, 3 kept; got {removed}, {len(store)}"
+        assert store.get(("route", 0)) is None and store.get(("route", 4)) is not None, "Soonest-expiring rows go first"
+        print(f"✓ Compaction removed {removed} entries")
+
+def test_tiered_lookup():
+    """Test that persistent hits warm the in-memory cache"""
+    print("\n--- Testing Tiered Lookup ---")
+    
+    original = route_store.route_store
+    with tempfile.TemporaryDirectory() as tmp:
+        route_store.route_store = RouteStore(os.path.join(tmp, "routes.sqlite3"))
+        route_handler.route_cache.clear()
+        try:
+            route_store.route_store.set(KEY, ROUTES)
+            assert route_handler.get_cached_routes(KEY) == ROUTES, "Cold worker should hit the store"
+            assert route_handler.route_cache.get(KEY) == ROUTES, "Store hit should warm the memory cache"
+            print("✓ Persistent hit promoted to memory cache")
+        finally:
+            route_store.route_store = original
+            route_handler.route_cache.clear()
+
+def test_async_lookup_and_lifecycle():
+    """Test the async tier and that the store only opens when asked to"""
+    print("\n--- Testing Async Lookup and Store Lifecycle ---")
+    
+    original = route_store.route_store
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "routes.sqlite3")
+        route_store.route_store = None
+        route_handler.route_cache.clear()
+        try:
+            assert asyncio.run(route_handler.get_cached_routes_async(KEY)) is None, "No store until startup opens it"
+            assert route_store.init_route_store(path) is route_store.init_route_store(path)
+            asyncio.run(route_handler.store_cached_routes_async(KEY, ROUTES))
+            route_handler.route_cache.clear()
+            assert asyncio.run(route_handler.get_cached_routes_async(KEY)) == ROUTES, "Async lookup should hit the store"
+            route_store.close_route_store()
+            assert route_store.route_store is None
+            print("✓ Async store lookups served from a worker thread")
+        finally:
+            route_store.close_route_store()
+            route_store.route_store = original
+            route_handler.route_cache.clear()
+
+if __name__ == "__main__":
+    print("RouteZero Route Store Test")
+    print("=" * 40)
+    
+    try:
+        test_survives_reopen()
+        test_expiry_and_compaction()
+        test_tiered_lookup()
+        test_async_lookup_and_lifecycle()
+        
+        print("\n" + "=" * 40)
+        print("✓ All route store tests completed successfully!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for segment-level emissions integration
+"""
+
+import sys
+import os
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from segment_emissions import integrate_emissions
+    from emissions import calculate_emissions
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported segment_emissions")
+except ImportError as e:
+    print(f"✗ Failed to import segment_emissions: {e}")
+    sys.exit(1)
+
+# ~1.1 km east-west segments near Bangalore
+FLAT_ROUTE = [[77.60 + i * 0.01, 12.97] for i in range(11)]
+
+def test_flat_route_matches_distance_model():
+    """Test that a flat route at a neutral speed integrates to distance x factor"""
+    print("\n--- Testing Flat Route ---")
+
+    # 12 km in 12 min = 60 km/h, inside the neutral speed band
+    result = integrate_emissions(FLAT_ROUTE, "car", distance_m=12000, duration_s=720)
+    expected = calculate_emissions(12.0, "car")["emissions_grams"]
+
+    assert len(result["segments_grams"]) == len(FLAT_ROUTE) - 1
+    assert result["distance_km"] == 12.0, "Segments should be scaled to the road distance"
+    assert abs(result["total_grams"] - expected) < 0.01, f"{result['total_grams']} != {expected}"
+    assert abs(sum(result["segments_grams"]) - result["total_grams"]) < 0.05
+    assert result["adjustments"]["gradient_applied"] is False
+    print(f"✓ Flat route: {result['total_grams']}g (distance model {expected}g)")
+
+def test_gradient_adjustment():
+    """Test that climbs cost more and descents less when elevation is present"""
+    print("\n--- Testing Gradient Adjustment ---")
+
+    climb = [[lng, lat, i * 20.0] for i, (lng, lat) in enumerate(FLAT_ROUTE)]
+    descent = [[lng, lat, 200.0 - i * 20.0] for i, (lng, lat) in enumerate(FLAT_ROUTE)]
+
+    flat = integrate_emissions(FLAT_ROUTE, "car")
+    up = integrate_emissions(climb, "car")
+    down = integrate_emissions(descent, "car")
+
+    assert up["adjustments"]["gradient_applied"] is True
+    assert up["total_grams"] > flat["total_grams"] > down["total_grams"]
+    print(f"✓ Climb {up['total_grams']}g > flat {flat['total_grams']}g > descent {down['total_grams']}g")
+
+def test_speed_and_payload_adjustments():
+    """Test speed class and payload multipliers"""
+    print("\n--- Testing Speed Class and Payload ---")
+
+    neutral = integrate_emissions(FLAT_ROUTE, "car", distance_m=12000, duration_s=720)
+    congested = integrate_emissions(FLAT_ROUTE, "car", distance_m=12000, duration_s=3600)
+    loaded = integrate_emissions(FLAT_ROUTE, "car", distance_m=12000, duration_s=720, payload_kg=500)
+    per_segment = integrate_emissions(FLAT_ROUTE, "car", segment_speeds_kmh=[10] * 5 + [60] * 5)
+
+    assert congested["total_grams"] > neutral["total_grams"], "12 km/h should cost more than 60 km/h"
+    assert loaded["adjustments"]["payload_multiplier"] > 1
+    assert loaded["total_grams"] > neutral["total_grams"]
+    assert per_segment["segments_grams"][0] > per_segment["segments_grams"][-1]
+    assert integrate_emissions(FLAT_ROUTE, "ev", payload_kg=500)["total_grams"] == 0
+    print(f"✓ Congested {congested['total_grams']}g, loaded {loaded['total_grams']}g, neutral {neutral['total_grams']}g")
+
+def test_invalid_input():
+    """Test that malformed geometries are rejected"""
+    print("\n--- Testing Invalid Input ---")
+
+    for coordinates in ([], [[77.6, 12.9]], [77.6, 12.9]):
+        try:
+            integrate_emissions(coordinates)
+            assert False, f"{coordinates} should be rejected"
+        except ValueError:
+            pass
+    print("✓ Invalid geometries rejected")
+
+def test_fast_enough_for_alternatives():
+    """Test that three long alternatives integrate well within request latency"""
+    print("\n--- Testing Performance ---")
+
+    route = [[77.6 + i * 1e-4, 12.97 + i * 5e-5, 900 + (i % 40)] for i in range(5000)]
+    start = time.perf_counter()
+    for _ in range(3):
+        result = integrate_emissions(route, "car", distance_m=60000, duration_s=4000, payload_kg=100)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert len(result["segments_grams"]) == len(route) - 1 and result["distance_km"] == 60.0
+    if BENCHMARKS:
+        assert elapsed_ms < 100, f"Three 5000-point routes took {elapsed_ms:.1f}ms"
+    print(f"✓ Three 5000-point alternatives integrated in {elapsed_ms:.1f}ms")
+
+if __name__ == "__main__":
+    print("RouteZero Segment Emissions Test")
+    print("=" * 40)
+
+    try:
+        test_flat_route_matches_distance_model()
+        test_gradient_adjustment()
+        test_speed_and_payload_adjustments()
+        test_invalid_input()
+        test_fast_enough_for_alternatives()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
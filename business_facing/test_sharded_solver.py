@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for the region-sharded reverse-logistics solver
+"""
+
+import sys
+import os
+import random
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import sharded_solver
+    from sharded_solver import partition_shards, solve_reverse_logistics, close_shard_pool
+    from reverse_logistics import optimize_reverse_pickup, candidate_pairs
+    from return_bundling import bundle_reverse_pickups
+    print("✓ Successfully imported sharded_solver")
+except ImportError as e:
+    print(f"✗ Failed to import sharded_solver: {e}")
+    sys.exit(1)
+
+CITIES = [(12.97, 77.59), (19.07, 72.88), (28.61, 77.21)]
+
+def _national_batch(rng, deliveries_per_city, returns_per_city):
+    deliveries, returns = [], []
+    for c, (lat, lon) in enumerate(CITIES):
+        for i in range(deliveries_per_city):
+            delivery = {"id": f"d{c}-{i}", "lat": lat + rng.uniform(-0.1, 0.1), "lon": lon + rng.uniform(-0.1, 0.1)}
+            if rng.random() < 0.5:
+                delivery["route_id"] = f"van-{c}-{rng.randint(1, 20)}"
+            deliveries.append(delivery)
+        returns += [
+            {"id": f"r{c}-{i}", "lat": lat + rng.uniform(-0.1, 0.1), "lon": lon + rng.uniform(-0.1, 0.1),
+             "volume_l": rng.choice([10, 20, 60])}
+            for i in range(returns_per_city)
+        ]
+    rng.shuffle(deliveries)
+    rng.shuffle(returns)
+    return deliveries, returns
+
+def test_partition_by_region():
+    """Cities become separate shards and every possible pair stays within one shard"""
+    print("\nTesting region partition...")
+    rng = random.Random(1)
+    deliveries, returns = _national_batch(rng, 1500, 600)
+    # A return no delivery can reach is left out of every shard
+    returns.append({"id": "nowhere", "lat": -33.87, "lon": 151.21})
+    shards = partition_shards(deliveries, returns)
+    assert len(shards) == 3, len(shards)
+
+    delivery_shard = {i: k for k, (members, _) in enumerate(shards) for i in members}
+    return_shard = {j: k for k, (_, members) in enumerate(shards) for j in members}
+    assert len(return_shard) == sum(len(members) for _, members in shards) == len(returns) - 1
+    delivery_idx, return_idx, _ = candidate_pairs(deliveries, returns)
+    for i, j in zip(delivery_idx.tolist(), return_idx.tolist()):
+        assert delivery_shard[i] == return_shard[j], f"Pair {i}, {j} split across shards"
+    for members, _ in shards:
+        assert len({deliveries[i]["id"].split("-")[0] for i in members}) == 1
+    print(f"✓ {len(shards)} shards, {len(delivery_idx)} candidate pairs all within a shard")
+
+def test_small_tiles_still_exact():
+    """With tiles smaller than a city, the halo joins them back into one region"""
+    print("\nTesting halo links between small tiles...")
+    rng = random.Random(2)
+    deliveries, returns = _national_batch(rng, 400, 150)
+    tile_km = sharded_solver.SHARD_TILE_KM
+    sharded_solver.SHARD_TILE_KM = 3.0
+    try:
+        shards = partition_shards(deliveries, returns)
+    finally:
+        sharded_solver.SHARD_TILE_KM = tile_km
+    delivery_shard = {i: k for k, (members, _) in enumerate(shards) for i in members}
+    return_shard = {j: k for k, (_, members) in enumerate(shards) for j in members}
+    delivery_idx, return_idx, _ = candidate_pairs(deliveries, returns)
+    assert all(delivery_shard[i] == return_shard[j] for i, j in zip(delivery_idx.tolist(), return_idx.tolist()))
+    print(f"✓ {len(delivery_idx)} candidate pairs kept together across 3 km tiles")
+
+def test_matches_single_solve():
+    """Sharded results equal solving the whole batch at once, in every mode"""
+    print("\nTesting sharded solve against a single solve...")
+    rng = random.Random(3)
+    deliveries, returns = _national_batch(rng, 1200, 500)
+    # Ids repeated in another city must not be paired twice; they join
+    # Bangalore and Mumbai into one region, Delhi stays apart
+    deliveries.append(dict(next(d for d in deliveries if d["id"].startswith("d0-")), lat=19.07, lon=72.88))
+    returns.append(dict(next(r for r in returns if r["id"].startswith("r0-")), lat=19.071, lon=72.881))
+
+    # Solve even this small batch in the pool, one region per shard
+    min_items, task_items = sharded_solver.SHARD_MIN_ITEMS, sharded_solver.SHARD_TASK_ITEMS
+    sharded_solver.SHARD_MIN_ITEMS = sharded_solver.SHARD_TASK_ITEMS = 0
+    try:
+        for mode in ("greedy", "optimal", "bundled"):
+            sharded = solve_reverse_logistics(deliveries, returns, mode)
+            assert sharded.pop("shards") == 2
+            if mode == "bundled":
+                single = bundle_reverse_pickups(deliveries, returns)
+            else:
+                single = optimize_reverse_pickup(deliveries, returns, mode)
+            assert sharded == single, f"{mode} results differ"
+            print(f"✓ {mode}: identical, {sharded['total_distance_km']} km")
+    finally:
+        sharded_solver.SHARD_MIN_ITEMS, sharded_solver.SHARD_TASK_ITEMS = min_items, task_items
+        close_shard_pool()
+
+def test_input_errors():
+    """Unknown modes and bad sizes fail in the sharded path too"""
+    print("\nTesting input errors...")
+    deliveries = [{"id": "d1", "lat": 12.97, "lon": 77.59}]
+    returns = [{"id": "r1", "lat": 12.971, "lon": 77.591}, {"id": "r2", "lat": 48.85, "lon": 2.35, "volume_l": -1}]
+    small = solve_reverse_logistics(deliveries, returns[:1])
+    assert small["shards"] == 1 and small["total_pairs"] == 1
+
+    min_items = sharded_solver.SHARD_MIN_ITEMS
+    sharded_solver.SHARD_MIN_ITEMS = 0
+    try:
+        for mode, batch in (("fastest", returns[:1]), ("bundled", returns)):
+            try:
+                solve_reverse_logistics(deliveries, batch, mode)
+                assert False, f"Accepted {mode}"
+            except ValueError:
+                pass
+    finally:
+        sharded_solver.SHARD_MIN_ITEMS = min_items
+        close_shard_pool()
+    print("✓ Unknown mode and negative volume rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Sharded Solver Test")
+    print("=" * 40)
+
+    try:
+        test_partition_by_region()
+        test_small_tiles_still_exact()
+        test_matches_single_solve()
+        test_input_errors()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
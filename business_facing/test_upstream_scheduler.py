@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for the quota-aware upstream scheduler
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from upstream_scheduler import UpstreamScheduler, TokenBucket, SchedulerRejectedError
+    print("✓ Successfully imported upstream_scheduler")
+except ImportError as e:
+    print(f"✗ Failed to import upstream_scheduler: {e}")
+    sys.exit(1)
+
+def make_scheduler(max_queue=None, max_wait_s=None):
+    # One token every 20 ms, no burst
+    return UpstreamScheduler(
+        "test", [TokenBucket(1, 0.02, "per_tick")],
+        max_queue=max_queue or {"interactive": 10, "batch": 10},
+        max_wait_s=max_wait_s or {"interactive": 5.0, "batch": 5.0}
+    )
+
+def test_interactive_served_before_batch():
+    """Test that queued interactive calls overtake an earlier batch backlog"""
+    print("\n--- Testing Priority Lanes ---")
+
+    async def run():
+        scheduler = make_scheduler()
+        order = []
+
+        async def call(priority, label):
+            await scheduler.acquire(priority)
+            order.append(label)
+
+        await scheduler.acquire("batch")  # Drain the only token
+        batch = [asyncio.create_task(call("batch", f"b{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        interactive = [asyncio.create_task(call("interactive", f"i{i}")) for i in range(2)]
+        await asyncio.gather(*batch, *interactive)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(run())
+    assert order[:2] == ["i0", "i1"], f"Interactive calls should be admitted first, got {order}"
+    assert order[2:] == ["b0", "b1", "b2", "b3"], "Batch lane should stay FIFO"
+    assert stats["lanes"]["batch"]["admitted"] == 5
+    assert stats["lanes"]["interactive"]["max_wait_s"] > 0
+    print(f"✓ Admission order {order}")
+
+def test_rejects_when_queue_full():
+    """Test that a full lane rejects new work immediately"""
+    print("\n--- Testing Bounded Queues ---")
+
+    async def run():
+        scheduler = make_scheduler(max_queue={"interactive": 10, "batch": 2})
+        await scheduler.acquire("batch")
+        queued = [asyncio.create_task(scheduler.acquire("batch")) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            await scheduler.acquire("batch")
+            rejected = False
+        except SchedulerRejectedError:
+            rejected = True
+        # Other lanes are unaffected
+        await scheduler.acquire("interactive")
+        await asyncio.gather(*queued)
+        return rejected, scheduler.stats()
+
+    rejected, stats = asyncio.run(run())
+    assert rejected, "Third queued batch call should be rejected"
+    assert stats["lanes"]["batch"]["rejected"] == 1
+    assert stats["lanes"]["batch"]["queue_depth"] == 0
+    print("✓ Full batch lane rejected early; interactive lane still served")
+
+def test_rejects_when_quota_exhausted():
+    """Test that a call whose expected wait exceeds the lane limit is rejected"""
+    print("\n--- Testing Quota Exhaustion ---")
+
+    async def run():
+        # One token per day: once spent, any wait is far beyond the limit
+        scheduler = UpstreamScheduler("test", [TokenBucket(1, 86400.0, "per_day")],
+                                      max_wait_s={"interactive": 1.0, "batch": 1.0})
+        await scheduler.acquire()
+        try:
+            await scheduler.acquire()
+        except SchedulerRejectedError as e:
+            return str(e)
+        return None
+
+    error = asyncio.run(run())
+    assert error is not None and "quota exhausted" in error
+    print(f"✓ Rejected: {error}")
+
+def test_cancelled_waiter_leaves_queue():
+    """Test that a caller cancelled while queued does not consume a token"""
+    print("\n--- Testing Cancellation ---")
+
+    async def run():
+        scheduler = make_scheduler()
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        depth = scheduler.stats()["lanes"]["interactive"]["queue_depth"]
+        await asyncio.wait_for(scheduler.acquire(), timeout=1.0)
+        return depth, scheduler.stats()
+
+    depth, stats = asyncio.run(run())
+    assert depth == 0, "Cancelled waiter should be removed from its lane"
+    assert stats["lanes"]["interactive"]["admitted"] == 2
+    print("✓ Cancelled waiter removed; next caller admitted")
+
+if __name__ == "__main__":
+    print("RouteZero Upstream Scheduler Test")
+    print("=" * 40)
+
+    try:
+        test_interactive_served_before_batch()
+        test_rejects_when_queue_full()
+        test_rejects_when_quota_exhausted()
+        test_cancelled_waiter_leaves_queue()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
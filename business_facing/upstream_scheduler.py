@@ -0,0 +1,207 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import List, Dict, Any, Optional, Deque, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ORS quotas per endpoint (standard plan defaults)
+ORS_DIRECTIONS_PER_MINUTE = float(os.getenv("ORS_DIRECTIONS_PER_MINUTE", "40"))
+ORS_DIRECTIONS_PER_DAY = float(os.getenv("ORS_DIRECTIONS_PER_DAY", "2000"))
+ORS_MATRIX_PER_MINUTE = float(os.getenv("ORS_MATRIX_PER_MINUTE", "40"))
+ORS_MATRIX_PER_DAY = float(os.getenv("ORS_MATRIX_PER_DAY", "500"))
+
+# Priority lanes, highest first
+PRIORITIES = ("interactive", "batch")
+SCHEDULER_MAX_QUEUE = {
+    "interactive": int(os.getenv("SCHEDULER_MAX_QUEUE_INTERACTIVE", "100")),
+    "batch": int(os.getenv("SCHEDULER_MAX_QUEUE_BATCH", "1000"))
+}
+# Requests that would wait longer than this for quota are rejected up front
+SCHEDULER_MAX_WAIT_S = {
+    "interactive": float(os.getenv("SCHEDULER_MAX_WAIT_S_INTERACTIVE", "5")),
+    "batch": float(os.getenv("SCHEDULER_MAX_WAIT_S_BATCH", "120"))
+}
+
+class SchedulerRejectedError(RuntimeError):
+    """Upstream quota or queue capacity exhausted; the call was not attempted."""
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at capacity / period_s tokens per second.
+    """
+
+    def __init__(self, capacity: float, period_s: float, name: str = ""):
+        self.capacity = capacity
+        self.rate = capacity / period_s
+        self.name = name
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def time_until(self, tokens: float = 1.0) -> float:
+        """
+        Seconds until `tokens` tokens are available (0 if available now).
+        """
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def take(self, tokens: float = 1.0) -> None:
+        self._refill()
+        self.tokens -= tokens
+
+class UpstreamScheduler:
+    """
+    Admits upstream calls at the rate allowed by a set of token buckets.
+
+    Callers wait in per-priority FIFO lanes; a free token always goes to the
+    highest-priority waiter, so batch work cannot starve interactive calls.
+    Lanes are bounded and a caller whose expected wait exceeds its lane's
+    limit is rejected immediately instead of queueing.
+    """
+
+    def __init__(self, name: str, buckets: List[TokenBucket],
+                 max_queue: Optional[Dict[str, int]] = None,
+                 max_wait_s: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.buckets = buckets
+        self.max_queue = dict(max_queue or SCHEDULER_MAX_QUEUE)
+        self.max_wait_s = dict(max_wait_s or SCHEDULER_MAX_WAIT_S)
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {p: deque() for p in PRIORITIES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._metrics = {p: {"admitted": 0, "rejected": 0, "total_wait_s": 0.0, "max_wait_s": 0.0} for p in PRIORITIES}
+
+    def _queued_ahead(self, priority: str) -> int:
+        """Waiters that would be served before a new caller in this lane."""
+        rank = PRIORITIES.index(priority)
+        return sum(len(self._queues[p]) for p in PRIORITIES[:rank + 1])
+
+    def _time_until(self, tokens: float) -> float:
+        return max(bucket.time_until(tokens) for bucket in self.buckets)
+
+    def _take(self) -> None:
+        for bucket in self.buckets:
+            bucket.take()
+
+    def _record(self, priority: str, waited_s: float) -> None:
+        metrics = self._metrics[priority]
+        metrics["admitted"] += 1
+        metrics["total_wait_s"] += waited_s
+        metrics["max_wait_s"] = max(metrics["max_wait_s"], waited_s)
+
+    async def acquire(self, priority: str = "interactive") -> None:
+        """
+        Wait until an upstream call may be made.
+
+        Raises:
+            ValueError: If the priority is unknown
+            SchedulerRejectedError: If the lane is full or the wait would be too long
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Invalid priority '{priority}'. Must be one of: {list(PRIORITIES)}")
+
+        ahead = self._queued_ahead(priority)
+        if ahead == 0 and self._time_until(1.0) == 0.0:
+            self._take()
+            self._record(priority, 0.0)
+            return
+
+        if len(self._queues[priority]) >= self.max_queue[priority]:
+            self._metrics[priority]["rejected"] += 1
+            raise SchedulerRejectedError(f"Route service busy: {priority} queue is full, try again later")
+
+        expected_wait_s = self._time_until(ahead + 1.0)
+        if expected_wait_s > self.max_wait_s[priority]:
+            self._metrics[priority]["rejected"] += 1
+            raise SchedulerRejectedError(
+                f"Route service quota exhausted: expected wait {expected_wait_s:.0f}s, try again later"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        enqueued_at = time.monotonic()
+        entry = (future, enqueued_at)
+        self._queues[priority].append(entry)
+        self._schedule_dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done() or future.cancelled():
+                try:
+                    self._queues[priority].remove(entry)
+                except ValueError:
+                    pass
+            raise
+        self._record(priority, time.monotonic() - enqueued_at)
+
+    def _schedule_dispatch(self, delay_s: float = 0.0) -> None:
+        if self._timer is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay_s, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while True:
+            lane = next((self._queues[p] for p in PRIORITIES if self._queues[p]), None)
+            if lane is None:
+                return
+            future, _ = lane[0]
+            if future.done():
+                # Caller gave up (cancelled) while queued
+                lane.popleft()
+                continue
+            wait_s = self._time_until(1.0)
+            if wait_s > 0:
+                self._schedule_dispatch(wait_s)
+                return
+            lane.popleft()
+            self._take()
+            future.set_result(None)
+
+    def reset(self) -> None:
+        """Refill every bucket and reset metrics; queued callers are kept."""
+        for bucket in self.buckets:
+            bucket.tokens = bucket.capacity
+        self._metrics = {p: {"admitted": 0, "rejected": 0, "total_wait_s": 0.0, "max_wait_s": 0.0} for p in PRIORITIES}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return queue depth, wait time and quota metrics for monitoring.
+        """
+        for bucket in self.buckets:
+            bucket.time_until(0.0)
+        lanes = {}
+        for priority in PRIORITIES:
+            metrics = self._metrics[priority]
+            lanes[priority] = {
+                "queue_depth": len(self._queues[priority]),
+                "max_queue": self.max_queue[priority],
+                "admitted": metrics["admitted"],
+                "rejected": metrics["rejected"],
+                "avg_wait_s": round(metrics["total_wait_s"] / metrics["admitted"], 4) if metrics["admitted"] else 0.0,
+                "max_wait_s": round(metrics["max_wait_s"], 4)
+            }
+        return {
+            "lanes": lanes,
+            "tokens_available": {bucket.name: round(bucket.tokens, 2) for bucket in self.buckets}
+        }
+
+def make_ors_scheduler(name: str, per_minute: float, per_day: float) -> UpstreamScheduler:
+    """
+    Scheduler enforcing an ORS per-minute and per-day quota.
+    """
+    return UpstreamScheduler(name, [
+        TokenBucket(per_minute, 60.0, "per_minute"),
+        TokenBucket(per_day, 86400.0, "per_day")
+    ])
+
+directions_scheduler = make_ors_scheduler("directions", ORS_DIRECTIONS_PER_MINUTE, ORS_DIRECTIONS_PER_DAY)
+matrix_scheduler = make_ors_scheduler("matrix", ORS_MATRIX_PER_MINUTE, ORS_MATRIX_PER_DAY)
@@ -0,0 +1,311 @@
+"""
+EV charging-stop planning along a route.
+
+Charging stations are loaded from charging_stations.json into a grid index.
+For a route, the stations within the corridor are found once and cached by
+geometry, then a dynamic program over (station, state of charge) inserts
+the charging stops that minimize total trip time: driving, detours to the
+chargers, a fixed overhead per stop, and charging along each vehicle
+profile's charging curve.
+"""
+
+import os
+import json
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+import numpy as np
+
+from fleet_emissions import haversine_km_array
+
+logger = logging.getLogger(__name__)
+
+CHARGING_STATIONS_PATH = os.getenv(
+    "CHARGING_STATIONS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "charging_stations.json")
+)
+# Corridor lookups kept per route geometry
+CHARGING_CORRIDOR_CACHE_SIZE = int(os.getenv("CHARGING_CORRIDOR_CACHE_SIZE", "256"))
+
+STATION_CELL_DEG = 0.1  # ~11 km grid cells for the station index
+CORRIDOR_SAMPLE_KM = 1.0  # Spacing of route samples used to place stations along it
+SOC_STEPS = 100  # State of charge is planned in whole percent
+DEFAULT_SPEED_KMH = 50.0
+
+class ChargingNetwork:
+    """
+    Charging stations in a grid index, plus vehicle charging profiles.
+    """
+
+    def __init__(self, config: Dict[str, Any], source: Optional[str] = None):
+        try:
+            self.version = str(config.get("version", "unversioned"))
+            self.source = source
+            self.corridor_km = float(config.get("corridor_km", 10))
+            self.stop_overhead_min = float(config.get("stop_overhead_min", 5))
+            self.profiles = {name: dict(spec) for name, spec in config["profiles"].items()}
+            for name, spec in self.profiles.items():
+                if spec["battery_kwh"] <= 0 or spec["consumption_kwh_per_km"] <= 0 or spec["max_charge_kw"] <= 0:
+                    raise ValueError(f"Profile '{name}' needs positive battery, consumption and charge power")
+            self.stations = [dict(s) for s in config["stations"]]
+            coords = np.array([s["coordinates"] for s in self.stations], dtype=np.float64).reshape(-1, 2)
+            self.power_kw = np.array([float(s["power_kw"]) for s in self.stations], dtype=np.float64)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid charging station file: missing or malformed {e}")
+        self._lngs, self._lats = coords[:, 0], coords[:, 1]
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, (lng, lat) in enumerate(coords.tolist()):
+            self._grid.setdefault(self._cell(lng, lat), []).append(i)
+        self._corridors: "OrderedDict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.corridor_hits = 0
+        self.corridor_misses = 0
+        logger.info(f"Loaded {len(self.stations)} charging stations ({self.version})")
+
+    @classmethod
+    def load(cls, path: str = CHARGING_STATIONS_PATH) -> "ChargingNetwork":
+        """
+        Load a station file.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is invalid
+        """
+        with open(path) as f:
+            return cls(json.load(f), source=path)
+
+    def _cell(self, lng: float, lat: float) -> Tuple[int, int]:
+        return (int(math.floor(lng / STATION_CELL_DEG)), int(math.floor(lat / STATION_CELL_DEG)))
+
+    def corridor(self, coordinates: List[List[float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stations within corridor_km of a route.
+
+        Returns:
+            tuple: (station indices, position along the geometry in km,
+            one-way detour in km), ordered by position
+        """
+        coords = np.asarray(coordinates, dtype=np.float64)[:, :2]
+        key = hashlib.sha1(np.round(coords, 5).tobytes()).hexdigest()
+        with self._lock:
+            cached = self._corridors.get(key)
+            if cached is not None:
+                self._corridors.move_to_end(key)
+                self.corridor_hits += 1
+                return cached
+        result = self._find_corridor(coords)
+        with self._lock:
+            self.corridor_misses += 1
+            self._corridors[key] = result
+            while len(self._corridors) > CHARGING_CORRIDOR_CACHE_SIZE:
+                self._corridors.popitem(last=False)
+        return result
+
+    def _find_corridor(self, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Resample the line at ~1 km so station positions are accurate to ~0.5 km
+        lengths = haversine_km_array(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+        offsets = np.concatenate([[0.0], np.cumsum(lengths)])
+        positions = np.linspace(0.0, offsets[-1], max(2, int(math.ceil(offsets[-1] / CORRIDOR_SAMPLE_KM)) + 1))
+        lngs = np.interp(positions, offsets, coords[:, 0])
+        lats = np.interp(positions, offsets, coords[:, 1])
+
+        # Candidate stations from grid cells around the samples
+        reach = int(math.ceil(self.corridor_km / (STATION_CELL_DEG * 111 * max(math.cos(math.radians(lats.max(initial=0))), 0.1))))
+        cells = {self._cell(lng, lat) for lng, lat in zip(lngs.tolist(), lats.tolist())}
+        candidates = sorted({
+            i
+            for cx, cy in cells
+            for x in range(cx - reach, cx + reach + 1)
+            for y in range(cy - reach, cy + reach + 1)
+            for i in self._grid.get((x, y), ())
+        })
+        if not candidates:
+            empty = np.zeros(0)
+            return np.zeros(0, dtype=np.int64), empty, empty
+        candidates = np.array(candidates, dtype=np.int64)
+        distances = haversine_km_array(self._lngs[candidates, None], self._lats[candidates, None], lngs[None, :], lats[None, :])
+        nearest = np.argmin(distances, axis=1)
+        detour_km = distances[np.arange(len(candidates)), nearest]
+        within = detour_km <= self.corridor_km
+        order = np.argsort(positions[nearest][within], kind="stable")
+        return candidates[within][order], positions[nearest][within][order], detour_km[within][order]
+
+    def profile(self, name: str, overrides: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        A vehicle profile with optional field overrides.
+
+        Raises:
+            ValueError: If the profile is unknown or an override is invalid
+        """
+        if name not in self.profiles:
+            raise ValueError(f"Unknown vehicle profile '{name}'. Must be one of: {list(self.profiles)}")
+        spec = {
+            "reserve_soc": 0.1, "taper_soc": 0.8, "taper_factor": 0.5,
+            **self.profiles[name], **{k: v for k, v in (overrides or {}).items() if v is not None}
+        }
+        if spec["battery_kwh"] <= 0 or spec["consumption_kwh_per_km"] <= 0 or spec["max_charge_kw"] <= 0:
+            raise ValueError("battery_kwh, consumption_kwh_per_km and max_charge_kw must be positive")
+        return spec
+
+    def plan(self, coordinates: List[List[float]], soc_start: float, profile: Dict[str, float],
+             distance_m: Optional[float] = None, duration_s: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Minimum-time charging stops for an EV along a route.
+
+        Args:
+            coordinates: Route LineString coordinates
+            soc_start: State of charge at departure (0-1)
+            profile: Vehicle profile (see profile())
+            distance_m: Road distance; geometry positions are scaled to it
+            duration_s: Route duration; gives the driving speed
+
+        Returns:
+            dict: feasible flag, the stops with arrival/departure state of
+            charge and charging time, and trip time totals
+
+        Raises:
+            ValueError: If the coordinates or state of charge are invalid
+        """
+        coords = np.asarray(coordinates, dtype=np.float64)
+        if coords.ndim != 2 or coords.shape[0] < 2 or coords.shape[1] < 2:
+            raise ValueError("coordinates must be a LineString with at least two [lng, lat] points")
+        if not 0 <= soc_start <= 1:
+            raise ValueError("soc_start must be between 0 and 1")
+
+        stations, positions, detours = self.corridor(coords.tolist())
+        geometry_km = float(haversine_km_array(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1]).sum())
+        route_km = distance_m / 1000 if distance_m is not None else geometry_km
+        scale = route_km / geometry_km if geometry_km > 0 else 1.0
+        positions = positions * scale
+        speed_kmh = route_km / (duration_s / 3600) if duration_s else DEFAULT_SPEED_KMH
+        min_per_km = 60 / speed_kmh
+
+        battery = profile["battery_kwh"]
+        pct_per_km = profile["consumption_kwh_per_km"] / battery * SOC_STEPS
+        reserve = int(math.ceil(profile["reserve_soc"] * SOC_STEPS))
+        start = int(math.floor(soc_start * SOC_STEPS))
+        levels = np.arange(SOC_STEPS + 1)
+        drive_min = route_km * min_per_km
+        base = {
+            "distance_km": round(route_km, 2),
+            "drive_min": round(drive_min, 1),
+            "stations_in_corridor": int(len(stations)),
+            "corridor_km": self.corridor_km
+        }
+
+        # Nodes: origin, corridor stations in route order, destination
+        node_pos = np.concatenate([[0.0], positions, [route_km]])
+        node_detour = np.concatenate([[0.0], detours, [0.0]])
+        n = len(node_pos)
+        inf = np.inf
+        arrive = np.full((n, SOC_STEPS + 1), inf)
+        depart = np.full((n, SOC_STEPS + 1), inf)
+        arrive_from = np.full((n, SOC_STEPS + 1, 2), -1, dtype=np.int64)  # (node, departure soc)
+        depart_from = np.full((n, SOC_STEPS + 1), -1, dtype=np.int64)  # arrival soc
+        depart[0, start] = 0.0
+
+        for j in range(1, n):
+            # Drive from every earlier node, leaving it via its detour and
+            # reaching j via j's detour
+            km = node_pos[j] - node_pos[:j] + node_detour[:j] + node_detour[j]
+            need = np.ceil(km * pct_per_km - 1e-9).astype(np.int64)
+            for i in np.flatnonzero(need <= SOC_STEPS).tolist():
+                e = need[i]
+                candidate = depart[i, e:] + km[i] * min_per_km
+                better = candidate < arrive[j, :SOC_STEPS + 1 - e]
+                if better.any():
+                    arrive[j, :SOC_STEPS + 1 - e][better] = candidate[better]
+                    arrive_from[j, :SOC_STEPS + 1 - e][better] = np.stack(
+                        [np.full(better.sum(), i), levels[e:][better]], axis=1
+                    )
+            arrive[j, :reserve] = inf
+            if j == n - 1:
+                break
+            # Charge from arrival level a to departure level t: time is
+            # E(t) - E(a) on this station's curve, so the best arrival for
+            # every t is a running minimum of arrive - E
+            power = min(float(self.power_kw[stations[j - 1]]), profile["max_charge_kw"])
+            per_step_min = battery / SOC_STEPS / power * 60
+            step_min = np.where(levels[1:] > profile["taper_soc"] * SOC_STEPS, per_step_min / profile["taper_factor"], per_step_min)
+            curve = np.concatenate([[0.0], np.cumsum(step_min)])
+            slack = arrive[j] - curve
+            best = np.minimum.accumulate(slack)
+            best_level = np.maximum.accumulate(np.where(slack == best, levels, 0))
+            depart[j] = curve + best + self.stop_overhead_min
+            depart_from[j] = best_level
+
+        final = arrive[n - 1]
+        if not np.isfinite(final).any():
+            return {
+                "feasible": False,
+                "reason": "No sequence of corridor stations keeps the battery above reserve",
+                "stops": [],
+                **base
+            }
+        # Earliest arrival; the highest remaining charge among equal times
+        end_level = int(np.flatnonzero(final == final.min())[-1])
+
+        stops = []
+        node, level = n - 1, end_level
+        while True:
+            previous, left_at = arrive_from[node, level].tolist()
+            if previous == 0:
+                break
+            arrived_at = int(depart_from[previous, left_at])
+            station = self.stations[stations[previous - 1]]
+            charge_min = (depart[previous, left_at] - arrive[previous, arrived_at]) - self.stop_overhead_min
+            stops.append({
+                "station_id": station["id"],
+                "name": station["name"],
+                "coordinates": station["coordinates"],
+                "power_kw": station["power_kw"],
+                "position_km": round(float(node_pos[previous]), 1),
+                "detour_km": round(float(node_detour[previous]), 2),
+                "arrival_soc": arrived_at / SOC_STEPS,
+                "departure_soc": left_at / SOC_STEPS,
+                "charge_min": round(float(charge_min), 1)
+            })
+            node, level = previous, arrived_at
+        stops.reverse()
+
+        total_min = float(final[end_level])
+        return {
+            "feasible": True,
+            "stops": stops,
+            "charging_min": round(sum(stop["charge_min"] for stop in stops), 1),
+            "total_min": round(total_min, 1),
+            "arrival_soc": end_level / SOC_STEPS,
+            "needs_charging": bool(stops),
+            **base
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return station count and corridor cache counters for monitoring.
+        """
+        with self._lock:
+            return {
+                "version": self.version,
+                "stations": len(self.stations),
+                "profiles": list(self.profiles),
+                "corridor_cache_entries": len(self._corridors),
+                "corridor_cache_hits": self.corridor_hits,
+                "corridor_cache_misses": self.corridor_misses
+            }
+
+_charging_network: Optional[ChargingNetwork] = None
+
+def get_charging_network() -> Optional[ChargingNetwork]:
+    """
+    Return the process-wide charging network, loading it on first use.
+    """
+    global _charging_network
+    if _charging_network is None:
+        try:
+            _charging_network = ChargingNetwork.load()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load charging stations from {CHARGING_STATIONS_PATH}: {e}")
+    return _charging_network
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import random
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Append-only JSON-lines log of awards; empty string keeps the ledger in memory only
+ECO_LEDGER_PATH = os.getenv(
+    "ECO_LEDGER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "eco_points_ledger.jsonl")
+)
+# fsync every award (durable across power loss, slower)
+ECO_LEDGER_FSYNC = os.getenv("ECO_LEDGER_FSYNC", "false").lower() in ("1", "true", "yes")
+LEADERBOARD_MAX_LIMIT = 100
+
+class RankedSet:
+    """
+    Ordered set with O(log n) insert, remove, rank and select.
+
+    An indexable skip list: every forward link also stores how many
+    elements it skips, so positions can be counted while searching.
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self):
+        self._key = [None]
+        self._next: List[List[int]] = [[-1] * self.MAX_LEVEL]
+        self._width: List[List[int]] = [[1] * self.MAX_LEVEL]
+        self._free: List[int] = []
+        self._level = 1
+        self._random = random.Random(0)
+        self.size = 0
+        # Links followed by searches, for checking they stay logarithmic
+        self.steps = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _node(self, key, height: int) -> int:
+        if self._free:
+            node = self._free.pop()
+            self._key[node] = key
+            self._next[node] = [-1] * height
+            self._width[node] = [1] * height
+        else:
+            node = len(self._key)
+            self._key.append(key)
+            self._next.append([-1] * height)
+            self._width.append([1] * height)
+        return node
+
+    def _path(self, key) -> Tuple[List[int], List[int]]:
+        """Last node before key on every level, and its position (1-based, head = 0)."""
+        update = [0] * self.MAX_LEVEL
+        position = [0] * self.MAX_LEVEL
+        node, pos, steps = 0, 0, 0
+        for level in range(self._level - 1, -1, -1):
+            nxt = self._next[node][level]
+            while nxt != -1 and self._key[nxt] < key:
+                pos += self._width[node][level]
+                node = nxt
+                nxt = self._next[node][level]
+                steps += 1
+            update[level] = node
+            position[level] = pos
+        self.steps += steps + self._level
+        return update, position
+
+    def insert(self, key) -> None:
+        height = 1
+        while height < self.MAX_LEVEL and self._random.random() < 0.5:
+            height += 1
+        update, position = self._path(key)
+        for level in range(self._level, height):
+            update[level] = 0
+            position[level] = 0
+            self._width[0][level] = self.size + 1
+        self._level = max(self._level, height)
+        node = self._node(key, height)
+        pos = position[0] + 1
+        for level in range(height):
+            prev = update[level]
+            self._next[node][level] = self._next[prev][level]
+            self._next[prev][level] = node
+            # Split prev's span at the new node
+            self._width[node][level] = self._width[prev][level] - (pos - position[level]) + 1
+            self._width[prev][level] = pos - position[level]
+        for level in range(height, self._level):
+            self._width[update[level]][level] += 1
+        self.size += 1
+
+    def remove(self, key) -> None:
+        """
+        Raises:
+            KeyError: If key is not in the set
+        """
+        update, _ = self._path(key)
+        node = self._next[update[0]][0]
+        if node == -1 or self._key[node] != key:
+            raise KeyError(key)
+        for level in range(self._level):
+            prev = update[level]
+            if self._next[prev][level] == node:
+                self._width[prev][level] += self._width[node][level] - 1
+                self._next[prev][level] = self._next[node][level]
+            else:
+                self._width[prev][level] -= 1
+        self._key[node] = None
+        self._free.append(node)
+        self.size -= 1
+
+    def rank(self, key) -> int:
+        """
+        0-based position of key.
+
+        Raises:
+            KeyError: If key is not in the set
+        """
+        update, position = self._path(key)
+        node = self._next[update[0]][0]
+        if node == -1 or self._key[node] != key:
+            raise KeyError(key)
+        return position[0]
+
+    def slice(self, start: int, count: int) -> List[Any]:
+        """Up to count keys from 0-based position start, in order."""
+        if start >= self.size or count <= 0:
+            return []
+        node, pos, target = 0, 0, start + 1
+        for level in range(self._level - 1, -1, -1):
+            while self._next[node][level] != -1 and pos + self._width[node][level] <= target:
+                pos += self._width[node][level]
+                node = self._next[node][level]
+                self.steps += 1
+        self.steps += self._level
+        keys = []
+        while node != -1 and len(keys) < count:
+            keys.append(self._key[node])
+            node = self._next[node][0]
+        return keys
+
+class EcoPointsLedger:
+    """
+    Per-customer eco-points balances backed by an append-only award log.
+
+    Every award is appended to the log before it is applied, and balances
+    are rebuilt by replaying the log on startup. Customers are kept in a
+    RankedSet ordered by (-balance, customer_id), so the leaderboard and a
+    customer's rank are read without sorting.
+    """
+
+    def __init__(self, path: Optional[str] = ECO_LEDGER_PATH, fsync: bool = ECO_LEDGER_FSYNC):
+        self.path = path or None
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self.balances: Dict[str, int] = {}
+        self._leaderboard = RankedSet()
+        self._award_ids = set()
+        self.entries = 0
+        self.replayed = 0
+        self.skipped_lines = 0
+        self._log = None
+        if self.path:
+            torn = self._replay()
+            self._log = open(self.path, "a", encoding="utf-8")
+            if torn:
+                # Terminate the torn line so the next award starts a fresh one
+                self._log.write("\n")
+
+    def _replay(self) -> bool:
+        """Apply every logged award; returns True if the log ends mid-line."""
+        if not os.path.exists(self.path):
+            return False
+        line = "\n"
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    self._apply(entry["customer_id"], int(entry["points"]), entry.get("award_id"))
+                except (ValueError, KeyError, TypeError) as e:
+                    # A torn final write or manual edit; keep going with the rest
+                    self.skipped_lines += 1
+                    logger.warning(f"Skipping eco ledger line {line_number}: {e}")
+                    continue
+                self.replayed += 1
+        logger.info(f"Replayed {self.replayed} eco-points awards for {len(self.balances)} customers from {self.path}")
+        return not line.endswith("\n")
+
+    def _apply(self, customer_id: str, points: int, award_id: Optional[str]) -> int:
+        balance = self.balances.get(customer_id)
+        if balance is not None:
+            self._leaderboard.remove((-balance, customer_id))
+        balance = (balance or 0) + points
+        self.balances[customer_id] = balance
+        self._leaderboard.insert((-balance, customer_id))
+        if award_id is not None:
+            self._award_ids.add(award_id)
+        self.entries += 1
+        return balance
+
+    def award(self, customer_id: str, points: int, reason: Optional[str] = None,
+              award_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add (or, with negative points, redeem) points for a customer.
+
+        Args:
+            customer_id: Customer identifier
+            points: Points to add; negative to redeem
+            reason: Free-text reason stored in the log
+            award_id: Optional idempotency key; repeated ids are not applied twice
+
+        Returns:
+            dict: customer_id, balance, rank and whether the award was applied
+
+        Raises:
+            ValueError: If the customer id is empty or a redemption exceeds the balance
+            OSError: If the award cannot be written to the log
+        """
+        if not customer_id:
+            raise ValueError("customer_id is required")
+        with self._lock:
+            if award_id is not None and award_id in self._award_ids:
+                return {**self._standing(customer_id), "applied": False}
+            if self.balances.get(customer_id, 0) + points < 0:
+                raise ValueError(f"Customer {customer_id} has only {self.balances.get(customer_id, 0)} points")
+            if self._log is not None:
+                entry = {"ts": time.time(), "customer_id": customer_id, "points": points,
+                         "reason": reason, "award_id": award_id}
+                self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+            self._apply(customer_id, points, award_id)
+            return {**self._standing(customer_id), "applied": True}
+
+    def _standing(self, customer_id: str) -> Dict[str, Any]:
+        balance = self.balances.get(customer_id)
+        if balance is None:
+            return {"customer_id": customer_id, "balance": 0, "rank": None}
+        return {
+            "customer_id": customer_id,
+            "balance": balance,
+            "rank": self._leaderboard.rank((-balance, customer_id)) + 1
+        }
+
+    def standing(self, customer_id: str) -> Dict[str, Any]:
+        """
+        A customer's balance and 1-based leaderboard rank (None if never awarded).
+        """
+        with self._lock:
+            return self._standing(customer_id)
+
+    def leaderboard(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Customers by balance (ties by customer id), starting at offset.
+
+        Raises:
+            ValueError: If limit or offset is out of range
+        """
+        if not 1 <= limit <= LEADERBOARD_MAX_LIMIT or offset < 0:
+            raise ValueError(f"limit must be between 1 and {LEADERBOARD_MAX_LIMIT} and offset non-negative")
+        with self._lock:
+            keys = self._leaderboard.slice(offset, limit)
+        return [
+            {"rank": offset + i + 1, "customer_id": customer_id, "balance": -negative_balance}
+            for i, (negative_balance, customer_id) in enumerate(keys)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return ledger counters for monitoring.
+        """
+        return {
+            "path": self.path,
+            "customers": len(self.balances),
+            "entries": self.entries,
+            "replayed": self.replayed,
+            "skipped_lines": self.skipped_lines,
+            "leaderboard_steps": self._leaderboard.steps
+        }
+
+def open_eco_ledger(path: str = ECO_LEDGER_PATH) -> EcoPointsLedger:
+    """
+    Open the eco-points ledger, falling back to memory only if the log cannot be used.
+    """
+    try:
+        return EcoPointsLedger(path)
+    except OSError as e:
+        logger.error(f"Failed to open eco ledger at {path}: {e}; balances will not persist")
+        return EcoPointsLedger(None)
+
+_eco_ledger: Optional[EcoPointsLedger] = None
+_eco_ledger_lock = threading.Lock()
+
+def get_eco_ledger() -> EcoPointsLedger:
+    """
+    Return the process-wide ledger used by the API, opening it on first use.
+    """
+    global _eco_ledger
+    with _eco_ledger_lock:
+        if _eco_ledger is None:
+            _eco_ledger = open_eco_ledger(ECO_LEDGER_PATH)
+        return _eco_ledger
+
+def close_eco_ledger() -> None:
+    """Close the process-wide ledger; the next get_eco_ledger() reopens it."""
+    global _eco_ledger
+    with _eco_ledger_lock:
+        if _eco_ledger is not None:
+            _eco_ledger.close()
+            _eco_ledger = None
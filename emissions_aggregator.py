@@ -0,0 +1,208 @@
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional
+import logging
+
+import numpy as np
+
+from fleet_emissions import haversine_km_array
+
+logger = logging.getLogger(__name__)
+
+# Distinct regions / vehicle types tracked; further keys are folded into "other"
+AGGREGATOR_MAX_REGIONS = int(os.getenv("AGGREGATOR_MAX_REGIONS", "32"))
+AGGREGATOR_MAX_VEHICLES = int(os.getenv("AGGREGATOR_MAX_VEHICLES", "16"))
+# Routes further than this from every hub are attributed to region "other"
+REGION_MAX_DISTANCE_KM = float(os.getenv("REGION_MAX_DISTANCE_KM", "150"))
+
+# Resolution -> (bucket width in seconds, number of buckets kept)
+RESOLUTIONS = {
+    "minute": (60, int(os.getenv("AGGREGATOR_MINUTE_BUCKETS", "120"))),
+    "hour": (3600, int(os.getenv("AGGREGATOR_HOUR_BUCKETS", "168"))),
+    "day": (86400, int(os.getenv("AGGREGATOR_DAY_BUCKETS", "90")))
+}
+METRICS = ("trips", "distance_km", "emissions_grams", "emissions_saved_grams")
+OTHER = "other"
+
+class _KeyIndex:
+    """Bounded name -> slot index map; slot 0 is reserved for "other"."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.names = [OTHER]
+        self._index = {OTHER: 0}
+
+    def index(self, name: Optional[str]) -> int:
+        name = name or OTHER
+        i = self._index.get(name)
+        if i is None:
+            if len(self.names) >= self.capacity:
+                return 0
+            i = len(self.names)
+            self.names.append(name)
+            self._index[name] = i
+        return i
+
+class _Ring:
+    """Fixed ring of time buckets for one resolution."""
+
+    def __init__(self, width_s: int, buckets: int, regions: int, vehicles: int):
+        self.width_s = width_s
+        self.buckets = buckets
+        self.values = np.zeros((buckets, regions, vehicles, len(METRICS)), dtype=np.float64)
+        # Period number held by each bucket (-1 = empty)
+        self.periods = np.full(buckets, -1, dtype=np.int64)
+
+    def add(self, timestamp: float, region: int, vehicle: int, row: np.ndarray) -> None:
+        period = int(timestamp // self.width_s)
+        slot = period % self.buckets
+        if self.periods[slot] != period:
+            if period < self.periods[slot]:
+                return  # Older than the retained window
+            self.values[slot] = 0
+            self.periods[slot] = period
+        self.values[slot, region, vehicle] += row
+
+    def window(self, now: float, buckets: int):
+        """Slots holding one of the last `buckets` periods, oldest first."""
+        current = int(now // self.width_s)
+        valid = (self.periods > current - buckets) & (self.periods <= current)
+        slots = np.flatnonzero(valid)
+        return slots[np.argsort(self.periods[slots])]
+
+class EmissionsAggregator:
+    """
+    Streaming emissions counters bucketed by time x region x vehicle type.
+
+    Every resolution keeps a fixed-size ring of array-backed buckets, so a
+    record touches one cell per resolution and a query reads at most
+    buckets x regions x vehicles cells regardless of how many routes were
+    recorded.
+    """
+
+    def __init__(self, max_regions: int = AGGREGATOR_MAX_REGIONS,
+                 max_vehicles: int = AGGREGATOR_MAX_VEHICLES,
+                 resolutions: Optional[Dict[str, tuple]] = None):
+        self.regions = _KeyIndex(max_regions)
+        self.vehicles = _KeyIndex(max_vehicles)
+        self._rings = {
+            name: _Ring(width_s, buckets, max_regions, max_vehicles)
+            for name, (width_s, buckets) in (resolutions or RESOLUTIONS).items()
+        }
+        self._lock = threading.Lock()
+        self.recorded_by_source: Dict[str, int] = {}
+
+    def record(self, region: Optional[str], vehicle_type: Optional[str], distance_km: float,
+               emissions_grams: float, emissions_saved_grams: float = 0.0,
+               source: str = "unknown", timestamp: Optional[float] = None) -> None:
+        """
+        Add one trip to every resolution's current bucket.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        row = np.array([1.0, distance_km, emissions_grams, emissions_saved_grams], dtype=np.float64)
+        with self._lock:
+            region_index = self.regions.index(region)
+            vehicle_index = self.vehicles.index(vehicle_type)
+            for ring in self._rings.values():
+                ring.add(timestamp, region_index, vehicle_index, row)
+            self.recorded_by_source[source] = self.recorded_by_source.get(source, 0) + 1
+
+    def query(self, resolution: str = "hour", buckets: Optional[int] = None,
+              now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Totals, per-region / per-vehicle breakdowns and a time series over
+        the last `buckets` periods of a resolution.
+
+        Raises:
+            ValueError: If the resolution or bucket count is invalid
+        """
+        if resolution not in self._rings:
+            raise ValueError(f"Invalid resolution '{resolution}'. Must be one of: {list(self._rings)}")
+        ring = self._rings[resolution]
+        buckets = ring.buckets if buckets is None else buckets
+        if not 1 <= buckets <= ring.buckets:
+            raise ValueError(f"buckets must be between 1 and {ring.buckets} for resolution '{resolution}'")
+        now = time.time() if now is None else now
+
+        with self._lock:
+            slots = ring.window(now, buckets)
+            values = ring.values[slots].copy()
+            periods = ring.periods[slots].copy()
+            region_names = list(self.regions.names)
+            vehicle_names = list(self.vehicles.names)
+
+        by_region = values.sum(axis=(0, 2))
+        by_vehicle = values.sum(axis=(0, 1))
+        series = values.sum(axis=(1, 2))
+        return {
+            "resolution": resolution,
+            "buckets": buckets,
+            "window_start": (int(now // ring.width_s) - buckets + 1) * ring.width_s,
+            "totals": _metrics(by_region.sum(axis=0)),
+            "by_region": {name: _metrics(by_region[i]) for i, name in enumerate(region_names) if by_region[i, 0]},
+            "by_vehicle": {name: _metrics(by_vehicle[i]) for i, name in enumerate(vehicle_names) if by_vehicle[i, 0]},
+            "series": [
+                {"period_start": int(period) * ring.width_s, **_metrics(row)}
+                for period, row in zip(periods, series)
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return tracked keys and record counts for monitoring.
+        """
+        with self._lock:
+            return {
+                "regions": len(self.regions.names),
+                "vehicle_types": len(self.vehicles.names),
+                "recorded_by_source": dict(self.recorded_by_source)
+            }
+
+def _metrics(row: np.ndarray) -> Dict[str, Any]:
+    return {
+        "trips": int(row[0]),
+        "distance_km": round(float(row[1]), 2),
+        "emissions_grams": round(float(row[2]), 2),
+        "emissions_saved_grams": round(float(row[3]), 2)
+    }
+
+class RegionResolver:
+    """
+    Attribute a coordinate to the region of its nearest hub.
+    """
+
+    def __init__(self, hubs: List[Dict[str, Any]], max_distance_km: float = REGION_MAX_DISTANCE_KM):
+        self.hubs = hubs
+        self.regions = [hub.get("region", OTHER) for hub in hubs]
+        coords = np.array([hub["coordinates"] for hub in hubs], dtype=np.float64).reshape(-1, 2)
+        self._lngs, self._lats = coords[:, 0], coords[:, 1]
+        self.max_distance_km = max_distance_km
+
+    def region_for(self, coords: List[float]) -> str:
+        """Region of the nearest hub to [lng, lat], or "other" if none is close."""
+        if not self.regions:
+            return OTHER
+        distances = haversine_km_array(self._lngs, self._lats, coords[0], coords[1])
+        nearest = int(np.argmin(distances))
+        return self.regions[nearest] if distances[nearest] <= self.max_distance_km else OTHER
+
+_region_resolver: Optional[RegionResolver] = None
+
+def get_region_resolver() -> RegionResolver:
+    """
+    Return the process-wide resolver built from the hub list.
+    """
+    global _region_resolver
+    if _region_resolver is None:
+        from hub_matrix import load_hubs
+        try:
+            hubs = load_hubs()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load hubs for region lookup: {e}")
+            hubs = []
+        _region_resolver = RegionResolver(hubs)
+    return _region_resolver
+
+# Process-wide aggregator fed by the API endpoints
+emissions_aggregator = EmissionsAggregator()
@@ -0,0 +1,257 @@
+"""
+Fleet-aware vehicle assignment for a batch of routes at one hub.
+
+match_green_carrier picks the greenest vehicle type for each route on its
+own, which can recommend more EVs than a hub owns. assign_fleet instead
+assigns the hub's actual vehicles: every route gets at most one vehicle,
+no fleet group is used beyond its count or range, and total emissions are
+minimized.
+
+The assignment is a transportation problem with few vehicle groups, solved
+exactly by successive shortest paths: routes are added one at a time and
+each is routed along the cheapest chain of reassignments between groups.
+A heap per ordered pair of groups keeps the cheapest route to move, so
+each route costs O(k^2 log n) for k groups.
+"""
+
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+import numpy as np
+
+from emissions import round_grams
+from factor_registry import factor_registry
+from carrier_selector import match_green_carrier_batch
+
+logger = logging.getLogger(__name__)
+
+UNASSIGNED = "unassigned"
+
+# Lexicographic cost: (routes left without a fleet vehicle, grams, operating cost).
+# Grams and operating cost are integers in millionths, so a chain of
+# reassignments that costs nothing sums to exactly zero and never looks
+# like an improvement
+Cost = Tuple[int, int, int]
+COST_SCALE = 10 ** 6
+
+def _scaled(values: np.ndarray) -> list:
+    return np.rint(values * COST_SCALE).astype(np.int64).tolist()
+
+def _add(a: Cost, b: Cost) -> Cost:
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+def _sub(a: Cost, b: Cost) -> Cost:
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+def compile_inventory(inventory: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Resolve fleet groups against the emission factor registry.
+
+    Each group is {"vehicle_type", "count"} with optional "name" (defaults to
+    the vehicle type), "max_range_km" and "cost_factor". Carrier types
+    (ev, hybrid, diesel) default their range and cost to the carrier spec;
+    last-mile vehicle types (car, hybrid, ev) may be used directly.
+
+    Raises:
+        ValueError: If a group is malformed or uses an unknown vehicle type
+    """
+    factors = factor_registry.current
+    last_mile = factors.mode("last_mile")
+    groups = []
+    for spec in inventory:
+        vehicle_type = spec.get("vehicle_type")
+        carrier = factors.carriers.get(vehicle_type)
+        if carrier is None and vehicle_type not in last_mile.vehicle_index:
+            raise ValueError(f"Unknown vehicle type '{vehicle_type}'")
+        count = spec.get("count", 0)
+        if not isinstance(count, int) or count < 0:
+            raise ValueError(f"count for '{vehicle_type}' must be a non-negative integer")
+        max_range_km = float(spec.get("max_range_km", carrier["max_range_km"] if carrier else float("inf")))
+        cost_factor = float(spec.get("cost_factor", carrier["cost_factor"] if carrier else 1.0))
+        if max_range_km <= 0 or cost_factor < 0:
+            raise ValueError(f"Invalid range or cost for '{vehicle_type}'")
+        groups.append({
+            "name": spec.get("name") or vehicle_type,
+            "vehicle_type": vehicle_type,
+            "count": count,
+            "max_range_km": max_range_km,
+            "cost_factor": cost_factor,
+            "emission_factor": carrier["emission_factor"] if carrier else last_mile.factor(vehicle_type)
+        })
+    names = [group["name"] for group in groups]
+    if len(set(names)) != len(names) or UNASSIGNED in names:
+        raise ValueError("Fleet group names must be unique")
+    return groups
+
+def solve_assignment(distances_km: np.ndarray, factors: np.ndarray, ranges_km: np.ndarray,
+                     costs: np.ndarray, counts: np.ndarray, overflow_factor: float,
+                     counters: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """
+    Min-cost assignment of routes to vehicle groups.
+
+    Minimizes, in order: routes left unassigned, total grams (unassigned
+    routes are charged at overflow_factor), and operating cost
+    (distance x cost factor; unassigned routes at the highest cost factor).
+
+    Args:
+        counters: If given, filled with the search work done: Bellman-Ford
+                  passes, heap pushes and heap pops
+
+    Returns:
+        Group index per route; len(factors) for unassigned routes
+    """
+    n, k = len(distances_km), len(factors)
+    over = k  # Overflow node: unlimited capacity, every route fits
+    feasible = (distances_km[:, None] <= ranges_km[None, :]).tolist()
+    grams = _scaled(distances_km[:, None] * factors[None, :])
+    operating = _scaled(distances_km[:, None] * costs[None, :])
+    overflow_grams = _scaled(distances_km * overflow_factor)
+    overflow_operating = _scaled(distances_km * (float(costs.max()) if k else 1.0))
+    spare = counts.astype(np.int64).tolist()
+
+    def cost(i: int, j: int) -> Cost:
+        if j == over:
+            return (1, overflow_grams[i], overflow_operating[i])
+        return (0, grams[i][j], operating[i][j])
+
+    assignment = [-1] * n
+    work = {"passes": 0, "heap_pushes": 0, "heap_pops": 0}
+    # heaps[j][j2]: (cost change of moving a route from j to j2, route)
+    heaps: List[List[list]] = [[[] for _ in range(k + 1)] for _ in range(k + 1)]
+
+    def place(i: int, j: int) -> None:
+        assignment[i] = j
+        here = cost(i, j)
+        for j2 in range(k + 1):
+            if j2 != j and (j2 == over or feasible[i][j2]):
+                heapq.heappush(heaps[j][j2], (_sub(cost(i, j2), here), i))
+                work["heap_pushes"] += 1
+
+    def cheapest_move(j: int, j2: int):
+        heap = heaps[j][j2]
+        while heap and assignment[heap[0][1]] != j:
+            heapq.heappop(heap)  # Stale: the route has moved since
+            work["heap_pops"] += 1
+        return heap[0] if heap else None
+
+    for i in range(n):
+        # Bellman-Ford over the k + 1 group nodes; the residual graph has no
+        # negative cycles because the current assignment is optimal
+        dist: List[Optional[Cost]] = [
+            cost(i, j) if j == over or feasible[i][j] else None for j in range(k + 1)
+        ]
+        pred: List[Optional[Tuple[int, int]]] = [None] * (k + 1)
+        for _ in range(k + 1):
+            work["passes"] += 1
+            changed = False
+            for j in range(k + 1):
+                if dist[j] is None:
+                    continue
+                for j2 in range(k + 1):
+                    if j2 == j:
+                        continue
+                    move = cheapest_move(j, j2)
+                    if move is None:
+                        continue
+                    candidate = _add(dist[j], move[0])
+                    if dist[j2] is None or candidate < dist[j2]:
+                        dist[j2], pred[j2] = candidate, (j, move[1])
+                        changed = True
+            if not changed:
+                break
+
+        end = min((j for j in range(k + 1) if dist[j] is not None and (j == over or spare[j] > 0)),
+                  key=lambda j: dist[j])
+        if end != over:
+            spare[end] -= 1
+        # Walk the chain back: each moved route shifts one group along it
+        j = end
+        seen = set()
+        while pred[j] is not None:
+            if j in seen:
+                raise RuntimeError(f"Reassignment chain for route {i} loops back to group {j}")
+            seen.add(j)
+            previous, moved = pred[j]
+            place(moved, j)
+            j = previous
+        place(i, j)
+
+    if counters is not None:
+        counters.update(work)
+    return np.array(assignment, dtype=np.int64)
+
+def assign_fleet(distances_km, inventory: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Assign a hub's vehicles to a batch of routes, minimizing total emissions.
+
+    Args:
+        distances_km: Route distances in kilometers
+        inventory: Fleet groups (see compile_inventory)
+
+    Returns:
+        dict: Per-route vehicle (None if the fleet cannot cover it) and
+        emissions, per-group usage, totals and the per-route isolated
+        recommendations that would overbook the fleet
+
+    Raises:
+        ValueError: If distances or inventory are invalid
+    """
+    distances_km = np.asarray(distances_km, dtype=np.float64).reshape(-1)
+    if not np.all(np.isfinite(distances_km)) or np.any(distances_km < 0):
+        raise ValueError("distances_km must be finite and non-negative")
+    groups = compile_inventory(inventory)
+    last_mile = factor_registry.current.mode("last_mile")
+    # Routes the fleet cannot cover would fall back to the default (diesel) vehicle
+    overflow_factor = last_mile.factor(last_mile.default_vehicle)
+
+    factors = np.array([g["emission_factor"] for g in groups], dtype=np.float64)
+    assignment = solve_assignment(
+        distances_km, factors,
+        np.array([g["max_range_km"] for g in groups], dtype=np.float64),
+        np.array([g["cost_factor"] for g in groups], dtype=np.float64),
+        np.array([g["count"] for g in groups], dtype=np.int64),
+        overflow_factor
+    )
+
+    assigned = assignment < len(groups)
+    route_factors = np.append(factors, overflow_factor)[assignment]
+    emissions_grams = np.where(assigned, round_grams(distances_km * route_factors), 0.0)
+    baseline_grams = round_grams(distances_km * overflow_factor)
+    names = np.array([g["name"] for g in groups] + [UNASSIGNED], dtype=object)
+    used = np.bincount(assignment, minlength=len(groups) + 1)
+
+    isolated = match_green_carrier_batch(distances_km, with_reasoning=False)["vehicle_type"]
+    recommended = dict(zip(*np.unique(isolated, return_counts=True))) if len(isolated) else {}
+    available: Dict[str, int] = {}
+    for group in groups:
+        available[group["vehicle_type"]] = available.get(group["vehicle_type"], 0) + group["count"]
+    overbooked = {
+        str(vehicle): int(count) - available.get(str(vehicle), 0)
+        for vehicle, count in recommended.items() if int(count) > available.get(str(vehicle), 0)
+    }
+
+    total_grams = float(emissions_grams[assigned].sum())
+    covered_baseline = float(baseline_grams[assigned].sum())
+    logger.info(f"Assigned {int(assigned.sum())}/{len(distances_km)} routes across {len(groups)} fleet groups")
+    return {
+        "vehicle": [None if name == UNASSIGNED else name for name in names[assignment].tolist()],
+        "emissions_grams": emissions_grams,
+        "groups": [
+            {
+                "name": g["name"],
+                "vehicle_type": g["vehicle_type"],
+                "available": g["count"],
+                "assigned": int(used[j]),
+                "assigned_km": round(float(distances_km[assignment == j].sum()), 2)
+            }
+            for j, g in enumerate(groups)
+        ],
+        "assigned_routes": int(assigned.sum()),
+        "unassigned_routes": int(used[len(groups)]),
+        "total_emissions_grams": round(total_grams, 2),
+        "baseline_emissions_grams": round(covered_baseline, 2),
+        "emissions_saved_grams": round(covered_baseline - total_grams, 2),
+        "isolated_recommendations": {str(v): int(c) for v, c in recommended.items()},
+        "overbooked_by_isolated": overbooked
+    }
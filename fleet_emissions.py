@@ -1,33 +1,40 @@
 import logging
 from typing import Dict, Any, List
+import numpy as np
+
+from emissions import emissions_array, round_decimals, round_grams, EMISSION_LEVELS
+from factor_registry import factor_registry
 
 logger = logging.getLogger("fleet_emissions")
 
-FREIGHT_EMISSION_FACTORS = {
-    "heavy_truck": 550,   # g/km
-    "rail_freight": 20,   # g/km
-    "ship_barge": 10      # g/km
+# Average speeds used by the mock freight model (km/h)
+FREIGHT_AVG_SPEEDS_KMH = {
+    "heavy_truck": 60,
+    "rail_freight": 80,
+    "ship_barge": 30
 }
 
-FREIGHT_EMISSION_THRESHOLDS = {
-    "low": 1000,    # g/km
-    "medium": 10000 # g/km
-    # >10000 is high
-}
+def calculate_freight_emissions_batch(distances_km, vehicle_types="heavy_truck") -> Dict[str, np.ndarray]:
+    """
+    Calculate freight emissions for many shipments at once.
+    Results match calculate_freight_emissions element by element.
+    """
+    emissions_grams, level_index = emissions_array(
+        distances_km, vehicle_types, factor_registry.current.mode("freight")
+    )
+    logger.debug(f"Freight emissions computed for {emissions_grams.size} shipments")
+    return {
+        "emissions_grams": emissions_grams,
+        "freight_emission_level": EMISSION_LEVELS[level_index]
+    }
 
 def calculate_freight_emissions(distance_km: float, vehicle_type: str = "heavy_truck") -> Dict[str, Any]:
     """
     Calculate emissions for freight logistics based on vehicle type.
     """
-    factor = FREIGHT_EMISSION_FACTORS.get(vehicle_type, FREIGHT_EMISSION_FACTORS["heavy_truck"])
-    emissions_grams = round(distance_km * factor, 2)
-    # Determine emission level
-    if emissions_grams <= FREIGHT_EMISSION_THRESHOLDS["low"]:
-        emission_level = "low"
-    elif emissions_grams <= FREIGHT_EMISSION_THRESHOLDS["medium"]:
-        emission_level = "medium"
-    else:
-        emission_level = "high"
+    result = calculate_freight_emissions_batch([distance_km], [vehicle_type])
+    emissions_grams = float(result["emissions_grams"][0])
+    emission_level = str(result["freight_emission_level"][0])
     logger.info(f"Freight emissions: {emissions_grams}g ({emission_level}) for {distance_km}km via {vehicle_type}")
     return {
         "emissions_grams": emissions_grams,
@@ -38,11 +45,10 @@ def recommend_freight_mode(distance_km: float, current_vehicle: str = "heavy_tru
     """
     Recommend the most eco-friendly freight mode for a given distance.
     """
-    # Calculate emissions for all modes
-    emissions_by_mode = {
-        mode: calculate_freight_emissions(distance_km, mode)["emissions_grams"]
-        for mode in FREIGHT_EMISSION_FACTORS
-    }
+    # Calculate emissions for all modes in one pass over the factor table
+    modes = factor_registry.current.mode("freight").vehicles
+    emissions = calculate_freight_emissions_batch(np.full(len(modes), distance_km), np.array(modes))
+    emissions_by_mode = dict(zip(modes, emissions["emissions_grams"].tolist()))
     # Find the best (lowest emission) mode
     best_mode = min(emissions_by_mode.keys(), key=lambda m: emissions_by_mode[m])
     best_emissions = emissions_by_mode[best_mode]
@@ -57,11 +63,10 @@ def recommend_freight_mode(distance_km: float, current_vehicle: str = "heavy_tru
         "best_emissions_grams": best_emissions
     }
 
-def mock_freight_route(source: List[float], destination: List[float], mode: str = "heavy_truck") -> Dict[str, Any]:
+def haversine_km(source: List[float], destination: List[float]) -> float:
     """
-    Mock a freight route between two points. Returns distance (km) and duration (min).
+    Great-circle distance in km between two [lng, lat] points.
     """
-    # For demo, use haversine formula for distance, and a simple speed model
     from math import radians, sin, cos, sqrt, atan2
     lat1, lon1 = source[1], source[0]
     lat2, lon2 = destination[1], destination[0]
@@ -70,10 +75,27 @@ def mock_freight_route(source: List[float], destination: List[float], mode: str
     dlon = radians(lon2 - lon1)
     a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
     c = 2 * atan2(sqrt(a), sqrt(1-a))
-    distance_km = R * c
+    return R * c
+
+def haversine_km_array(lngs1, lats1, lngs2, lats2) -> np.ndarray:
+    """
+    Vectorized great-circle distance in km; inputs broadcast like NumPy arrays.
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lngs2, dtype=np.float64) - np.asarray(lngs1, dtype=np.float64))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def mock_freight_route(source: List[float], destination: List[float], mode: str = "heavy_truck") -> Dict[str, Any]:
+    """
+    Mock a freight route between two points. Returns distance (km) and duration (min).
+    """
+    # For demo, use haversine formula for distance, and a simple speed model
+    distance_km = haversine_km(source, destination)
     # Assume average speeds (km/h)
-    avg_speeds = {"heavy_truck": 60, "rail_freight": 80, "ship_barge": 30}
-    speed = avg_speeds.get(mode, 60)
+    speed = FREIGHT_AVG_SPEEDS_KMH.get(mode, 60)
     duration_min = (distance_km / speed) * 60
     logger.info(f"Mocked freight route: {distance_km:.2f}km, {duration_min:.1f}min via {mode}")
     return {
@@ -94,4 +116,73 @@ def get_freight_routes(source: List[float], destination: List[float], mode: str
         **emissions,
         "vehicle_type": mode,
         **recommendation
-    } 
\ No newline at end of file
+    } 
+
+def freight_speeds_kmh(modes) -> np.ndarray:
+    """
+    Average speed per freight mode (60 km/h for unknown modes), vectorized.
+    """
+    modes = np.asarray(modes)
+    speeds = np.full(modes.shape, 60.0)
+    for mode, speed in FREIGHT_AVG_SPEEDS_KMH.items():
+        speeds[modes == mode] = speed
+    return speeds
+
+def get_freight_routes_batch(sources, destinations, modes="heavy_truck") -> Dict[str, np.ndarray]:
+    """
+    Vectorized get_freight_routes for many OD pairs in a single pass.
+
+    Args:
+        sources: (n, 2) array-like of [lng, lat]
+        destinations: (n, 2) array-like of [lng, lat]
+        modes: Freight mode per pair, or one mode for all
+
+    Returns:
+        Dict of per-pair arrays (distance_km, duration_min, emissions_grams,
+        freight_emission_level, recommended_mode, emissions_saved_grams,
+        percent_emissions_saved, best_emissions_grams), the (n, modes)
+        emissions_by_mode matrix and the mode names of its columns
+    """
+    sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+    if sources.shape != destinations.shape:
+        raise ValueError("sources and destinations must have the same length")
+    modes = np.broadcast_to(np.asarray(modes), (len(sources),))
+
+    distance = haversine_km_array(sources[:, 0], sources[:, 1], destinations[:, 0], destinations[:, 1])
+    distance_km = round_decimals(distance, 2)
+    duration_min = round_decimals(distance / freight_speeds_kmh(modes) * 60, 1)
+
+    table = factor_registry.current.mode("freight")
+    emissions_grams, level_index = emissions_array(distance_km, modes, table)
+
+    # Every mode for every pair: (n, modes) matrix; argmin keeps the first
+    # mode on ties, like min() over the factor table order
+    emissions_by_mode = round_grams(distance_km[:, None] * table.factors[None, :])
+    best_index = np.argmin(emissions_by_mode, axis=1) if len(table.vehicles) else np.zeros(len(sources), dtype=np.intp)
+    rows = np.arange(len(sources))
+    best_emissions = emissions_by_mode[rows, best_index]
+
+    # Modes outside the factor table compare against the best mode (no saving)
+    known = np.zeros(len(sources), dtype=bool)
+    for vehicle in table.vehicles:
+        known |= modes == vehicle
+    current_emissions = np.where(known, emissions_by_mode[rows, table.encode(modes)], best_emissions)
+    emissions_saved = current_emissions - best_emissions
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_saved = np.where(current_emissions > 0, emissions_saved / current_emissions * 100, 0.0)
+
+    logger.info(f"Batch freight routes computed for {len(sources)} pairs")
+    return {
+        "distance_km": distance_km,
+        "duration_min": duration_min,
+        "emissions_grams": emissions_grams,
+        "freight_emission_level": EMISSION_LEVELS[level_index],
+        "vehicle_type": np.asarray(modes),
+        "recommended_mode": np.asarray(table.vehicles)[best_index],
+        "emissions_saved_grams": emissions_saved,
+        "percent_emissions_saved": round_decimals(percent_saved, 2),
+        "best_emissions_grams": best_emissions,
+        "emissions_by_mode": emissions_by_mode,
+        "modes": np.asarray(table.vehicles)
+    }
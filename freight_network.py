@@ -0,0 +1,356 @@
+"""
+Multimodal freight planning over a truck / rail / waterway network.
+
+Terminals (rail yards, ports, inland waterway terminals) are joined by rail
+and waterway links from freight_network.json. Every terminal is also
+reachable by road, so a shipment can be drayed by truck to a terminal,
+change mode there, and be drayed from the last terminal to its destination.
+
+The network is compiled once into CSR adjacency arrays over (terminal, mode)
+states; a plan is a bi-criteria label-setting search over emissions and
+duration that returns the Pareto front of intermodal paths.
+"""
+
+import os
+import json
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+import numpy as np
+
+from emissions import round_decimals, round_grams, EMISSION_LEVELS
+from factor_registry import factor_registry
+from fleet_emissions import FREIGHT_AVG_SPEEDS_KMH, haversine_km_array
+
+logger = logging.getLogger(__name__)
+
+FREIGHT_NETWORK_PATH = os.getenv(
+    "FREIGHT_NETWORK_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "freight_network.json")
+)
+# Safety cap on labels created per query; the shipped network needs a few hundred
+FREIGHT_MAX_LABELS = int(os.getenv("FREIGHT_MAX_LABELS", "50000"))
+
+ROAD_MODE = "heavy_truck"
+TRANSFER = -1  # Edge mode code of a mode change inside a terminal
+
+class FreightNetwork:
+    """
+    Terminal network compiled into CSR arrays over (terminal, mode) states.
+
+    Edge i of state s is indices[indptr[s] + i]; each edge carries a mode
+    code (TRANSFER for a mode change), a length and a duration. Emission
+    weights depend on the active emission factors and are recomputed only
+    when the factor registry swaps in a new version.
+    """
+
+    def __init__(self, config: Dict[str, Any], source: Optional[str] = None):
+        try:
+            self.version = str(config.get("version", "unversioned"))
+            self.source = source
+            self.circuity = {mode: float(c) for mode, c in config.get("circuity", {}).items()}
+            self.access_max_km = float(config.get("access_max_km", 250))
+            self.access_max_terminals = int(config.get("access_max_terminals", 4))
+            transfer = config.get("transfer", {})
+            default_transfer_min = float(transfer.get("duration_min", 240))
+            self.handling_grams = float(transfer.get("handling_grams", 0))
+
+            self.terminals = [dict(t) for t in config["terminals"]]
+            self.terminal_index = {t["id"]: i for i, t in enumerate(self.terminals)}
+            if len(self.terminal_index) != len(self.terminals):
+                raise ValueError("Terminal ids must be unique")
+            coords = np.array([t["coordinates"] for t in self.terminals], dtype=np.float64).reshape(-1, 2)
+            self._lngs, self._lats = coords[:, 0], coords[:, 1]
+
+            modes = [ROAD_MODE]
+            for link in config["links"]:
+                if link["mode"] not in modes:
+                    modes.append(link["mode"])
+            self.modes: Tuple[str, ...] = tuple(modes)
+            mode_code = {mode: i for i, mode in enumerate(self.modes)}
+            for mode in self.modes:
+                if mode not in FREIGHT_AVG_SPEEDS_KMH:
+                    raise ValueError(f"No average speed for freight mode '{mode}'")
+
+            # States: every terminal by road, plus each mode it handles
+            self.state_terminal: List[int] = []
+            self.state_mode: List[int] = []
+            self._state_of: Dict[Tuple[int, int], int] = {}
+            for t, terminal in enumerate(self.terminals):
+                for mode in dict.fromkeys([ROAD_MODE, *terminal.get("modes", [])]):
+                    if mode not in mode_code:
+                        raise ValueError(f"Terminal '{terminal['id']}' handles unknown mode '{mode}'")
+                    self._state_of[(t, mode_code[mode])] = len(self.state_terminal)
+                    self.state_terminal.append(t)
+                    self.state_mode.append(mode_code[mode])
+
+            edges: List[Tuple[int, int, int, float, float]] = []
+            for t, terminal in enumerate(self.terminals):
+                transfer_min = float(terminal.get("transfer_min", default_transfer_min))
+                states = [s for (tt, _), s in self._state_of.items() if tt == t]
+                for u in states:
+                    for v in states:
+                        if u != v:
+                            edges.append((u, v, TRANSFER, 0.0, transfer_min))
+            for link in config["links"]:
+                mode = link["mode"]
+                a, b = self.terminal_index[link["from"]], self.terminal_index[link["to"]]
+                u, v = self._state_of.get((a, mode_code[mode])), self._state_of.get((b, mode_code[mode]))
+                if u is None or v is None:
+                    raise ValueError(f"Link {link['from']}-{link['to']} uses {mode} at a terminal without it")
+                if "distance_km" in link:
+                    distance_km = float(link["distance_km"])
+                else:
+                    distance_km = float(haversine_km_array(
+                        self._lngs[a], self._lats[a], self._lngs[b], self._lats[b]
+                    )) * self.circuity.get(mode, 1.0)
+                duration_min = distance_km / float(link.get("speed_kmh", FREIGHT_AVG_SPEEDS_KMH[mode])) * 60
+                edges.append((u, v, mode_code[mode], distance_km, duration_min))
+                if link.get("bidirectional", True):
+                    edges.append((v, u, mode_code[mode], distance_km, duration_min))
+        except KeyError as e:
+            raise ValueError(f"Invalid freight network: missing or unknown {e}")
+
+        # CSR adjacency, edges grouped by tail state
+        edges.sort(key=lambda edge: edge[0])
+        n_states = len(self.state_terminal)
+        tails = np.array([e[0] for e in edges], dtype=np.int64)
+        self.indptr = np.zeros(n_states + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=n_states), out=self.indptr[1:])
+        self.indices = np.array([e[1] for e in edges], dtype=np.int64)
+        self.edge_mode = np.array([e[2] for e in edges], dtype=np.int64)
+        self.edge_km = np.array([e[3] for e in edges], dtype=np.float64)
+        self.edge_min = np.array([e[4] for e in edges], dtype=np.float64)
+        # Plain-list views for the search loop, where scalar numpy indexing is slow
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._edge_min = self.edge_min.tolist()
+        self._weights_revision: Optional[int] = None
+        self._edge_grams: List[float] = []
+        self._mode_factors = np.zeros(len(self.modes))
+        self._thresholds = np.zeros(2)
+        self.road_state = [self._state_of[(t, 0)] for t in range(len(self.terminals))]
+        logger.info(f"Freight network {self.version}: {len(self.terminals)} terminals, "
+                    f"{n_states} states, {len(edges)} edges")
+
+    @classmethod
+    def load(cls, path: str = FREIGHT_NETWORK_PATH) -> "FreightNetwork":
+        """
+        Load and compile a network file.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the network is invalid
+        """
+        with open(path) as f:
+            return cls(json.load(f), source=path)
+
+    def _refresh_weights(self, factors) -> None:
+        """Recompute per-edge emission weights if the emission factors changed."""
+        if self._weights_revision == factors.revision:
+            return
+        table = factors.mode("freight")
+        for mode in self.modes:
+            if mode not in table.vehicle_index:
+                logger.warning(f"No emission factor for {mode}; using {table.default_vehicle}")
+        self._mode_factors = np.array([table.factor(mode) for mode in self.modes])
+        grams = np.where(self.edge_mode == TRANSFER, self.handling_grams,
+                         self.edge_km * self._mode_factors[self.edge_mode])
+        self._edge_grams = grams.tolist()
+        self._thresholds = table.thresholds
+        self._weights_revision = factors.revision
+
+    def _road_legs(self, lng: float, lat: float) -> List[Tuple[int, float]]:
+        """(terminal, road km) for the nearest terminals within drayage range."""
+        km = haversine_km_array(self._lngs, self._lats, lng, lat) * self.circuity.get(ROAD_MODE, 1.0)
+        nearest = np.argsort(km, kind="stable")[:self.access_max_terminals]
+        return [(int(t), float(km[t])) for t in nearest if km[t] <= self.access_max_km]
+
+    def plan(self, source: List[float], destination: List[float]) -> Dict[str, Any]:
+        """
+        Lowest-emission and fastest intermodal paths between two [lng, lat] points.
+
+        Labels carry (emissions, duration) and are settled in lexicographic
+        order, so a label is Pareto-optimal exactly when it is faster than
+        every label already settled at its state. Direct trucking is always
+        one candidate, so a plan exists for any pair of points.
+
+        Args:
+            source: [lng, lat] coordinates of the origin
+            destination: [lng, lat] coordinates of the destination
+
+        Returns:
+            dict: lowest_emission and fastest paths with legs, the Pareto
+            front, the truck-only baseline and search statistics
+
+        Raises:
+            RuntimeError: If the search exceeds FREIGHT_MAX_LABELS
+        """
+        factors = factor_registry.current
+        self._refresh_weights(factors)
+        road_factor = float(self._mode_factors[0])
+        road_min_per_km = 60 / FREIGHT_AVG_SPEEDS_KMH[ROAD_MODE]
+        n_states = len(self.state_terminal)
+        target = n_states
+
+        # Label: (grams, minutes, id); parent and step stored by id.
+        # Step is a CSR edge index, or ("road", km) for drayage / direct legs.
+        label_state: List[int] = []
+        label_parent: List[int] = []
+        label_step: List[Any] = []
+        heap: List[Tuple[float, float, int]] = []
+        best_min = [float("inf")] * (n_states + 1)
+
+        def push(grams: float, minutes: float, state: int, parent: int, step: Any) -> None:
+            if minutes >= best_min[state] or minutes >= best_min[target]:
+                return
+            if len(label_state) >= FREIGHT_MAX_LABELS:
+                raise RuntimeError(f"Freight network search exceeded {FREIGHT_MAX_LABELS} labels")
+            label_state.append(state)
+            label_parent.append(parent)
+            label_step.append(step)
+            heapq.heappush(heap, (grams, minutes, len(label_state) - 1))
+
+        direct_km = float(haversine_km_array(source[0], source[1], destination[0], destination[1])) \
+            * self.circuity.get(ROAD_MODE, 1.0)
+        push(direct_km * road_factor, direct_km * road_min_per_km, target, -1, ("road", direct_km))
+        for t, km in self._road_legs(*source):
+            push(km * road_factor, km * road_min_per_km, self.road_state[t], -1, ("road", km))
+        egress = {self.road_state[t]: km for t, km in self._road_legs(*destination)}
+
+        front: List[int] = []
+        settled = 0
+        indptr, indices, edge_min, edge_grams = self._indptr, self._indices, self._edge_min, self._edge_grams
+        while heap:
+            grams, minutes, label = heapq.heappop(heap)
+            state = label_state[label]
+            if minutes >= best_min[state]:
+                continue  # Dominated by a settled label with no more emissions
+            best_min[state] = minutes
+            settled += 1
+            if state == target:
+                front.append(label)
+                continue
+            if state in egress:
+                km = egress[state]
+                push(grams + km * road_factor, minutes + km * road_min_per_km, target, label, ("road", km))
+            for e in range(indptr[state], indptr[state + 1]):
+                push(grams + edge_grams[e], minutes + edge_min[e], indices[e], label, e)
+
+        paths = [self._path(label, label_state, label_parent, label_step) for label in front]
+        truck_only = self._summary([self._leg({
+            "type": "leg", "mode": ROAD_MODE, "from": "origin", "to": "destination", "via": [],
+            "distance_km": direct_km, "duration_min": direct_km * road_min_per_km
+        })])
+        for path in paths:
+            saved = truck_only["emissions_grams"] - path["emissions_grams"]
+            path["emissions_saved_grams"] = float(round_grams(saved))
+            path["percent_emissions_saved"] = float(round_decimals(
+                saved / truck_only["emissions_grams"] * 100 if truck_only["emissions_grams"] > 0 else 0.0, 2
+            ))
+        logger.info(f"Multimodal plan: {len(paths)} Pareto paths, {settled} labels settled")
+        return {
+            # Labels reach the target in increasing emissions / decreasing duration
+            "lowest_emission": paths[0],
+            "fastest": paths[-1],
+            "pareto_front": paths,
+            "truck_only": truck_only,
+            "network_version": self.version,
+            "factor_version": factors.version,
+            "labels_settled": settled
+        }
+
+    def _path(self, label: int, label_state, label_parent, label_step) -> Dict[str, Any]:
+        """Unwind a target label into legs and transfers."""
+        steps = []
+        while label != -1:
+            steps.append((label_state[label], label_step[label]))
+            label = label_parent[label]
+        steps.reverse()
+
+        road_min_per_km = 60 / FREIGHT_AVG_SPEEDS_KMH[ROAD_MODE]
+        legs: List[Dict[str, Any]] = []
+        place, mode = "origin", ROAD_MODE
+        for state, step in steps:
+            if isinstance(step, tuple):
+                km, minutes, leg_mode = step[1], step[1] * road_min_per_km, ROAD_MODE
+            elif self.edge_mode[step] == TRANSFER:
+                to_mode = self.modes[self.state_mode[state]]
+                legs.append({
+                    "type": "transfer",
+                    "at": place,
+                    "from_mode": mode,
+                    "to_mode": to_mode,
+                    "duration_min": float(round_decimals(self.edge_min[step], 1)),
+                    "emissions_grams": float(round_grams(self.handling_grams))
+                })
+                mode = to_mode
+                continue
+            else:
+                km, minutes = float(self.edge_km[step]), float(self.edge_min[step])
+                leg_mode = self.modes[self.edge_mode[step]]
+            arrival = "destination" if state == len(self.state_terminal) \
+                else self.terminals[self.state_terminal[state]]["name"]
+            previous = legs[-1] if legs else None
+            if previous is not None and previous["type"] == "leg" and previous["mode"] == leg_mode:
+                # Same vehicle continues through the terminal
+                previous["via"].append(previous["to"])
+                previous["to"] = arrival
+                previous["distance_km"] += km
+                previous["duration_min"] += minutes
+            else:
+                legs.append({"type": "leg", "mode": leg_mode, "from": place, "to": arrival, "via": [],
+                             "distance_km": km, "duration_min": minutes})
+            place, mode = arrival, leg_mode
+
+        return self._summary([self._leg(leg) if leg["type"] == "leg" else leg for leg in legs])
+
+    def _leg(self, leg: Dict[str, Any]) -> Dict[str, Any]:
+        """Round a travel leg and add its emissions."""
+        factor = float(self._mode_factors[self.modes.index(leg["mode"])])
+        return {
+            **leg,
+            "distance_km": float(round_decimals(leg["distance_km"], 2)),
+            "duration_min": float(round_decimals(leg["duration_min"], 1)),
+            "emissions_grams": float(round_grams(leg["distance_km"] * factor))
+        }
+
+    def _summary(self, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Path totals from its legs."""
+        travel = [leg for leg in legs if leg["type"] == "leg"]
+        emissions_grams = float(round_grams(sum(leg["emissions_grams"] for leg in legs)))
+        return {
+            "modes": list(dict.fromkeys(leg["mode"] for leg in travel)),
+            "distance_km": float(round_decimals(sum(leg["distance_km"] for leg in travel), 2)),
+            "duration_min": float(round_decimals(sum(leg["duration_min"] for leg in legs), 1)),
+            "emissions_grams": emissions_grams,
+            "freight_emission_level": str(EMISSION_LEVELS[np.searchsorted(self._thresholds, emissions_grams, side="left")]),
+            "transfers": len(legs) - len(travel),
+            "legs": legs
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return network size and version for monitoring.
+        """
+        return {
+            "version": self.version,
+            "terminals": len(self.terminals),
+            "states": len(self.state_terminal),
+            "edges": len(self.indices),
+            "modes": list(self.modes)
+        }
+
+_freight_network: Optional[FreightNetwork] = None
+
+def get_freight_network() -> Optional[FreightNetwork]:
+    """
+    Return the process-wide freight network, loading it on first use.
+    """
+    global _freight_network
+    if _freight_network is None:
+        try:
+            _freight_network = FreightNetwork.load()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load freight network from {FREIGHT_NETWORK_PATH}: {e}")
+    return _freight_network
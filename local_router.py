@@ -0,0 +1,494 @@
+import csv
+import heapq
+import math
+import os
+import threading
+from typing import List, Tuple, Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Road graph extract used when ROUTING_BACKEND=local
+LOCAL_ROAD_GRAPH = os.getenv("LOCAL_ROAD_GRAPH", "road_graph.csv")
+# Run contraction-hierarchy preprocessing when the graph is loaded
+LOCAL_ROUTER_CONTRACT = os.getenv("LOCAL_ROUTER_CONTRACT", "false").lower() in ("1", "true", "yes")
+# Reject source/destination further than this from any road node
+LOCAL_ROUTER_MAX_SNAP_M = float(os.getenv("LOCAL_ROUTER_MAX_SNAP_M", "5000"))
+
+DEFAULT_SPEED_KMH = 50.0
+SNAP_CELL_DEG = 0.01  # ~1.1 km grid cells for nearest-node lookup
+EARTH_RADIUS_M = 6371000.0
+
+def haversine_m(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """
+    Great-circle distance between two [lng, lat] points in meters.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+class RoadGraph:
+    """
+    Directed road graph with travel-time weights.
+
+    Nodes are integer indices into node_coords ([lng, lat]); every edge
+    carries a duration (s, the routing weight) and a length (m).
+    """
+
+    def __init__(self, node_coords: List[Tuple[float, float]],
+                 edges: List[Tuple[int, int, float, float]]):
+        self.node_coords = node_coords
+        self.out_edges: List[Dict[int, Tuple[float, float]]] = [{} for _ in node_coords]
+        self.in_edges: List[Dict[int, Tuple[float, float]]] = [{} for _ in node_coords]
+        self.max_speed_mps = 0.0
+        for u, v, duration_s, length_m in edges:
+            if u == v:
+                continue
+            # Keep the fastest of parallel edges
+            existing = self.out_edges[u].get(v)
+            if existing is not None and existing[0] <= duration_s:
+                continue
+            self.out_edges[u][v] = (duration_s, length_m)
+            self.in_edges[v][u] = (duration_s, length_m)
+            if duration_s > 0:
+                self.max_speed_mps = max(self.max_speed_mps, length_m / duration_s)
+        self.hierarchy: Optional["ContractionHierarchy"] = None
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for node, (lng, lat) in enumerate(node_coords):
+            self._grid.setdefault(self._cell(lng, lat), []).append(node)
+
+    @classmethod
+    def from_edge_list(cls, path: str) -> "RoadGraph":
+        """
+        Load a graph from a CSV edge list.
+
+        Required columns: source, target, source_lng, source_lat, target_lng,
+        target_lat. Optional columns: length_m (defaults to the haversine
+        distance), speed_kmh (defaults to 50) and oneway (defaults to true).
+
+        Args:
+            path: Path to the CSV file
+
+        Returns:
+            RoadGraph: Loaded graph
+        """
+        node_index: Dict[str, int] = {}
+        node_coords: List[Tuple[float, float]] = []
+        edges: List[Tuple[int, int, float, float]] = []
+
+        def add_node(node_id: str, lng: str, lat: str) -> int:
+            index = node_index.get(node_id)
+            if index is None:
+                index = node_index[node_id] = len(node_coords)
+                node_coords.append((float(lng), float(lat)))
+            return index
+
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                u = add_node(row["source"], row["source_lng"], row["source_lat"])
+                v = add_node(row["target"], row["target_lng"], row["target_lat"])
+                if row.get("length_m"):
+                    length_m = float(row["length_m"])
+                else:
+                    length_m = haversine_m(*node_coords[u], *node_coords[v])
+                speed_kmh = float(row.get("speed_kmh") or DEFAULT_SPEED_KMH)
+                duration_s = length_m / (speed_kmh / 3.6)
+                edges.append((u, v, duration_s, length_m))
+                if str(row.get("oneway", "true")).lower() in ("0", "false", "no"):
+                    edges.append((v, u, duration_s, length_m))
+
+        logger.info(f"Loaded road graph with {len(node_coords)} nodes and {len(edges)} edges from {path}")
+        return cls(node_coords, edges)
+
+    def _cell(self, lng: float, lat: float) -> Tuple[int, int]:
+        return (int(math.floor(lng / SNAP_CELL_DEG)), int(math.floor(lat / SNAP_CELL_DEG)))
+
+    def nearest_node(self, lng: float, lat: float) -> Tuple[Optional[int], float]:
+        """
+        Find the road node closest to a point.
+
+        Searches grid rings outward and stops one ring after the first hit.
+
+        Returns:
+            tuple: (node index or None, distance in meters)
+        """
+        cx, cy = self._cell(lng, lat)
+        max_rings = int(LOCAL_ROUTER_MAX_SNAP_M / 1000 / (SNAP_CELL_DEG * 111)) + 2
+        best_node, best_distance = None, float("inf")
+        found_at = None
+        for ring in range(max_rings + 1):
+            if found_at is not None and ring > found_at + 1:
+                break
+            for x in range(cx - ring, cx + ring + 1):
+                for y in range(cy - ring, cy + ring + 1):
+                    if max(abs(x - cx), abs(y - cy)) != ring:
+                        continue
+                    for node in self._grid.get((x, y), ()):
+                        distance = haversine_m(lng, lat, *self.node_coords[node])
+                        if distance < best_distance:
+                            best_node, best_distance = node, distance
+            if best_node is not None and found_at is None:
+                found_at = ring
+        return best_node, best_distance
+
+    def _heuristic(self, node: int, target: int) -> float:
+        if self.max_speed_mps <= 0:
+            return 0.0
+        return haversine_m(*self.node_coords[node], *self.node_coords[target]) / self.max_speed_mps
+
+    def astar(self, source: int, target: int,
+              penalties: Optional[Dict[Tuple[int, int], float]] = None) -> Optional[List[int]]:
+        """
+        A* search on travel time with a straight-line / max-speed heuristic.
+
+        Args:
+            source: Start node
+            target: End node
+            penalties: Optional per-edge weight multipliers
+
+        Returns:
+            List of nodes on the path, or None if unreachable
+        """
+        dist = {source: 0.0}
+        parent = {source: None}
+        heap = [(self._heuristic(source, target), 0.0, source)]
+        closed = set()
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == target:
+                return self._trace(parent, target)
+            closed.add(u)
+            for v, (duration, _) in self.out_edges[u].items():
+                if penalties:
+                    duration *= penalties.get((u, v), 1.0)
+                nd = d + duration
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd + self._heuristic(v, target), nd, v))
+        return None
+
+    def bidirectional_dijkstra(self, source: int, target: int) -> Optional[List[int]]:
+        """
+        Bidirectional Dijkstra on travel time.
+
+        Returns:
+            List of nodes on the path, or None if unreachable
+        """
+        if source == target:
+            return [source]
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: None}, {target: None})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        adjacency = (self.out_edges, self.in_edges)
+        settled = (set(), set())
+        best, meeting = float("inf"), None
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            for v, (duration, _) in adjacency[side][u].items():
+                nd = d + duration
+                if nd < dist[side].get(v, float("inf")):
+                    dist[side][v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+                if v in dist[1 - side] and nd + dist[1 - side][v] < best:
+                    best, meeting = nd + dist[1 - side][v], v
+        if meeting is None:
+            return None
+        forward = self._trace(parent[0], meeting)
+        backward = self._trace(parent[1], meeting)
+        return forward + backward[::-1][1:]
+
+    def _trace(self, parent: Dict[int, Optional[int]], node: int) -> List[int]:
+        path = []
+        while node is not None:
+            path.append(node)
+            node = parent[node]
+        return path[::-1]
+
+    def path_cost(self, path: List[int]) -> Tuple[float, float]:
+        """
+        Return (duration_s, length_m) of a node path.
+        """
+        duration, length = 0.0, 0.0
+        for u, v in zip(path, path[1:]):
+            edge_duration, edge_length = self.out_edges[u][v]
+            duration += edge_duration
+            length += edge_length
+        return duration, length
+
+    def contract(self) -> "ContractionHierarchy":
+        """
+        Run contraction-hierarchy preprocessing for fast shortest-path queries.
+        """
+        self.hierarchy = ContractionHierarchy(self)
+        return self.hierarchy
+
+    def shortest_path(self, source: int, target: int) -> Optional[List[int]]:
+        """
+        Fastest path, using the contraction hierarchy when available.
+        """
+        if self.hierarchy is not None:
+            return self.hierarchy.query(source, target)
+        return self.bidirectional_dijkstra(source, target)
+
+    def alternative_paths(self, source: int, target: int, target_count: int = 3,
+                          share_factor: float = 0.6, weight_factor: float = 1.4) -> List[List[int]]:
+        """
+        Fastest path plus up to target_count - 1 alternatives (penalty method).
+
+        Edges of accepted paths are penalized by weight_factor and the search is
+        repeated. A candidate is accepted when it shares at most share_factor of
+        its length with every accepted path and is at most weight_factor times
+        slower than the fastest path, mirroring the ORS alternative_routes
+        parameters.
+        """
+        best = self.shortest_path(source, target)
+        if best is None:
+            return []
+        paths = [best]
+        best_duration = self.path_cost(best)[0]
+        penalties: Dict[Tuple[int, int], float] = {}
+        for _ in range(3 * max(target_count - 1, 0)):
+            if len(paths) >= target_count:
+                break
+            for u, v in zip(paths[-1], paths[-1][1:]):
+                penalties[(u, v)] = penalties.get((u, v), 1.0) * weight_factor
+            candidate = self.astar(source, target, penalties)
+            if candidate is None or candidate in paths:
+                continue
+            duration, length = self.path_cost(candidate)
+            if duration > weight_factor * best_duration:
+                break
+            candidate_edges = set(zip(candidate, candidate[1:]))
+            if all(self._shared_length(candidate_edges, p) <= share_factor * length for p in paths):
+                paths.append(candidate)
+            else:
+                # Penalize the rejected candidate too so the next search moves on
+                for u, v in candidate_edges:
+                    penalties[(u, v)] = penalties.get((u, v), 1.0) * weight_factor
+        return paths
+
+    def _shared_length(self, edges: set, path: List[int]) -> float:
+        return sum(self.out_edges[u][v][1] for u, v in zip(path, path[1:]) if (u, v) in edges)
+
+    def route(self, source: List[float], destination: List[float],
+              alternative_routes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Route between [lng, lat] points and return an ORS-shaped FeatureCollection.
+
+        Args:
+            source: [lng, lat] coordinates of the source
+            destination: [lng, lat] coordinates of the destination
+            alternative_routes: ORS-style {"target_count", "share_factor", "weight_factor"}
+
+        Returns:
+            Dict: FeatureCollection with LineString geometry and summary per route
+
+        Raises:
+            RuntimeError: If a point is too far from the road graph or no route exists
+        """
+        endpoints = []
+        for name, (lng, lat) in (("source", source), ("destination", destination)):
+            node, distance = self.nearest_node(lng, lat)
+            if node is None or distance > LOCAL_ROUTER_MAX_SNAP_M:
+                raise RuntimeError(f"Route service error: no road found near {name}")
+            endpoints.append(node)
+
+        options = alternative_routes or {}
+        paths = self.alternative_paths(
+            endpoints[0], endpoints[1],
+            target_count=int(options.get("target_count", 1)),
+            share_factor=float(options.get("share_factor", 0.6)),
+            weight_factor=float(options.get("weight_factor", 1.4))
+        )
+        if not paths:
+            raise RuntimeError("Route service error: no route found between source and destination")
+
+        features = []
+        for path in paths:
+            duration, length = self.path_cost(path)
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": [list(self.node_coords[node]) for node in path]
+                },
+                "properties": {
+                    "summary": {"distance": round(length, 1), "duration": round(duration, 1)}
+                }
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy over a RoadGraph.
+
+    Nodes are contracted in edge-difference order; shortcuts remember the
+    contracted middle node so query paths can be unpacked to road nodes.
+    """
+
+    WITNESS_SETTLE_LIMIT = 50
+
+    def __init__(self, graph: RoadGraph):
+        n = len(graph.node_coords)
+        out_adj = [dict((v, w[0]) for v, w in edges.items()) for edges in graph.out_edges]
+        in_adj = [dict((u, w[0]) for u, w in edges.items()) for edges in graph.in_edges]
+        self.middle: Dict[Tuple[int, int], int] = {}
+        self.rank = [0] * n
+        contracted = [False] * n
+        deleted_neighbors = [0] * n
+
+        heap = [(self._priority(v, out_adj, in_adj, contracted, deleted_neighbors), v) for v in range(n)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            if contracted[v]:
+                continue
+            # Lazy update: re-queue if the priority got worse since it was pushed
+            priority = self._priority(v, out_adj, in_adj, contracted, deleted_neighbors)
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+            for u, w in self._shortcuts(v, out_adj, in_adj, contracted):
+                weight = in_adj[v][u] + out_adj[v][w]
+                if weight < out_adj[u].get(w, float("inf")):
+                    out_adj[u][w] = weight
+                    in_adj[w][u] = weight
+                    self.middle[(u, w)] = v
+            contracted[v] = True
+            self.rank[v] = order
+            order += 1
+            for neighbor in set(out_adj[v]) | set(in_adj[v]):
+                deleted_neighbors[neighbor] += 1
+
+        # Search graphs only keep edges leading to higher-ranked nodes
+        self.up_out = [{w: d for w, d in out_adj[u].items() if self.rank[w] > self.rank[u]} for u in range(n)]
+        self.up_in = [{w: d for w, d in in_adj[u].items() if self.rank[w] > self.rank[u]} for u in range(n)]
+        self.graph = graph
+        logger.info(f"Contraction hierarchy built with {len(self.middle)} shortcuts")
+
+    def _shortcuts(self, v: int, out_adj, in_adj, contracted) -> List[Tuple[int, int]]:
+        """Shortcuts u -> w needed to contract v (no witness path found)."""
+        needed = []
+        for u, w_in in in_adj[v].items():
+            if contracted[u]:
+                continue
+            targets = {w: w_in + w_out for w, w_out in out_adj[v].items() if not contracted[w] and w != u}
+            if not targets:
+                continue
+            witness = self._witness_search(u, v, max(targets.values()), out_adj, contracted)
+            for w, via in targets.items():
+                if witness.get(w, float("inf")) > via:
+                    needed.append((u, w))
+        return needed
+
+    def _witness_search(self, source: int, skip: int, limit: float, out_adj, contracted) -> Dict[int, float]:
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and settled < self.WITNESS_SETTLE_LIMIT:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, float("inf")):
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for x, weight in out_adj[u].items():
+                if x == skip or contracted[x]:
+                    continue
+                nd = d + weight
+                if nd < dist.get(x, float("inf")):
+                    dist[x] = nd
+                    heapq.heappush(heap, (nd, x))
+        return dist
+
+    def _priority(self, v: int, out_adj, in_adj, contracted, deleted_neighbors) -> int:
+        removed = sum(1 for u in in_adj[v] if not contracted[u]) + sum(1 for w in out_adj[v] if not contracted[w])
+        added = len(self._shortcuts(v, out_adj, in_adj, contracted))
+        return added - removed + deleted_neighbors[v]
+
+    def query(self, source: int, target: int) -> Optional[List[int]]:
+        """
+        Fastest path between two nodes via bidirectional upward search.
+
+        Returns:
+            List of road nodes on the path, or None if unreachable
+        """
+        if source == target:
+            return [source]
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: None}, {target: None})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        adjacency = (self.up_out, self.up_in)
+        best, meeting = float("inf"), None
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+                if not heaps[side]:
+                    continue
+                d, u = heapq.heappop(heaps[side])
+                if d > dist[side].get(u, float("inf")):
+                    continue
+                if d >= best:
+                    heaps[side].clear()
+                    continue
+                if u in dist[1 - side] and d + dist[1 - side][u] < best:
+                    best, meeting = d + dist[1 - side][u], u
+                for v, weight in adjacency[side][u].items():
+                    nd = d + weight
+                    if nd < dist[side].get(v, float("inf")):
+                        dist[side][v] = nd
+                        parent[side][v] = u
+                        heapq.heappush(heaps[side], (nd, v))
+        if meeting is None:
+            return None
+        up = self.graph._trace(parent[0], meeting)
+        down = self.graph._trace(parent[1], meeting)[::-1]
+        path = up + down[1:]
+        return self._unpack(path)
+
+    def _unpack(self, path: List[int]) -> List[int]:
+        nodes = [path[0]]
+        stack = [(u, w) for u, w in zip(path, path[1:])][::-1]
+        while stack:
+            u, w = stack.pop()
+            middle = self.middle.get((u, w))
+            if middle is None:
+                nodes.append(w)
+            else:
+                stack.append((middle, w))
+                stack.append((u, middle))
+        return nodes
+
+_local_router: Optional[RoadGraph] = None
+_local_router_lock = threading.Lock()
+
+def get_local_router() -> RoadGraph:
+    """
+    Return the process-wide road graph, loading it on first use.
+
+    Raises:
+        RuntimeError: If the road graph file cannot be loaded
+    """
+    global _local_router
+    if _local_router is None:
+        with _local_router_lock:
+            if _local_router is None:
+                try:
+                    graph = RoadGraph.from_edge_list(LOCAL_ROAD_GRAPH)
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error(f"Failed to load road graph from {LOCAL_ROAD_GRAPH}: {e}")
+                    raise RuntimeError(f"Local routing graph is not available: {e}")
+                if LOCAL_ROUTER_CONTRACT:
+                    graph.contract()
+                _local_router = graph
+    return _local_router
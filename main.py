@@ -1,20 +1,64 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from route_handler import get_routes_safe
-from emissions import calculate_emissions
+from route_handler import get_routes_safe_async, get_route_matrix_async, close_async_client, routing_breaker, init_routing_backend
+from emissions import calculate_emissions, calculate_emissions_batch
 from carrier_selector import match_green_carrier
 from eco_points import get_eco_points, get_eco_tag
-from reverse_logistics import optimize_reverse_pickup
+from sharded_solver import solve_reverse_logistics, close_shard_pool
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import httpx
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fleet_emissions import get_freight_routes
+from route_cache import route_cache
+import route_store
+from hub_matrix import get_hub_matrix
+from freight_network import get_freight_network
+from charging_planner import get_charging_network
+from route_geometry import (
+    DEFAULT_GEOMETRY_MODE, DEFAULT_SIMPLIFY_TOLERANCE_M, geometry_output, validate_geometry_mode, encode_polyline
+)
+from segment_emissions import integrate_emissions
+from emissions_aggregator import emissions_aggregator, get_region_resolver
+from fleet_emissions import calculate_freight_emissions_batch, get_freight_routes_batch
+from return_bundling import nearest_hub_km
+import numpy as np
+from upstream_scheduler import directions_scheduler, matrix_scheduler
+from factor_registry import factor_registry
+from fleet_assignment import assign_fleet
+import asyncio
+from eco_ledger import get_eco_ledger, close_eco_ledger
+from pairing_service import pairing_service
 
 load_dotenv()
 
-app = FastAPI(title="RouteZero API", description="Eco-friendly route optimization API")
+MAX_BATCH_ROUTE_PAIRS = int(os.getenv("MAX_BATCH_ROUTE_PAIRS", "1000"))
+MAX_BATCH_FREIGHT_PAIRS = int(os.getenv("MAX_BATCH_FREIGHT_PAIRS", "20000"))
+MAX_FLEET_ASSIGNMENT_ROUTES = int(os.getenv("MAX_FLEET_ASSIGNMENT_ROUTES", "20000"))
+# Vehicle assumed for reverse-logistics pickups when a request does not name one
+REVERSE_PICKUP_VEHICLE = os.getenv("REVERSE_PICKUP_VEHICLE", "car")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks."""
+    # Open the persistent route store and eco-points ledger and load the
+    # precomputed hub matrix and local road graph before serving traffic
+    route_store.init_route_store()
+    init_routing_backend()
+    get_eco_ledger()
+    get_hub_matrix()
+    get_freight_network()
+    get_charging_network()
+    yield
+    # Release pooled keep-alive connections to the routing service
+    await close_async_client()
+    close_shard_pool()
+    route_store.close_route_store()
+    close_eco_ledger()
+
+app = FastAPI(title="RouteZero API", description="Eco-friendly route optimization API", lifespan=lifespan)
 
 # Add CORS middleware for frontend integration
 app.add_middleware(
@@ -34,6 +78,19 @@ class RouteExplanationRequest(BaseModel):
 class ReverseLogisticsRequest(BaseModel):
     deliveries: List[Dict[str, Any]]
     returns: List[Dict[str, Any]]
+    mode: str = "greedy"  # or "optimal": most pairs, then least total distance; or "bundled"
+    vehicle: Optional[Dict[str, Any]] = None  # bundled mode: {"volume_l", "weight_kg"} spare per route
+    vehicle_type: Optional[str] = None  # pickup vehicle for the emissions KPIs; default REVERSE_PICKUP_VEHICLE
+
+class PairingEvent(BaseModel):
+    op: str  # "add", "update" or "remove"
+    kind: str  # "delivery" or "return"
+    id: str
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+class PairingEventsRequest(BaseModel):
+    events: List[PairingEvent]
 
 class RouteObject(BaseModel):
     distance_km: float
@@ -52,6 +109,157 @@ class FreightOptionsRequest(BaseModel):
     source: List[float]
     destination: List[float]
     mode: Optional[str] = "heavy_truck"  # default to truck, but allow rail/ship
+    region: Optional[str] = None  # defaults to the region of the nearest hub
+
+class ODPair(BaseModel):
+    source: List[float]
+    destination: List[float]
+    id: Optional[str] = None
+
+class BatchRouteOptionsRequest(BaseModel):
+    pairs: List[ODPair]
+
+class FreightPair(BaseModel):
+    source: List[float]
+    destination: List[float]
+    mode: Optional[str] = "heavy_truck"
+    id: Optional[str] = None
+
+class BatchFreightOptionsRequest(BaseModel):
+    pairs: List[FreightPair]
+
+class MultimodalFreightRequest(BaseModel):
+    source: List[float]
+    destination: List[float]
+
+class ChargingPlanRequest(BaseModel):
+    source: Optional[List[float]] = None
+    destination: Optional[List[float]] = None
+    coordinates: Optional[List[List[float]]] = None  # route LineString; fetched from source/destination if omitted
+    distance_km: Optional[float] = None
+    duration_min: Optional[float] = None
+    soc_start: float = 0.9  # state of charge at departure (0-1)
+    vehicle_profile: str = "ev"
+    battery_kwh: Optional[float] = None
+    consumption_kwh_per_km: Optional[float] = None
+    max_charge_kw: Optional[float] = None
+
+class FleetRoute(BaseModel):
+    distance_km: float
+    id: Optional[str] = None
+
+class FleetGroup(BaseModel):
+    vehicle_type: str  # carrier (ev, hybrid, diesel) or last-mile vehicle type
+    count: int
+    name: Optional[str] = None  # defaults to vehicle_type; needed for several groups of one type
+    max_range_km: Optional[float] = None  # defaults to the carrier's range
+    cost_factor: Optional[float] = None  # defaults to the carrier's cost factor
+
+class FleetAssignmentRequest(BaseModel):
+    routes: List[FleetRoute]
+    inventory: List[FleetGroup]
+
+class EcoPointsAwardRequest(BaseModel):
+    customer_id: str
+    points: Optional[int] = None  # negative to redeem
+    emissions_grams: Optional[float] = None  # award get_eco_points(emissions_grams) instead
+    reason: Optional[str] = None
+    award_id: Optional[str] = None  # idempotency key for retried awards
+
+def build_route_option(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Enrich a route summary with emissions, carrier and eco-points data.
+    
+    Args:
+        summary: Route summary with "distance" (m) and "duration" (s)
+        
+    Returns:
+        dict: Route option as returned by /route-options
+    """
+    dist_km = summary["distance"] / 1000
+    dur_min = summary["duration"] / 60
+    
+    # Calculate emissions for default vehicle (car/diesel)
+    emissions_data = calculate_emissions(dist_km)
+    
+    # Get green carrier recommendation
+    carrier_match = match_green_carrier(dist_km)
+    
+    # Calculate emissions for recommended vehicle
+    recommended_emissions = calculate_emissions(dist_km, carrier_match["vehicle_type"])
+
+    return {
+        "distance_km": round(dist_km, 2),
+        "duration_min": round(dur_min, 2),
+        "emissions_grams": emissions_data["emissions_grams"],
+        "emission_level": emissions_data["emission_level"],
+        "eco_tag": get_eco_tag(emissions_data["emission_level"]),
+        "eco_points": get_eco_points(emissions_data["emissions_grams"]),
+        "carrier_type": carrier_match["vehicle_type"],
+        "carrier_score": carrier_match["feasibility_score"],
+        "green_carrier": {
+            "recommended_vehicle": carrier_match["vehicle_type"],
+            "reasoning": carrier_match["reasoning"],
+            "feasibility_score": carrier_match["feasibility_score"],
+            "eco_impact": carrier_match["eco_impact"],
+            "recommended_emissions_grams": recommended_emissions["emissions_grams"],
+            "emissions_saved_grams": round(emissions_data["emissions_grams"] - recommended_emissions["emissions_grams"], 2),
+            "recommended_eco_points": get_eco_points(recommended_emissions["emissions_grams"]),
+            "points_gained": get_eco_points(recommended_emissions["emissions_grams"]) - get_eco_points(emissions_data["emissions_grams"])
+        }
+    }
+
+def record_route_option(route_option: Dict[str, Any], region: str, source: str) -> None:
+    """
+    Feed a served route option into the KPI aggregator.
+    
+    The trip is counted with the recommended green vehicle; savings are
+    measured against the default (diesel car) emissions.
+    """
+    green_carrier = route_option["green_carrier"]
+    emissions_aggregator.record(
+        region,
+        green_carrier["recommended_vehicle"],
+        route_option["distance_km"],
+        green_carrier["recommended_emissions_grams"],
+        green_carrier["emissions_saved_grams"],
+        source=source
+    )
+
+def record_reverse_logistics(result: Dict[str, Any], vehicle_type: str) -> None:
+    """
+    Feed a reverse-logistics result into the KPI aggregator.
+    
+    Each pair or bundle is one trip of the pickup vehicle over its distance
+    (the detour, in bundled mode). Savings are the dedicated pickup trips it
+    avoids, a round trip from each return's nearest hub, as in the bundled
+    km_avoided.
+    """
+    bundled = result["mode"] == "bundled"
+    entries = result["bundles"] if bundled else result["paired_routes"]
+    if not entries:
+        return
+    distances = np.array([entry["distance_km"] for entry in entries], dtype=np.float64)
+    emissions_grams = calculate_emissions_batch(distances, vehicle_type)["emissions_grams"]
+    saved_grams = np.zeros(len(entries))
+    resolver = get_region_resolver()
+    if resolver.hubs:
+        return_coords = [entry["return_coords"] if bundled else [entry["return_coords"]] for entry in entries]
+        points = np.array([point for coords in return_coords for point in coords], dtype=np.float64)
+        owners = np.repeat(np.arange(len(entries)), [len(coords) for coords in return_coords])
+        nearest = nearest_hub_km(resolver.hubs, points[:, 0], points[:, 1])
+        baseline_km = 2 * np.bincount(owners, weights=nearest, minlength=len(entries))
+        saved_grams = calculate_emissions_batch(baseline_km, vehicle_type)["emissions_grams"] - emissions_grams
+    for entry, grams, saved in zip(entries, emissions_grams, saved_grams):
+        lat, lon = entry["delivery_coords"]
+        emissions_aggregator.record(
+            resolver.region_for([lon, lat]),
+            vehicle_type,
+            entry["distance_km"],
+            float(grams),
+            round(float(saved), 2),
+            source="reverse_logistics"
+        )
 
 def extract_route_context(route_obj: RouteObject) -> Dict[str, Any]:
     """
@@ -279,18 +487,52 @@ async def route_options(request: Request):
     - Eco points calculation
     - Emissions comparison
     - Carrier assignment with scoring
+    - Optional route geometry ("geometry": "none", "simplified", "polyline" or "full")
+    - Upstream quota lane ("priority": "interactive" or "batch"); bulk jobs
+      should send "batch" so they never delay customer requests
+    - Optional segment-level emissions ("emissions_model": "segment") integrated
+      along the route geometry with gradient, speed class and payload
+      ("payload_kg", "vehicle_type") adjustments
     """
     try:
         body = await request.json()
         source = body.get("source")     # [lng, lat]
         destination = body.get("destination")
+        geometry = body.get("geometry", DEFAULT_GEOMETRY_MODE)
+        tolerance_m = body.get("geometry_tolerance_m", DEFAULT_SIMPLIFY_TOLERANCE_M)
+        priority = body.get("priority", "interactive")
+        emissions_model = body.get("emissions_model", "distance")
+        payload_kg = body.get("payload_kg", 0)
+        vehicle_type = body.get("vehicle_type", "car")
         
         # Validate required fields
         if not source or not destination:
             raise HTTPException(status_code=400, detail="Both source and destination coordinates are required")
         
-        # Get routes using safe wrapper
-        route_result = get_routes_safe(source, destination)
+        if not isinstance(tolerance_m, (int, float)) or tolerance_m < 0:
+            raise HTTPException(status_code=400, detail="geometry_tolerance_m must be a non-negative number")
+        
+        if emissions_model not in ("distance", "segment"):
+            raise HTTPException(status_code=400, detail="emissions_model must be 'distance' or 'segment'")
+        
+        if not isinstance(payload_kg, (int, float)) or payload_kg < 0:
+            raise HTTPException(status_code=400, detail="payload_kg must be a non-negative number")
+        
+        try:
+            validate_geometry_mode(geometry)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Segment emissions need coordinates (with elevation where available)
+        segment_model = emissions_model == "segment"
+        lookup_geometry = geometry
+        if segment_model and geometry not in ("simplified", "full"):
+            lookup_geometry = "simplified"
+        
+        # Get routes using the non-blocking safe wrapper
+        route_result = await get_routes_safe_async(
+            source, destination, lookup_geometry, float(tolerance_m), priority, elevation=segment_model
+        )
         
         if not route_result["success"]:
             raise HTTPException(status_code=400, detail=route_result["error"])
@@ -300,42 +542,29 @@ async def route_options(request: Request):
 
         for feature in raw_routes["features"]:
             summary = feature["properties"]["summary"]
-            dist_km = summary["distance"] / 1000
-            dur_min = summary["duration"] / 60
-            
-            # Calculate emissions for default vehicle (car/diesel)
-            emissions_data = calculate_emissions(dist_km)
-            
-            # Get green carrier recommendation
-            carrier_match = match_green_carrier(dist_km)
-            
-            # Calculate emissions for recommended vehicle
-            recommended_emissions = calculate_emissions(dist_km, carrier_match["vehicle_type"])
-
-            route_data.append({
-                "distance_km": round(dist_km, 2),
-                "duration_min": round(dur_min, 2),
-                "emissions_grams": emissions_data["emissions_grams"],
-                "emission_level": emissions_data["emission_level"],
-                "eco_tag": get_eco_tag(emissions_data["emission_level"]),
-                "eco_points": get_eco_points(emissions_data["emissions_grams"]),
-                "carrier_type": carrier_match["vehicle_type"],
-                "carrier_score": carrier_match["feasibility_score"],
-                "green_carrier": {
-                    "recommended_vehicle": carrier_match["vehicle_type"],
-                    "reasoning": carrier_match["reasoning"],
-                    "feasibility_score": carrier_match["feasibility_score"],
-                    "eco_impact": carrier_match["eco_impact"],
-                    "recommended_emissions_grams": recommended_emissions["emissions_grams"],
-                    "emissions_saved_grams": round(emissions_data["emissions_grams"] - recommended_emissions["emissions_grams"], 2),
-                    "recommended_eco_points": get_eco_points(recommended_emissions["emissions_grams"]),
-                    "points_gained": get_eco_points(recommended_emissions["emissions_grams"]) - get_eco_points(emissions_data["emissions_grams"])
-                }
-            })
+            route_option = build_route_option(summary)
+            if geometry == lookup_geometry:
+                route_option.update(geometry_output(feature))
+            elif geometry == "polyline" and feature["geometry"]:
+                route_option["polyline"] = encode_polyline(feature["geometry"]["coordinates"])
+            if segment_model and feature["geometry"]:
+                route_option["segment_emissions"] = integrate_emissions(
+                    feature["geometry"]["coordinates"], vehicle_type,
+                    distance_m=summary["distance"], duration_s=summary["duration"], payload_kg=float(payload_kg)
+                )
+            if feature["properties"].get("estimated"):
+                # Routing service degraded: distance/duration are approximations
+                route_option["estimated"] = True
+            route_data.append(route_option)
 
         # Sort routes by emissions (lowest to highest)
         route_data.sort(key=lambda x: x["emissions_grams"])
         
+        # Count the recommended (lowest-emission) option towards the KPIs
+        if route_data:
+            region = body.get("region") or get_region_resolver().region_for(source)
+            record_route_option(route_data[0], region, "route_options")
+        
         return {"routes": route_data}
         
     except HTTPException:
@@ -343,6 +572,56 @@ async def route_options(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/route-options/batch")
+async def route_options_batch(request: BatchRouteOptionsRequest):
+    """
+    Get eco-friendly route options for many origin/destination pairs at once.
+    
+    Features:
+    - Distances/durations from a few chunked ORS matrix calls
+    - Same emissions, carrier and eco-points enrichment as /route-options
+    - Per-pair errors without failing the whole batch
+    """
+    try:
+        if not request.pairs:
+            raise HTTPException(status_code=400, detail="pairs must not be empty")
+        
+        if len(request.pairs) > MAX_BATCH_ROUTE_PAIRS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {MAX_BATCH_ROUTE_PAIRS} pairs"
+            )
+        
+        try:
+            matrix = await get_route_matrix_async(
+                [(pair.source, pair.destination) for pair in request.pairs]
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        results = []
+        for index, (pair, result) in enumerate(zip(request.pairs, matrix["results"])):
+            entry = {"index": index, "id": pair.id}
+            if "summary" in result:
+                entry["success"] = True
+                entry["route"] = build_route_option(result["summary"])
+            else:
+                entry["success"] = False
+                entry["error"] = result["error"]
+            results.append(entry)
+        
+        return {
+            "results": results,
+            "total_pairs": len(results),
+            "successful_pairs": sum(1 for r in results if r["success"]),
+            "upstream_calls": matrix["upstream_calls"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 @app.post("/generate-explanation")
 async def generate_explanation(request: LLMExplanationRequest):
     """
@@ -439,6 +718,10 @@ async def reverse_logistics_optimization(request: ReverseLogisticsRequest):
     - Proximity-based pairing (within 3km)
     - Haversine distance calculation
     - Efficiency metrics
+    - Optional globally optimal matching, compared against greedy
+    - Optional bundling of several returns per stop within vehicle capacity
+    - Large batches are split by region and solved in worker processes
+    - Pickups and their savings are recorded in the emissions KPIs
     """
     try:
         # Validate input data
@@ -463,8 +746,15 @@ async def reverse_logistics_optimization(request: ReverseLogisticsRequest):
                     detail="Each return must have 'id', 'lat', and 'lon' fields"
                 )
         
-        # Optimize reverse pickup
-        result = optimize_reverse_pickup(request.deliveries, request.returns)
+        vehicle_type = request.vehicle_type or REVERSE_PICKUP_VEHICLE
+        if vehicle_type not in factor_registry.current.mode("last_mile").vehicle_index:
+            raise ValueError(f"Unknown pickup vehicle type '{vehicle_type}'")
+        
+        # CPU-bound solve; keep the event loop free for other requests
+        result = await asyncio.to_thread(
+            solve_reverse_logistics, request.deliveries, request.returns, request.mode, request.vehicle
+        )
+        record_reverse_logistics(result, vehicle_type)
         
         return {
             "success": True,
@@ -473,9 +763,36 @@ async def reverse_logistics_optimization(request: ReverseLogisticsRequest):
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/reverse-logistics/events")
+async def reverse_logistics_events(request: PairingEventsRequest):
+    """
+    Feed delivery and return events into the live pairing.
+    
+    Features:
+    - Only pairs near the changed items are revisited
+    - add/update upsert an item; removing frees its partner for re-pairing
+    - Returns the pairs formed and broken by these events
+    """
+    try:
+        return pairing_service.apply([event.model_dump(exclude_none=True) for event in request.events])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/reverse-logistics/plan")
+async def reverse_logistics_plan():
+    """Current live pairing of all open deliveries and returns."""
+    return {
+        "success": True,
+        "data": pairing_service.plan()
+    }
+
 @app.post("/freight-options")
 async def freight_options(request: FreightOptionsRequest):
     """
@@ -490,6 +807,16 @@ async def freight_options(request: FreightOptionsRequest):
         # Get freight route and emissions
         result = get_freight_routes(request.source, request.destination, request.mode)
         logger.info(f"Freight route: {result}")
+        # Savings are measured against moving the load by heavy truck
+        truck_grams = float(calculate_freight_emissions_batch([result["distance_km"]], "heavy_truck")["emissions_grams"][0])
+        emissions_aggregator.record(
+            request.region or get_region_resolver().region_for(request.source),
+            result["vehicle_type"],
+            result["distance_km"],
+            result["emissions_grams"],
+            round(truck_grams - result["emissions_grams"], 2),
+            source="freight_options"
+        )
         return {"freight_route": result}
     except HTTPException:
         raise
@@ -497,6 +824,294 @@ async def freight_options(request: FreightOptionsRequest):
         logger.error(f"Error in /freight-options: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/freight-options/batch")
+async def freight_options_batch(request: BatchFreightOptionsRequest):
+    """
+    Get freight route options for many origin/destination pairs at once.
+    
+    Features:
+    - Distances, durations, per-mode emissions and recommended modes computed
+      as array operations over the whole batch
+    - Same fields per pair as /freight-options, plus emissions_by_mode
+    - Per-pair errors for invalid coordinates without failing the batch
+    """
+    try:
+        if not request.pairs:
+            raise HTTPException(status_code=400, detail="pairs must not be empty")
+        
+        if len(request.pairs) > MAX_BATCH_FREIGHT_PAIRS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {MAX_BATCH_FREIGHT_PAIRS} pairs"
+            )
+        
+        well_formed = np.array([len(p.source) == 2 and len(p.destination) == 2 for p in request.pairs])
+        coords = np.zeros((len(request.pairs), 4))
+        coords[well_formed] = [p.source + p.destination for p, ok in zip(request.pairs, well_formed) if ok]
+        lngs, lats = coords[:, [0, 2]], coords[:, [1, 3]]
+        valid = well_formed & np.all((np.abs(lngs) <= 180) & (np.abs(lats) <= 90), axis=1)
+        
+        valid_indices = np.flatnonzero(valid)
+        routes = get_freight_routes_batch(
+            coords[valid_indices, :2], coords[valid_indices, 2:],
+            np.array([request.pairs[i].mode or "heavy_truck" for i in valid_indices], dtype=object).astype(str)
+        )
+        modes = routes["modes"].tolist()
+        
+        results = [
+            {"index": i, "id": pair.id, "success": False, "error": "Invalid source or destination coordinates"}
+            for i, pair in enumerate(request.pairs)
+        ]
+        columns = {
+            key: routes[key].tolist()
+            for key in ("distance_km", "duration_min", "emissions_grams", "freight_emission_level", "vehicle_type",
+                        "recommended_mode", "emissions_saved_grams", "percent_emissions_saved", "best_emissions_grams")
+        }
+        emissions_by_mode = routes["emissions_by_mode"].tolist()
+        for row, index in enumerate(valid_indices.tolist()):
+            freight_route = {key: values[row] for key, values in columns.items()}
+            freight_route["emissions_by_mode"] = dict(zip(modes, emissions_by_mode[row]))
+            results[index] = {"index": index, "id": request.pairs[index].id, "success": True, "freight_route": freight_route}
+        
+        return {
+            "results": results,
+            "total_pairs": len(results),
+            "successful_pairs": len(valid_indices),
+            "total_emissions_grams": round(float(routes["emissions_grams"].sum()), 2),
+            "total_best_emissions_grams": round(float(routes["best_emissions_grams"].sum()), 2),
+            "recommended_mode_counts": {
+                mode: int(count) for mode, count in zip(*np.unique(routes["recommended_mode"], return_counts=True))
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/freight-options/multimodal")
+async def freight_options_multimodal(request: MultimodalFreightRequest):
+    """
+    Plan intermodal freight paths over the truck / rail / waterway network.
+    
+    Features:
+    - Lowest-emission and fastest paths, plus the full emissions/duration
+      Pareto front between them
+    - Leg-by-leg distance, duration and emissions, including truck drayage
+      to and from terminals and mode transfers
+    - Savings compared with trucking the whole way
+    """
+    network = get_freight_network()
+    if network is None:
+        raise HTTPException(status_code=503, detail="Freight network is not available")
+    try:
+        for name, coords in (("source", request.source), ("destination", request.destination)):
+            if len(coords) != 2 or not (-180 <= coords[0] <= 180 and -90 <= coords[1] <= 90):
+                raise HTTPException(status_code=400, detail=f"Invalid {name} coordinates. Expected [lng, lat]")
+        return {"multimodal_plan": network.plan(request.source, request.destination)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/ev-charging-plan")
+async def ev_charging_plan(request: ChargingPlanRequest):
+    """
+    Plan minimum-time charging stops for an EV along a route.
+    
+    Features:
+    - Route given as coordinates, or fetched for source/destination
+    - Stations within the route corridor from the local station file
+    - Stops chosen to minimize driving, detour, stop and charging time
+      while keeping the battery above the profile's reserve
+    """
+    network = get_charging_network()
+    if network is None:
+        raise HTTPException(status_code=503, detail="Charging station data is not available")
+    try:
+        profile = network.profile(request.vehicle_profile, {
+            "battery_kwh": request.battery_kwh,
+            "consumption_kwh_per_km": request.consumption_kwh_per_km,
+            "max_charge_kw": request.max_charge_kw
+        })
+        
+        coordinates = request.coordinates
+        distance_m = request.distance_km * 1000 if request.distance_km is not None else None
+        duration_s = request.duration_min * 60 if request.duration_min is not None else None
+        if coordinates is None:
+            if not request.source or not request.destination:
+                raise HTTPException(status_code=400, detail="Provide coordinates or both source and destination")
+            route_result = await get_routes_safe_async(request.source, request.destination, "simplified")
+            if not route_result["success"]:
+                raise HTTPException(status_code=400, detail=route_result["error"])
+            feature = route_result["data"]["features"][0]
+            coordinates = feature["geometry"]["coordinates"]
+            summary = feature["properties"]["summary"]
+            distance_m, duration_s = summary["distance"], summary["duration"]
+        
+        return {
+            "charging_plan": network.plan(coordinates, request.soc_start, profile, distance_m, duration_s),
+            "vehicle_profile": profile
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/fleet-assignment")
+async def fleet_assignment(request: FleetAssignmentRequest):
+    """
+    Assign a hub's vehicle inventory to a batch of routes.
+    
+    Features:
+    - Minimum total emissions under vehicle counts and range limits
+    - Routes the fleet cannot cover are reported unassigned
+    - Shows how far per-route recommendations would overbook the fleet
+    """
+    try:
+        if not request.routes:
+            raise HTTPException(status_code=400, detail="routes must not be empty")
+        
+        if len(request.routes) > MAX_FLEET_ASSIGNMENT_ROUTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"An assignment may contain at most {MAX_FLEET_ASSIGNMENT_ROUTES} routes"
+            )
+        
+        inventory = [group.model_dump(exclude_none=True) for group in request.inventory]
+        distances = [route.distance_km for route in request.routes]
+        # CPU-bound solve; keep the event loop free for other requests
+        result = await asyncio.to_thread(assign_fleet, distances, inventory)
+        
+        emissions = result.pop("emissions_grams").tolist()
+        vehicles = result.pop("vehicle")
+        result["assignments"] = [
+            {
+                "index": i,
+                "id": route.id,
+                "distance_km": route.distance_km,
+                "vehicle": vehicles[i],
+                "emissions_grams": emissions[i] if vehicles[i] is not None else None
+            }
+            for i, route in enumerate(request.routes)
+        ]
+        return result
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/eco-points/award")
+async def award_eco_points(request: EcoPointsAwardRequest):
+    """
+    Credit (or redeem) eco-points for a customer.
+    
+    Features:
+    - Points given directly, or derived from a delivery's emissions
+    - Written to the append-only ledger log before balances change
+    - Retries with the same award_id are applied once
+    """
+    try:
+        if (request.points is None) == (request.emissions_grams is None):
+            raise HTTPException(status_code=400, detail="Provide exactly one of points or emissions_grams")
+        
+        points = request.points if request.points is not None else get_eco_points(request.emissions_grams)
+        return get_eco_ledger().award(request.customer_id, points, request.reason, request.award_id)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/eco-points/leaderboard")
+async def eco_points_leaderboard(limit: int = 10, offset: int = 0):
+    """Top customers by eco-points balance (ties broken by customer id)."""
+    try:
+        ledger = get_eco_ledger()
+        return {
+            "leaderboard": ledger.leaderboard(limit, offset),
+            "total_customers": len(ledger.balances)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/eco-points/{customer_id}")
+async def eco_points_balance(customer_id: str):
+    """A customer's eco-points balance and leaderboard rank."""
+    return get_eco_ledger().standing(customer_id)
+
+@app.get("/hub-matrix/hubs")
+async def hub_matrix_hubs():
+    """List the hubs available in the precomputed hub matrix."""
+    matrix = get_hub_matrix()
+    if matrix is None:
+        raise HTTPException(status_code=503, detail="Hub matrix is not available")
+    return {
+        "hubs": [{"index": i, **hub} for i, hub in enumerate(matrix.hubs)],
+        "total_hubs": len(matrix),
+        "metadata": matrix.metadata
+    }
+
+@app.get("/hub-matrix")
+async def hub_matrix_lookup(source: str, destination: str):
+    """
+    Look up precomputed distance, duration and per-mode emissions between two hubs.
+    
+    Features:
+    - O(1) lookup in the in-memory hub-to-hub matrix
+    - Hubs addressed by name or index (see /hub-matrix/hubs)
+    """
+    matrix = get_hub_matrix()
+    if matrix is None:
+        raise HTTPException(status_code=503, detail="Hub matrix is not available")
+    try:
+        return {"hub_route": matrix.lookup(source, destination)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@app.get("/emission-factors")
+async def emission_factors():
+    """Return the emission factor version and tables currently in use."""
+    return factor_registry.current.to_dict()
+
+@app.post("/emission-factors/reload")
+async def reload_emission_factors():
+    """
+    Reload emission factors from the config file without a restart.
+    
+    The previous version stays active if the new config is invalid.
+    """
+    try:
+        factors = factor_registry.reload()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"version": factors.version, "revision": factors.revision}
+
+@app.get("/kpis/emissions")
+async def emissions_kpis(resolution: str = "hour", buckets: Optional[int] = None):
+    """
+    Live carbon footprint and savings KPIs for the dashboard.
+    
+    Features:
+    - Totals, per-region and per-vehicle breakdowns and a time series
+    - Resolutions: "minute", "hour" and "day" over the last `buckets` periods
+      (e.g. resolution=day&buckets=7 for weekly savings)
+    - Reads pre-aggregated buckets; cost does not grow with traffic
+    """
+    try:
+        return emissions_aggregator.query(resolution, buckets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring."""
@@ -508,5 +1123,18 @@ async def health_check():
             "eco_points_calculation": "available",
             "reverse_logistics": "available",
             "llm_explanation": "available"
+        },
+        "route_cache": route_cache.stats(),
+        "route_store": route_store.route_store.stats() if route_store.route_store else None,
+        "routing_breaker": routing_breaker.stats(),
+        "emission_factors": factor_registry.stats(),
+        "emissions_aggregator": emissions_aggregator.stats(),
+        "freight_network": get_freight_network().stats() if get_freight_network() else None,
+        "charging_network": get_charging_network().stats() if get_charging_network() else None,
+        "eco_ledger": get_eco_ledger().stats(),
+        "pairing_service": pairing_service.stats(),
+        "upstream_quota": {
+            "directions": directions_scheduler.stats(),
+            "matrix": matrix_scheduler.stats()
         }
     }
@@ -0,0 +1,399 @@
+"""
+Capacity-constrained bundling of several returns onto each delivery stop.
+
+Pairing gives each delivery at most one return. Bundling lets a delivery
+stop collect every return within the pairing radius that still fits in
+the vehicle: from the stop the driver makes a short loop through the
+returns and comes back. Stops on the same driver route (deliveries sharing
+a route_id) share one vehicle's spare capacity; a stop without a route_id
+is a route of its own.
+
+Each return only considers its nearest candidate stops from the spatial
+index:
+
+- construction: cheapest insertion, i.e. repeatedly add the return whose
+  cheapest feasible insertion into some stop's loop adds the least detour
+- local search: move each return to the stop and loop position that cuts
+  the total detour most, then retry the returns still left over, until a
+  pass changes nothing
+
+Distances are straight-line km. Every bundled return saves a dedicated
+pickup trip, counted as a round trip from its nearest hub.
+"""
+
+import heapq
+import math
+import os
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+import numpy as np
+
+from reverse_logistics import candidate_pairs
+from spatial_index import EARTH_RADIUS_KM
+from fleet_emissions import haversine_km_array
+
+logger = logging.getLogger(__name__)
+
+# Spare capacity a vehicle has for collected returns
+BUNDLE_VEHICLE_VOLUME_L = float(os.getenv("BUNDLE_VEHICLE_VOLUME_L", "600"))
+BUNDLE_VEHICLE_WEIGHT_KG = float(os.getenv("BUNDLE_VEHICLE_WEIGHT_KG", "250"))
+
+# Size assumed for a return that does not give its own
+DEFAULT_RETURN_VOLUME_L = float(os.getenv("DEFAULT_RETURN_VOLUME_L", "20"))
+DEFAULT_RETURN_WEIGHT_KG = float(os.getenv("DEFAULT_RETURN_WEIGHT_KG", "3"))
+
+# Nearest candidate stops kept per return, and the local search pass limit
+BUNDLE_CANDIDATE_STOPS = int(os.getenv("BUNDLE_CANDIDATE_STOPS", "12"))
+BUNDLE_LOCAL_SEARCH_PASSES = int(os.getenv("BUNDLE_LOCAL_SEARCH_PASSES", "5"))
+
+# A move must save more than this (km) to count as an improvement
+_MIN_GAIN_KM = 1e-9
+
+def _point(item: Dict[str, Any]) -> Tuple[float, float, float]:
+    lat, lon = math.radians(item["lat"]), math.radians(item["lon"])
+    return lat, lon, math.cos(lat)
+
+def _km(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> float:
+    hav = math.sin((b[0] - a[0]) / 2) ** 2 + a[2] * b[2] * math.sin((b[1] - a[1]) / 2) ** 2
+    return 2 * math.asin(math.sqrt(min(hav, 1.0))) * EARTH_RADIUS_KM
+
+def _size(item: Dict[str, Any], key: str, default: float, positive: bool = False) -> float:
+    value = item.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) \
+            or value < 0 or (positive and value == 0):
+        kind = "positive" if positive else "non-negative"
+        raise ValueError(f"'{key}' of '{item.get('id', 'vehicle')}' must be a {kind} number")
+    return float(value)
+
+class _Bundler:
+    """
+    Pickup loops per stop with route loads, changed by insert and remove.
+    """
+
+    def __init__(self, stop_points, return_points, sizes, routes, capacity, candidates):
+        self.stop_points = stop_points
+        self.return_points = return_points
+        self.sizes = sizes
+        self.routes = routes
+        self.capacity = capacity
+        self.candidates = candidates
+        self.loops: List[List[int]] = [[] for _ in stop_points]
+        # Per stop, the length of each leg of its loop (stop -> returns -> stop)
+        self.legs: List[List[float]] = [[0.0] for _ in stop_points]
+        self.versions = [0] * len(stop_points)
+        self.loads = {route: [0.0, 0.0] for route in set(routes)}
+        self.stop_of = [-1] * len(return_points)
+        # Search work, for checking it stays proportional to the candidates
+        self.insertions_evaluated = 0
+        self.heap_pops = 0
+
+    def fits(self, stop: int, j: int) -> bool:
+        load = self.loads[self.routes[stop]]
+        volume, weight = self.sizes[j]
+        return load[0] + volume <= self.capacity[0] and load[1] + weight <= self.capacity[1]
+
+    def _nodes(self, stop: int) -> list:
+        return [self.stop_points[stop]] + [self.return_points[r] for r in self.loops[stop]]
+
+    def insertion(self, stop: int, j: int, distance: float) -> Tuple[float, int]:
+        """Cheapest added detour for return j, distance km from the stop, and where in the loop."""
+        self.insertions_evaluated += 1
+        if not self.loops[stop]:
+            return 2 * distance, 0
+        point = self.return_points[j]
+        to_point = [_km(node, point) for node in self._nodes(stop)]
+        to_point.append(to_point[0])
+        best = (math.inf, 0)
+        for position, leg in enumerate(self.legs[stop]):
+            added = to_point[position] + to_point[position + 1] - leg
+            if added < best[0]:
+                best = (added, position)
+        return best
+
+    def removal(self, j: int) -> float:
+        """Detour saved by taking return j out of its loop."""
+        stop = self.stop_of[j]
+        nodes = self._nodes(stop)
+        position = self.loops[stop].index(j) + 1
+        before, after = nodes[position - 1], nodes[(position + 1) % len(nodes)]
+        return self.legs[stop][position - 1] + self.legs[stop][position] - _km(before, after)
+
+    def _relink(self, stop: int) -> None:
+        nodes = self._nodes(stop)
+        self.legs[stop] = [_km(a, b) for a, b in zip(nodes, nodes[1:] + nodes[:1])]
+        self.versions[stop] += 1
+
+    def _load(self, stop: int, j: int, sign: int) -> None:
+        load = self.loads[self.routes[stop]]
+        load[0] += sign * self.sizes[j][0]
+        load[1] += sign * self.sizes[j][1]
+
+    def insert(self, stop: int, j: int, position: int) -> None:
+        self.loops[stop].insert(position, j)
+        self.stop_of[j] = stop
+        self._load(stop, j, 1)
+        self._relink(stop)
+
+    def remove(self, j: int) -> None:
+        stop = self.stop_of[j]
+        self.loops[stop].remove(j)
+        self.stop_of[j] = -1
+        self._load(stop, j, -1)
+        self._relink(stop)
+
+    def construct(self, pending: List[int]) -> None:
+        """Cheapest insertion of the pending returns, with lazily refreshed costs."""
+        heap = []
+        for j in pending:
+            for stop, distance in self.candidates[j]:
+                if self.fits(stop, j):
+                    added, position = self.insertion(stop, j, distance)
+                    heap.append((added, j, stop, position, distance, self.versions[stop]))
+        heapq.heapify(heap)
+        while heap:
+            added, j, stop, position, distance, version = heapq.heappop(heap)
+            self.heap_pops += 1
+            # Loads only grow here, so a return that no longer fits never will
+            if self.stop_of[j] != -1 or not self.fits(stop, j):
+                continue
+            if version != self.versions[stop]:
+                added, position = self.insertion(stop, j, distance)
+                heapq.heappush(heap, (added, j, stop, position, distance, self.versions[stop]))
+                continue
+            self.insert(stop, j, position)
+
+    def relocate(self) -> bool:
+        """Move each bundled return to its best stop and position; True if the detour shrank."""
+        improved = False
+        for j in range(len(self.return_points)):
+            if self.stop_of[j] == -1:
+                continue
+            saved = self.removal(j)
+            if saved <= _MIN_GAIN_KM:
+                continue
+            self.remove(j)
+            best = None
+            for stop, distance in self.candidates[j]:
+                if self.fits(stop, j):
+                    added, position = self.insertion(stop, j, distance)
+                    if best is None or added < best[0]:
+                        best = (added, stop, position)
+            # The return's own slot is always available, so best is never None
+            added, stop, position = best
+            self.insert(stop, j, position)
+            improved |= added < saved - _MIN_GAIN_KM
+        return improved
+
+def _capacity(vehicle: Optional[Dict[str, Any]]) -> Tuple[float, float]:
+    vehicle = vehicle or {}
+    return (_size(vehicle, "volume_l", BUNDLE_VEHICLE_VOLUME_L, positive=True),
+            _size(vehicle, "weight_kg", BUNDLE_VEHICLE_WEIGHT_KG, positive=True))
+
+def _return_size(return_item: Dict[str, Any]) -> Tuple[float, float]:
+    return (_size(return_item, "volume_l", DEFAULT_RETURN_VOLUME_L),
+            _size(return_item, "weight_kg", DEFAULT_RETURN_WEIGHT_KG))
+
+def _route_key(stop: Dict[str, Any], s: int) -> tuple:
+    route_id = stop.get("route_id")
+    if route_id is not None and (isinstance(route_id, bool) or not isinstance(route_id, (str, int))):
+        raise ValueError(f"'route_id' of delivery '{stop['id']}' must be a string or integer")
+    return ("stop", s) if route_id is None else ("route", route_id)
+
+def validate_bundling(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                      vehicle: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Check sizes, capacity and route ids without bundling.
+
+    Raises:
+        ValueError: If a size, capacity or route_id is invalid
+    """
+    _capacity(vehicle)
+    for s, stop in enumerate(deliveries):
+        _route_key(stop, s)
+    for return_item in returns:
+        _return_size(return_item)
+
+def bundle_returns(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                   vehicle: Optional[Dict[str, Any]] = None,
+                   counters: Optional[Dict[str, int]] = None) -> List[Tuple[int, List[int], float]]:
+    """
+    Bundle returns onto delivery stops without building the response.
+
+    Args:
+        counters: If given, filled with the search work done: insertion
+                  costs evaluated, heap pops and local search passes
+
+    Returns:
+        list: (delivery index, return indices in pickup order, detour_km) per
+        bundle, in delivery order
+
+    Raises:
+        ValueError: If a size, capacity or route_id is invalid
+    """
+    capacity = _capacity(vehicle)
+
+    # Like pairing, each id is bundled at most once: use first occurrences
+    first_delivery, first_return = {}, {}
+    for i, delivery in enumerate(deliveries):
+        first_delivery.setdefault(delivery["id"], i)
+    for j, return_item in enumerate(returns):
+        first_return.setdefault(return_item["id"], j)
+    stop_index, pickup_index = list(first_delivery.values()), list(first_return.values())
+    stops = [deliveries[i] for i in stop_index]
+    pickups = [returns[j] for j in pickup_index]
+
+    routes = [_route_key(stop, s) for s, stop in enumerate(stops)]
+    sizes = [_return_size(r) for r in pickups]
+
+    # Each return keeps its nearest stops (ties to the earlier stop)
+    stop_idx, return_idx, distances = candidate_pairs(stops, pickups)
+    order = np.lexsort((stop_idx, distances, return_idx))
+    candidates: List[List[Tuple[int, float]]] = [[] for _ in pickups]
+    for s, j, distance in zip(stop_idx[order].tolist(), return_idx[order].tolist(), distances[order].tolist()):
+        if len(candidates[j]) < BUNDLE_CANDIDATE_STOPS:
+            candidates[j].append((s, distance))
+
+    bundler = _Bundler([_point(s) for s in stops], [_point(r) for r in pickups],
+                       sizes, routes, capacity, candidates)
+    bundler.construct(list(range(len(pickups))))
+    passes = 0
+    while passes < BUNDLE_LOCAL_SEARCH_PASSES:
+        passes += 1
+        improved = bundler.relocate()
+        # Moves between routes can free room for returns left over
+        leftover = [j for j in range(len(pickups)) if bundler.stop_of[j] == -1 and candidates[j]]
+        bundler.construct(leftover)
+        if not improved and all(bundler.stop_of[j] == -1 for j in leftover):
+            break
+
+    bundles = [(stop_index[s], [pickup_index[j] for j in loop], sum(bundler.legs[s]))
+               for s, loop in enumerate(bundler.loops) if loop]
+    logger.info(f"Bundled {sum(len(loop) for _, loop, _ in bundles)} of {len(returns)} returns onto "
+                f"{len(bundles)} stops after {passes} local search passes")
+    if counters is not None:
+        counters.update(insertions=bundler.insertions_evaluated, heap_pops=bundler.heap_pops, passes=passes)
+    return bundles
+
+def nearest_hub_km(hubs: List[Dict[str, Any]], lats, lons) -> np.ndarray:
+    """
+    Straight-line km from each point to its nearest hub.
+
+    A dedicated pickup trip is counted as the round trip from there, which
+    is the baseline that bundled and paired pickups are measured against.
+    """
+    hub_coords = np.array([hub["coordinates"] for hub in hubs], dtype=np.float64).reshape(-1, 2)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return haversine_km_array(hub_coords[None, :, 0], hub_coords[None, :, 1],
+                              lons[:, None], lats[:, None]).min(axis=1)
+
+def bundling_result(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                    bundles: List[Tuple[int, List[int], float]],
+                    vehicle: Optional[Dict[str, Any]] = None,
+                    hubs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Response of bundle_reverse_pickups for the given bundles.
+
+    Args:
+        bundles: (delivery index, return indices in pickup order, detour_km)
+                 per bundle
+    """
+    capacity = _capacity(vehicle)
+    if hubs is None:
+        from hub_matrix import load_hubs
+        try:
+            hubs = load_hubs()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load hubs for the bundling baseline: {e}")
+            hubs = []
+
+    results = []
+    route_loads: Dict[Any, Dict[str, Any]] = {}
+    detour_km = 0.0
+    for i, loop, detour in bundles:
+        stop = deliveries[i]
+        detour_km += detour
+        sizes = [_return_size(returns[j]) for j in loop]
+        volume = sum(size[0] for size in sizes)
+        weight = sum(size[1] for size in sizes)
+        results.append({
+            "delivery_id": stop["id"],
+            "route_id": stop.get("route_id"),
+            "delivery_coords": [stop["lat"], stop["lon"]],
+            "return_ids": [returns[j]["id"] for j in loop],
+            "return_coords": [[returns[j]["lat"], returns[j]["lon"]] for j in loop],
+            "distance_km": round(detour, 2),
+            "volume_l": round(volume, 2),
+            "weight_kg": round(weight, 2),
+            "route_type": "bundled_delivery_returns"
+        })
+        if stop.get("route_id") is not None:
+            route = route_loads.setdefault(stop["route_id"], {
+                "route_id": stop["route_id"], "stops": 0, "returns": 0, "volume_l": 0.0, "weight_kg": 0.0
+            })
+            route["stops"] += 1
+            route["returns"] += len(loop)
+            route["volume_l"] += volume
+            route["weight_kg"] += weight
+    for route in route_loads.values():
+        route["volume_utilization"] = round(route["volume_l"] / capacity[0] * 100, 1)
+        route["weight_utilization"] = round(route["weight_kg"] / capacity[1] * 100, 1)
+        route["volume_l"] = round(route["volume_l"], 2)
+        route["weight_kg"] = round(route["weight_kg"], 2)
+
+    bundled = [j for _, loop, _ in bundles for j in loop]
+    baseline_km = km_avoided = None
+    if hubs and bundled:
+        nearest = nearest_hub_km(hubs, [returns[j]["lat"] for j in bundled], [returns[j]["lon"] for j in bundled])
+        baseline = 2 * float(nearest.sum())
+        baseline_km, km_avoided = round(baseline, 2), round(baseline - detour_km, 2)
+    elif hubs:
+        baseline_km = km_avoided = 0.0
+
+    bundled_ids = {returns[j]["id"] for j in bundled}
+    bundle_stops = {bundle["delivery_id"] for bundle in results}
+    return {
+        "mode": "bundled",
+        "bundles": results,
+        "routes": list(route_loads.values()),
+        "unpaired_deliveries": [d for d in deliveries if d["id"] not in bundle_stops],
+        "unpaired_returns": [r for r in returns if r["id"] not in bundled_ids],
+        "total_bundles": len(results),
+        "bundled_returns": len(bundled),
+        "total_deliveries": len(deliveries),
+        "total_returns": len(returns),
+        "total_distance_km": round(detour_km, 2),
+        "bundling_efficiency": round(len(bundled) / len(returns) * 100, 1) if returns else 0,
+        "vehicle": {"volume_l": capacity[0], "weight_kg": capacity[1]},
+        "trips_avoided": len(bundled),
+        "baseline_km": baseline_km,
+        "km_avoided": km_avoided
+    }
+
+def bundle_reverse_pickups(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                           vehicle: Optional[Dict[str, Any]] = None,
+                           hubs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Attach returns to delivery stops within the pairing radius, several per
+    stop, without exceeding any route's vehicle capacity.
+
+    Args:
+        deliveries: [{"id", "lat", "lon", "route_id" (optional)}, ...]
+        returns: [{"id", "lat", "lon", "volume_l" (optional),
+                 "weight_kg" (optional)}, ...]
+        vehicle: Spare capacity per route, {"volume_l", "weight_kg"}; missing
+                 values use BUNDLE_VEHICLE_VOLUME_L / BUNDLE_VEHICLE_WEIGHT_KG
+        hubs: Hubs with [lng, lat] coordinates that dedicated pickup trips
+              start from; defaults to the hub list
+
+    Returns:
+        dict: Bundles per stop, per-route loads, leftover deliveries and
+        returns, and the trips and km avoided against dedicated pickups
+        (km figures are None when there are no hubs)
+
+    Raises:
+        ValueError: If a size, capacity or route_id is invalid
+    """
+    bundles = bundle_returns(deliveries, returns, vehicle)
+    return bundling_result(deliveries, returns, bundles, vehicle, hubs)
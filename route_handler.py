@@ -1,9 +1,24 @@
 import openrouteservice
 from openrouteservice import convert
+import httpx
+import requests
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
 import os
 from dotenv import load_dotenv
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Callable, Awaitable, Hashable
 import logging
+from route_cache import route_cache, make_route_key
+import route_store
+from local_router import get_local_router
+from route_geometry import (
+    DEFAULT_GEOMETRY_MODE, DEFAULT_SIMPLIFY_TOLERANCE_M, validate_geometry_mode, shape_feature
+)
+from circuit_breaker import CircuitBreaker
+from upstream_scheduler import directions_scheduler, matrix_scheduler, SchedulerRejectedError, PRIORITIES
+from fleet_emissions import haversine_km
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,6 +26,30 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 ORS_API_KEY = os.getenv("ORS_API_KEY")
+ORS_BASE_URL = os.getenv("ORS_BASE_URL", "https://api.openrouteservice.org")
+ORS_TIMEOUT_S = float(os.getenv("ORS_TIMEOUT_S", "30"))
+ORS_MAX_CONNECTIONS = int(os.getenv("ORS_MAX_CONNECTIONS", "50"))
+
+# "ors" (OpenRouteService API) or "local" (road graph extract, see local_router)
+ROUTING_BACKEND = os.getenv("ROUTING_BACKEND", "ors").lower()
+
+ROUTE_PROFILE = "driving-car"
+ALTERNATIVE_ROUTES = {"share_factor": 0.6, "target_count": 3}
+
+# Per-request latency budget for upstream routing; slower lookups are answered
+# with an estimate while the upstream call finishes in the background
+ROUTE_LATENCY_BUDGET_S = float(os.getenv("ROUTE_LATENCY_BUDGET_S", "3"))
+# Road distance / straight-line distance and average speed for estimated routes
+ROUTE_ESTIMATE_CIRCUITY = float(os.getenv("ROUTE_ESTIMATE_CIRCUITY", "1.3"))
+ROUTE_ESTIMATE_SPEED_KMH = float(os.getenv("ROUTE_ESTIMATE_SPEED_KMH", "40"))
+
+# ORS caps a single matrix request at sources x destinations cells
+ORS_MATRIX_MAX_CELLS = int(os.getenv("ORS_MATRIX_MAX_CELLS", "3500"))
+
+class UpstreamUnavailableError(RuntimeError):
+    """Routing service is down, overloaded or unreachable (counts against the breaker)."""
+
+routing_breaker = CircuitBreaker("routing")
 
 # Initialize client with error handling
 try:
@@ -52,13 +91,210 @@ def validate_coordinates(coords: List[float], coord_name: str) -> bool:
     
     return True
 
-def get_routes(source: List[float], destination: List[float]) -> Dict[str, Any]:
+def optimize_route_response(response: Dict[str, Any], geometry: str = DEFAULT_GEOMETRY_MODE,
+                            tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> Dict[str, Any]:
+    """
+    Reduce an ORS directions response to the fields we consume.
+    
+    Args:
+        response: Raw ORS response, either a GeoJSON FeatureCollection or the
+            "json" format ({"routes": [...]} with encoded polylines)
+        geometry: Geometry mode to keep (see route_geometry.GEOMETRY_MODES)
+        tolerance_m: Simplification tolerance for the "simplified" mode
+        
+    Returns:
+        Dict: FeatureCollection with only the summary and requested geometry
+    """
+    optimized_routes = {
+        "type": "FeatureCollection",
+        "features": []
+    }
+    
+    if "routes" in response:
+        # "json" format: geometry is absent or already an encoded polyline
+        for route in response["routes"]:
+            feature = shape_feature(route.get("summary", {}), None, "none")
+            if geometry == "polyline" and isinstance(route.get("geometry"), str):
+                feature["properties"]["polyline"] = route["geometry"]
+            optimized_routes["features"].append(feature)
+        return optimized_routes
+    
+    for feature in response.get("features", []):
+        # Extract only essential properties
+        optimized_routes["features"].append(shape_feature(
+            feature.get("properties", {}).get("summary", {}),
+            feature.get("geometry"),
+            geometry,
+            tolerance_m
+        ))
+    
+    return optimized_routes
+
+def directions_format(geometry: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pick the ORS response format and extra parameters for a geometry mode.
+    
+    Summary-only and polyline lookups use the "json" format, which returns no
+    geometry or an encoded polyline instead of a full coordinate array.
+    
+    Returns:
+        tuple: (format, extra request parameters)
+    """
+    if geometry == "none":
+        return "json", {"geometry": False}
+    if geometry == "polyline":
+        return "json", {}
+    return "geojson", {}
+
+def validate_route_request(source: List[float], destination: List[float]) -> None:
+    """
+    Validate source and destination before any upstream call is made.
+    
+    Raises:
+        ValueError: If coordinates are invalid
+    """
+    if not validate_coordinates(source, "source"):
+        raise ValueError("Invalid source coordinates")
+    
+    if not validate_coordinates(destination, "destination"):
+        raise ValueError("Invalid destination coordinates")
+
+def route_cache_key(source: List[float], destination: List[float],
+                    geometry: str = DEFAULT_GEOMETRY_MODE,
+                    tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M,
+                    elevation: bool = False) -> Tuple:
+    """
+    Cache/coalescing key for a lookup on the configured routing backend.
+    """
+    profile = ROUTE_PROFILE if ROUTING_BACKEND == "ors" else f"{ROUTING_BACKEND}:{ROUTE_PROFILE}"
+    geometry_key = (geometry, tolerance_m) if geometry == "simplified" else geometry
+    if elevation:
+        geometry_key = (geometry_key, "elevation")
+    return make_route_key(source, destination, profile, ALTERNATIVE_ROUTES, geometry=geometry_key)
+
+def get_cached_routes(cache_key: Hashable) -> Optional[Dict[str, Any]]:
+    """
+    Look a route up in the in-memory cache, then the persistent store.
+    
+    Persistent hits are promoted into the in-memory cache.
+    """
+    routes = route_cache.get(cache_key)
+    if routes is not None or route_store.route_store is None:
+        return routes
+    
+    stored = route_store.route_store.get(cache_key)
+    if stored is None:
+        return None
+    routes, remaining_ttl_s = stored
+    route_cache.set(cache_key, routes, ttl_s=min(route_cache.ttl_s, remaining_ttl_s))
+    return routes
+
+def store_cached_routes(cache_key: Hashable, routes: Dict[str, Any]) -> None:
+    """Write a fresh routing result to the in-memory cache and persistent store."""
+    route_cache.set(cache_key, routes)
+    if route_store.route_store is not None:
+        route_store.route_store.set(cache_key, routes)
+
+async def get_cached_routes_async(cache_key: Hashable) -> Optional[Dict[str, Any]]:
+    """
+    Async get_cached_routes: memory hits are answered on the event loop,
+    persistent store reads run in a worker thread.
+    """
+    routes = route_cache.get(cache_key)
+    if routes is not None or route_store.route_store is None:
+        return routes
+    return await asyncio.to_thread(get_cached_routes, cache_key)
+
+async def store_cached_routes_async(cache_key: Hashable, routes: Dict[str, Any]) -> None:
+    """Async store_cached_routes: SQLite writes and compaction run in a worker thread."""
+    route_cache.set(cache_key, routes)
+    if route_store.route_store is not None:
+        await asyncio.to_thread(route_store.route_store.set, cache_key, routes)
+
+def check_backend_available(use_async: bool = False) -> None:
+    """
+    Ensure the configured routing backend can serve requests.
+    
+    Raises:
+        RuntimeError: If the ORS client/key or the local road graph is unavailable
+    """
+    if ROUTING_BACKEND == "local":
+        get_local_router()
+        return
+    
+    # The async path talks to ORS directly and only needs the key
+    ors_available = bool(ORS_API_KEY) if use_async else client is not None
+    if not ors_available:
+        raise RuntimeError("OpenRouteService client is not available. Check your API key.")
+
+def init_routing_backend() -> None:
+    """
+    Load the local road graph at startup, so the first request does not
+    wait for it. A graph that fails to load is retried on the next request.
+    """
+    if ROUTING_BACKEND != "local":
+        return
+    try:
+        get_local_router()
+    except RuntimeError:
+        logger.warning("Starting without the local road graph; routes fail until it loads")
+
+def estimate_routes(source: List[float], destination: List[float],
+                    geometry: str = DEFAULT_GEOMETRY_MODE,
+                    tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> Dict[str, Any]:
+    """
+    Estimate a single route without calling the routing backend.
+    
+    Uses the haversine + average speed model from fleet_emissions, scaled by
+    a road circuity factor. Features are flagged with "estimated": True.
+    
+    Returns:
+        Dict: FeatureCollection shaped like get_routes output
+    """
+    distance_km = haversine_km(source, destination) * ROUTE_ESTIMATE_CIRCUITY
+    duration_s = distance_km / ROUTE_ESTIMATE_SPEED_KMH * 3600
+    feature = shape_feature(
+        {"distance": round(distance_km * 1000, 1), "duration": round(duration_s, 1)},
+        {"type": "LineString", "coordinates": [list(source), list(destination)]},
+        geometry,
+        tolerance_m
+    )
+    feature["properties"]["estimated"] = True
+    return {"type": "FeatureCollection", "features": [feature]}
+
+def _record_upstream_outcome(started_at: float, error: Optional[BaseException] = None) -> None:
+    """Feed the outcome of one upstream routing call into the circuit breaker."""
+    if isinstance(error, UpstreamUnavailableError) or time.monotonic() - started_at > ROUTE_LATENCY_BUDGET_S:
+        routing_breaker.record_failure()
+    else:
+        routing_breaker.record_success()
+
+def _fetch_local_routes(source: List[float], destination: List[float], cache_key: Hashable,
+                        geometry: str, tolerance_m: float) -> Dict[str, Any]:
+    """
+    Route on the local road graph and cache the result.
+    
+    Raises:
+        RuntimeError: If no route can be found
+    """
+    logger.info(f"Routing locally from {source} to {destination}")
+    routes = optimize_route_response(
+        get_local_router().route(source, destination, ALTERNATIVE_ROUTES), geometry, tolerance_m
+    )
+    store_cached_routes(cache_key, routes)
+    return routes
+
+def get_routes(source: List[float], destination: List[float],
+               geometry: str = DEFAULT_GEOMETRY_MODE,
+               tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> Dict[str, Any]:
     """
     Get route options between source and destination coordinates.
     
     Args:
         source: [lng, lat] coordinates of the source
         destination: [lng, lat] coordinates of the destination
+        geometry: Geometry mode ("none", "simplified", "polyline" or "full")
+        tolerance_m: Simplification tolerance for the "simplified" mode
         
     Returns:
         Dict containing route information or error details
@@ -67,75 +303,95 @@ def get_routes(source: List[float], destination: List[float]) -> Dict[str, Any]:
         ValueError: If coordinates are invalid
         RuntimeError: If OpenRouteService client is not available
     """
-    # Validate client availability
-    if client is None:
-        raise RuntimeError("OpenRouteService client is not available. Check your API key.")
+    # Validate backend availability
+    check_backend_available()
     
     # Validate input coordinates
-    if not validate_coordinates(source, "source"):
-        raise ValueError("Invalid source coordinates")
+    validate_route_request(source, destination)
+    validate_geometry_mode(geometry)
     
-    if not validate_coordinates(destination, "destination"):
-        raise ValueError("Invalid destination coordinates")
+    # Serve repeat lookups from the route cache
+    cache_key = route_cache_key(source, destination, geometry, tolerance_m)
+    cached_routes = get_cached_routes(cache_key)
+    if cached_routes is not None:
+        return cached_routes
+    
+    # Answer with an estimate while the routing service is failing
+    if ROUTING_BACKEND == "ors" and not routing_breaker.allow_request():
+        logger.warning("Routing circuit breaker open, returning estimated route")
+        return estimate_routes(source, destination, geometry, tolerance_m)
+    
+    # Identical concurrent lookups share a single upstream call
+    return coalesce(cache_key, lambda: _fetch_routes(source, destination, cache_key, geometry, tolerance_m))
+
+def _fetch_routes(source: List[float], destination: List[float], cache_key: Hashable,
+                  geometry: str, tolerance_m: float) -> Dict[str, Any]:
+    """
+    Call ORS directions synchronously and cache the slimmed response.
     
+    Raises:
+        RuntimeError: If the route service call fails
+    """
+    if ROUTING_BACKEND == "local":
+        return _fetch_local_routes(source, destination, cache_key, geometry, tolerance_m)
+    
+    started_at = time.monotonic()
     try:
         coords = [source, destination]
+        response_format, geometry_params = directions_format(geometry)
         
         logger.info(f"Requesting routes from {source} to {destination}")
         
         response = client.directions(
             coordinates=coords,
-            profile='driving-car',
-            format='geojson',
-            alternative_routes={"share_factor": 0.6, "target_count": 3},
-            instructions=False
+            profile=ROUTE_PROFILE,
+            format=response_format,
+            alternative_routes=ALTERNATIVE_ROUTES,
+            instructions=False,
+            **geometry_params
         )
         
-        # Extract only necessary information from response
-        optimized_routes = {
-            "type": "FeatureCollection",
-            "features": []
-        }
-        
-        for feature in response.get("features", []):
-            # Extract only essential properties
-            optimized_feature = {
-                "type": "Feature",
-                "geometry": feature.get("geometry"),
-                "properties": {
-                    "summary": feature.get("properties", {}).get("summary", {})
-                }
-            }
-            optimized_routes["features"].append(optimized_feature)
+        optimized_routes = optimize_route_response(response, geometry, tolerance_m)
+        store_cached_routes(cache_key, optimized_routes)
+        _record_upstream_outcome(started_at)
         
         logger.info(f"Successfully retrieved {len(optimized_routes['features'])} route options")
         return optimized_routes
         
     except openrouteservice.exceptions.ApiError as e:
         logger.error(f"OpenRouteService API error: {e}")
-        raise RuntimeError(f"Route service error: {e}")
+        error_cls = UpstreamUnavailableError if e.status is None or e.status == 429 or e.status >= 500 else RuntimeError
+        error = error_cls(f"Route service error: {e}")
         
-    except openrouteservice.exceptions.HTTPError as e:
+    except (openrouteservice.exceptions.HTTPError, openrouteservice.exceptions.Timeout,
+            requests.exceptions.RequestException) as e:
         logger.error(f"HTTP error when calling OpenRouteService: {e}")
-        raise RuntimeError(f"Network error: {e}")
+        error = UpstreamUnavailableError(f"Network error: {e}")
         
     except Exception as e:
         logger.error(f"Unexpected error in get_routes: {e}")
-        raise RuntimeError(f"Unexpected error: {e}")
+        error = RuntimeError(f"Unexpected error: {e}")
+    
+    _record_upstream_outcome(started_at, error)
+    raise error
 
-def get_routes_safe(source: List[float], destination: List[float]) -> Dict[str, Any]:
+def get_routes_safe(source: List[float], destination: List[float],
+                    geometry: str = DEFAULT_GEOMETRY_MODE,
+                    tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M) -> Dict[str, Any]:
     """
     Safe wrapper for get_routes that returns error information instead of raising exceptions.
     
     Args:
         source: [lng, lat] coordinates of the source
         destination: [lng, lat] coordinates of the destination
+        geometry: Geometry mode ("none", "simplified", "polyline" or "full")
+        tolerance_m: Simplification tolerance for the "simplified" mode
         
     Returns:
         Dict with either route data or error information
     """
     try:
-        routes = get_routes(source, destination)
+        routes = get_routes(source, destination, geometry, tolerance_m)
         return {
             "success": True,
             "data": routes
@@ -151,3 +407,431 @@ def get_routes_safe(source: List[float], destination: List[float]) -> Dict[str,
             "success": False,
             "error": "An unexpected error occurred"
         }
+
+# In-flight upstream calls keyed by route cache key (single-flight)
+_inflight: Dict[Hashable, Future] = {}
+_inflight_lock = threading.Lock()
+_inflight_async: Dict[Hashable, "asyncio.Task"] = {}
+
+def coalesce(key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """
+    Run fetch() once per key across concurrent threads.
+    
+    The first caller for a key performs the call; callers arriving while it
+    is in flight block on the same future and receive its result or error.
+    
+    Args:
+        key: Identity of the upstream call
+        fetch: Zero-argument callable performing the call
+        
+    Returns:
+        The shared result of fetch()
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+    
+    if not is_leader:
+        return future.result()
+    
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def _finish_inflight(key: Hashable, task: "asyncio.Task") -> None:
+    """Drop a finished async call from the in-flight table."""
+    if _inflight_async.get(key) is task:
+        del _inflight_async[key]
+    if not task.cancelled():
+        # Mark the error as retrieved even if every waiter went away
+        task.exception()
+
+async def coalesce_async(key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Await fetch() once per key across concurrent coroutines.
+    
+    The upstream call runs as its own task, so a waiter that is cancelled
+    (e.g. a client disconnect) does not cancel the call for the others.
+    
+    Args:
+        key: Identity of the upstream call
+        fetch: Zero-argument coroutine function performing the call
+        
+    Returns:
+        The shared result of fetch()
+    """
+    task = _inflight_async.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight_async[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+    return await asyncio.shield(task)
+
+# Shared async HTTP client: one connection pool per worker so concurrent
+# requests reuse keep-alive connections to ORS instead of re-handshaking.
+_async_client: Optional[httpx.AsyncClient] = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled async HTTP client, creating it on first use.
+    
+    Returns:
+        httpx.AsyncClient: Keep-alive client bound to ORS_BASE_URL
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=ORS_BASE_URL,
+            timeout=ORS_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=ORS_MAX_CONNECTIONS,
+                max_keepalive_connections=ORS_MAX_CONNECTIONS
+            ),
+            headers={"Accept": "application/json, application/geo+json"}
+        )
+    return _async_client
+
+async def close_async_client() -> None:
+    """Close the pooled async HTTP client (called on application shutdown)."""
+    global _async_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+
+async def get_routes_async(source: List[float], destination: List[float],
+                           geometry: str = DEFAULT_GEOMETRY_MODE,
+                           tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M,
+                           priority: str = "interactive",
+                           elevation: bool = False) -> Dict[str, Any]:
+    """
+    Async variant of get_routes that does not block the event loop.
+    
+    Args:
+        source: [lng, lat] coordinates of the source
+        destination: [lng, lat] coordinates of the destination
+        geometry: Geometry mode ("none", "simplified", "polyline" or "full")
+        tolerance_m: Simplification tolerance for the "simplified" mode
+        priority: Upstream quota lane ("interactive" or "batch")
+        elevation: Request [lng, lat, ele] coordinates from ORS
+            ("simplified" and "full" geometry only)
+        
+    Returns:
+        Dict containing route information (same shape as get_routes)
+        
+    Raises:
+        ValueError: If coordinates are invalid
+        RuntimeError: If the routing service is unavailable or fails
+    """
+    if ROUTING_BACKEND == "local":
+        # The first call loads the road graph from disk; keep it off the event loop
+        await asyncio.to_thread(get_local_router)
+    else:
+        check_backend_available(use_async=True)
+    
+    validate_route_request(source, destination)
+    validate_geometry_mode(geometry)
+    if priority not in PRIORITIES:
+        raise ValueError(f"Invalid priority '{priority}'. Must be one of: {list(PRIORITIES)}")
+    
+    elevation = elevation and geometry in ("simplified", "full")
+    cache_key = route_cache_key(source, destination, geometry, tolerance_m, elevation)
+    cached_routes = await get_cached_routes_async(cache_key)
+    if cached_routes is not None:
+        return cached_routes
+    
+    lookup = coalesce_async(
+        cache_key,
+        lambda: _fetch_routes_async(source, destination, cache_key, geometry, tolerance_m, priority, elevation)
+    )
+    if ROUTING_BACKEND != "ors":
+        return await lookup
+    
+    # Answer with an estimate while the routing service is failing
+    if not routing_breaker.allow_request():
+        lookup.close()
+        logger.warning("Routing circuit breaker open, returning estimated route")
+        return estimate_routes(source, destination, geometry, tolerance_m)
+    
+    try:
+        return await asyncio.wait_for(lookup, timeout=ROUTE_LATENCY_BUDGET_S)
+    except SchedulerRejectedError:
+        if priority != "interactive":
+            raise
+        logger.warning("Routing quota exhausted, returning estimated route")
+        return estimate_routes(source, destination, geometry, tolerance_m)
+    except asyncio.TimeoutError:
+        # The shared upstream call keeps running and will fill the cache
+        logger.warning(f"Routing exceeded {ROUTE_LATENCY_BUDGET_S}s budget, returning estimated route")
+        return estimate_routes(source, destination, geometry, tolerance_m)
+
+async def _fetch_routes_async(source: List[float], destination: List[float], cache_key: Hashable,
+                              geometry: str, tolerance_m: float,
+                              priority: str = "interactive",
+                              elevation: bool = False) -> Dict[str, Any]:
+    """
+    Call the ORS directions API over the pooled client and cache the slimmed response.
+    
+    The call waits for a directions quota token in the given priority lane.
+    
+    Raises:
+        SchedulerRejectedError: If the quota lane rejected the call
+        RuntimeError: If the route service call fails
+    """
+    if ROUTING_BACKEND == "local":
+        # Graph search is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(_fetch_local_routes, source, destination, cache_key, geometry, tolerance_m)
+    
+    try:
+        await directions_scheduler.acquire(priority)
+    except SchedulerRejectedError:
+        # No upstream call was made, so there is no outcome for the breaker
+        routing_breaker.release_probe()
+        raise
+    
+    # Time spent queued for quota does not count against the upstream
+    started_at = time.monotonic()
+    try:
+        logger.info(f"Requesting routes from {source} to {destination}")
+        
+        response_format, geometry_params = directions_format(geometry)
+        if elevation:
+            geometry_params["elevation"] = True
+        response = await get_async_client().post(
+            f"/v2/directions/{ROUTE_PROFILE}/{response_format}",
+            json={
+                "coordinates": [source, destination],
+                "alternative_routes": ALTERNATIVE_ROUTES,
+                "instructions": False,
+                **geometry_params
+            },
+            headers={"Authorization": ORS_API_KEY}
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"OpenRouteService API error: {response.status_code} {response.text}")
+            error_cls = UpstreamUnavailableError if response.status_code == 429 or response.status_code >= 500 else RuntimeError
+            raise error_cls(f"Route service error: {response.status_code} {response.text}")
+        
+        optimized_routes = optimize_route_response(response.json(), geometry, tolerance_m)
+        await store_cached_routes_async(cache_key, optimized_routes)
+        _record_upstream_outcome(started_at)
+        
+        logger.info(f"Successfully retrieved {len(optimized_routes['features'])} route options")
+        return optimized_routes
+        
+    except RuntimeError as e:
+        error = e
+        
+    except httpx.HTTPError as e:
+        logger.error(f"HTTP error when calling OpenRouteService: {e}")
+        error = UpstreamUnavailableError(f"Network error: {e}")
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in get_routes_async: {e}")
+        error = RuntimeError(f"Unexpected error: {e}")
+    
+    _record_upstream_outcome(started_at, error)
+    raise error
+
+async def get_routes_safe_async(source: List[float], destination: List[float],
+                                geometry: str = DEFAULT_GEOMETRY_MODE,
+                                tolerance_m: float = DEFAULT_SIMPLIFY_TOLERANCE_M,
+                                priority: str = "interactive",
+                                elevation: bool = False) -> Dict[str, Any]:
+    """
+    Async counterpart of get_routes_safe.
+    
+    Args:
+        source: [lng, lat] coordinates of the source
+        destination: [lng, lat] coordinates of the destination
+        geometry: Geometry mode ("none", "simplified", "polyline" or "full")
+        tolerance_m: Simplification tolerance for the "simplified" mode
+        priority: Upstream quota lane ("interactive" or "batch")
+        elevation: Request [lng, lat, ele] coordinates from ORS
+        
+    Returns:
+        Dict with either route data or error information
+    """
+    try:
+        routes = await get_routes_async(source, destination, geometry, tolerance_m, priority, elevation)
+        return {
+            "success": True,
+            "data": routes
+        }
+    except (ValueError, RuntimeError) as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    except Exception as e:
+        logger.error(f"Unexpected error in get_routes_safe_async: {e}")
+        return {
+            "success": False,
+            "error": "An unexpected error occurred"
+        }
+
+def plan_matrix_chunks(pairs: List[Tuple[List[float], List[float]]],
+                       max_cells: int = ORS_MATRIX_MAX_CELLS) -> List[Dict[str, Any]]:
+    """
+    Group OD pairs into matrix requests of at most max_cells cells.
+    
+    Pairs are added to the current chunk while the product of its unique
+    sources and unique destinations stays within max_cells, so batches that
+    share origins (e.g. one hub to many customers) pack into few requests.
+    
+    Args:
+        pairs: List of (source, destination) [lng, lat] coordinates
+        max_cells: Maximum sources x destinations per request
+        
+    Returns:
+        List of chunks with "sources", "destinations" and "cells" entries,
+        where each cell is (pair_index, source_index, destination_index)
+    """
+    chunks = []
+    chunk = None
+    
+    for pair_index, (source, destination) in enumerate(pairs):
+        source_key = tuple(source)
+        destination_key = tuple(destination)
+        
+        if chunk is not None:
+            n_sources = len(chunk["source_index"]) + (source_key not in chunk["source_index"])
+            n_destinations = len(chunk["destination_index"]) + (destination_key not in chunk["destination_index"])
+            if n_sources * n_destinations > max_cells:
+                chunks.append(chunk)
+                chunk = None
+        
+        if chunk is None:
+            chunk = {"source_index": {}, "destination_index": {}, "cells": []}
+        
+        si = chunk["source_index"].setdefault(source_key, len(chunk["source_index"]))
+        di = chunk["destination_index"].setdefault(destination_key, len(chunk["destination_index"]))
+        chunk["cells"].append((pair_index, si, di))
+    
+    if chunk is not None:
+        chunks.append(chunk)
+    
+    return [
+        {
+            "sources": [list(c) for c in chunk["source_index"]],
+            "destinations": [list(c) for c in chunk["destination_index"]],
+            "cells": chunk["cells"]
+        }
+        for chunk in chunks
+    ]
+
+async def get_matrix_block_async(sources: List[List[float]], destinations: List[List[float]],
+                                 priority: str = "batch") -> Tuple[List[List[Optional[float]]], List[List[Optional[float]]]]:
+    """
+    Request distances (m) and durations (s) from every source to every destination.
+    
+    One ORS matrix call, made once a matrix quota token is granted in the
+    given priority lane; callers keep len(sources) * len(destinations)
+    within ORS_MATRIX_MAX_CELLS. Unroutable cells are None.
+    
+    Raises:
+        SchedulerRejectedError: If the quota lane rejected the call
+        RuntimeError: If the matrix service call fails
+    """
+    locations = sources + destinations
+    n_sources = len(sources)
+    
+    await matrix_scheduler.acquire(priority)
+    
+    try:
+        response = await get_async_client().post(
+            f"/v2/matrix/{ROUTE_PROFILE}",
+            json={
+                "locations": locations,
+                "sources": list(range(n_sources)),
+                "destinations": list(range(n_sources, len(locations))),
+                "metrics": ["distance", "duration"],
+                "units": "m"
+            },
+            headers={"Authorization": ORS_API_KEY}
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"HTTP error when calling OpenRouteService matrix: {e}")
+        raise RuntimeError(f"Network error: {e}")
+    
+    if response.status_code != 200:
+        logger.error(f"OpenRouteService matrix error: {response.status_code} {response.text}")
+        raise RuntimeError(f"Route service error: {response.status_code} {response.text}")
+    
+    data = response.json()
+    return data.get("distances", []), data.get("durations", [])
+
+async def get_route_matrix_async(pairs: List[Tuple[List[float], List[float]]],
+                                 priority: str = "batch") -> Dict[str, Any]:
+    """
+    Get distance/duration summaries for many OD pairs with few matrix calls.
+    
+    Pairs with invalid coordinates, unroutable pairs and pairs in a failed
+    chunk get an "error" entry; the rest get a "summary" shaped like the
+    ORS directions summary ({"distance": m, "duration": s}).
+    
+    Args:
+        pairs: List of (source, destination) [lng, lat] coordinates
+        priority: Upstream quota lane ("interactive" or "batch")
+        
+    Returns:
+        Dict with per-pair "results" (in input order) and "upstream_calls"
+        
+    Raises:
+        RuntimeError: If the routing service is not configured
+    """
+    if not ORS_API_KEY:
+        raise RuntimeError("OpenRouteService client is not available. Check your API key.")
+    
+    results: List[Dict[str, Any]] = [{} for _ in pairs]
+    valid_pairs = []
+    valid_indices = []
+    
+    for index, (source, destination) in enumerate(pairs):
+        try:
+            validate_route_request(source, destination)
+        except ValueError as e:
+            results[index] = {"error": str(e)}
+            continue
+        valid_pairs.append((source, destination))
+        valid_indices.append(index)
+    
+    chunks = plan_matrix_chunks(valid_pairs)
+    logger.info(f"Requesting matrix for {len(valid_pairs)} pairs in {len(chunks)} upstream calls")
+    
+    responses = await asyncio.gather(
+        *[get_matrix_block_async(chunk["sources"], chunk["destinations"], priority) for chunk in chunks],
+        return_exceptions=True
+    )
+    
+    for chunk, response in zip(chunks, responses):
+        for pair_index, si, di in chunk["cells"]:
+            index = valid_indices[pair_index]
+            if isinstance(response, Exception):
+                results[index] = {"error": str(response)}
+                continue
+            distances, durations = response
+            try:
+                distance = distances[si][di]
+                duration = durations[si][di]
+            except (IndexError, TypeError):
+                distance = duration = None
+            if distance is None or duration is None:
+                results[index] = {"error": "No route found between source and destination"}
+            else:
+                results[index] = {"summary": {"distance": distance, "duration": duration}}
+    
+    return {
+        "results": results,
+        "upstream_calls": len(chunks)
+    }
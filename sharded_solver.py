@@ -0,0 +1,235 @@
+"""
+Region-sharded reverse-logistics solving in a process pool.
+
+National batches mix cities hundreds of km apart, yet pairing solves them
+as one problem on one core. Here deliveries are placed on square tiles of
+about SHARD_TILE_KM, and each return looks at the tiles of every delivery
+within the pairing radius of it. A return in the halo of several tiles,
+i.e. near their borders, links those tiles into one region, and so do
+repeated ids (and, when bundling, a shared route_id). Regions therefore
+never compete for the same delivery, return or vehicle, and cities far
+apart become separate regions.
+
+Regions are packed into shards of about SHARD_TASK_ITEMS items and solved
+in worker processes. The merged result is the same as solving the batch in
+one piece, whatever the worker count: greedy pairs and bundles match
+exactly, and optimal results have the same pairs count and total distance.
+Returns with no delivery in reach are never sent to a worker.
+"""
+
+import math
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+
+from reverse_logistics import PAIRING_MODES, PAIRING_RADIUS_KM, pair_returns, pairing_result
+from return_bundling import bundle_returns, bundling_result, validate_bundling
+from spatial_index import SpatialGrid, EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Side of a tile; tiles near each other only join a region through the halo
+SHARD_TILE_KM = float(os.getenv("SHARD_TILE_KM", "10"))
+# Small regions are packed together until a shard has this many items
+SHARD_TASK_ITEMS = int(os.getenv("SHARD_TASK_ITEMS", "2000"))
+# Batches with fewer deliveries + returns are solved without the pool
+SHARD_MIN_ITEMS = int(os.getenv("SHARD_MIN_ITEMS", "5000"))
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0")) or os.cpu_count() or 1
+
+SOLVE_MODES = PAIRING_MODES + ("bundled",)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_shard_pool() -> ProcessPoolExecutor:
+    """
+    Return the process-wide worker pool, starting it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the server's threads and locks
+            _pool = ProcessPoolExecutor(max_workers=SHARD_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started reverse-logistics shard pool with {SHARD_WORKERS} workers")
+        return _pool
+
+def close_shard_pool() -> None:
+    """Stop the worker pool; the next solve starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def partition_shards(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                     by_route: bool = False) -> List[Tuple[List[int], List[int]]]:
+    """
+    Split a batch into shards that can be solved independently.
+
+    Args:
+        by_route: Keep deliveries with the same route_id in one shard
+
+    Returns:
+        list: (delivery indices, return indices) per shard, each in input
+        order. Returns with no delivery in reach are left out, and so are
+        deliveries with no return in reach unless by_route links them.
+    """
+    grid = SpatialGrid(PAIRING_RADIUS_KM)
+    cell_km = math.radians(grid.cell_deg) * EARTH_RADIUS_KM
+    span = max(1, round(SHARD_TILE_KM / cell_km))
+
+    # Deliveries that cannot be placed on the grid share tile None
+    delivery_tiles = []
+    for i, delivery in enumerate(deliveries):
+        grid.insert(i, delivery["lat"], delivery["lon"])
+        cell = grid.cell_of(delivery["lat"], delivery["lon"])
+        delivery_tiles.append(None if cell is None else (cell[0] // span, cell[1] // span))
+
+    parent: Dict[Any, Any] = {}
+
+    def find(tile):
+        while parent[tile] != tile:
+            parent[tile] = parent[parent[tile]]
+            tile = parent[tile]
+        return tile
+
+    def link(tiles):
+        root = None
+        for tile in tiles:
+            parent.setdefault(tile, tile)
+            tile = find(tile)
+            if root is None:
+                root = tile
+            elif tile != root:
+                parent[tile] = root
+        return root
+
+    # Returns of one cell reach the tiles of the deliveries around the cell
+    return_cells: Dict[Any, List[int]] = {}
+    for j, return_item in enumerate(returns):
+        return_cells.setdefault(grid.cell_of(return_item["lat"], return_item["lon"]), []).append(j)
+    return_tiles: List[Any] = [None] * len(returns)
+    reached = [False] * len(returns)
+    for cell, members in return_cells.items():
+        tiles = {delivery_tiles[i] for i in grid.near_cell(cell)}
+        if tiles:
+            tile = link(tiles)
+            for j in members:
+                return_tiles[j], reached[j] = tile, True
+
+    # Items sharing an id (or a route) are solved together, so that the
+    # first occurrence of an id is the same in its shard as in the batch
+    return_groups: Dict[Any, List[int]] = {}
+    for j, return_item in enumerate(returns):
+        return_groups.setdefault(return_item["id"], []).append(j)
+    for members in return_groups.values():
+        tiles = [return_tiles[j] for j in members if reached[j]]
+        if tiles:
+            tile = link(tiles)
+            for j in members:
+                return_tiles[j], reached[j] = tile, True
+    delivery_groups: Dict[Any, List[Any]] = {}
+    for i, delivery in enumerate(deliveries):
+        delivery_groups.setdefault(("id", delivery["id"]), []).append(delivery_tiles[i])
+        if by_route and delivery.get("route_id") is not None:
+            delivery_groups.setdefault(("route", delivery["route_id"]), []).append(delivery_tiles[i])
+    for tiles in delivery_groups.values():
+        # Deliveries no return can reach are left out
+        if len(tiles) > 1 and any(tile in parent for tile in tiles):
+            link(tiles)
+
+    regions: Dict[Any, Tuple[List[int], List[int]]] = {}
+    for i, tile in enumerate(delivery_tiles):
+        if tile in parent:
+            regions.setdefault(find(tile), ([], []))[0].append(i)
+    for j, tile in enumerate(return_tiles):
+        if reached[j]:
+            regions[find(tile)][1].append(j)
+
+    # Regions in order of their first delivery, packed so that isolated
+    # towns do not each cost a task
+    shards: List[Tuple[List[int], List[int]]] = []
+    size = SHARD_TASK_ITEMS
+    for region_deliveries, region_returns in sorted(regions.values()):
+        if size >= SHARD_TASK_ITEMS:
+            shards.append(([], []))
+            size = 0
+        shards[-1][0].extend(region_deliveries)
+        shards[-1][1].extend(region_returns)
+        size += len(region_deliveries) + len(region_returns)
+    return [(sorted(shard_deliveries), sorted(shard_returns)) for shard_deliveries, shard_returns in shards]
+
+def _solve_shard(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]], mode: str,
+                 vehicle: Optional[Dict[str, Any]]) -> tuple:
+    """Worker task: one shard's pairs or bundles, plus greedy pairs in optimal mode."""
+    if mode == "bundled":
+        return bundle_returns(deliveries, returns, vehicle), None
+    greedy = pair_returns(deliveries, returns, "greedy") if mode == "optimal" else None
+    return pair_returns(deliveries, returns, mode), greedy
+
+def _run_shards(tasks: List[tuple]) -> List[tuple]:
+    """Solve shard tasks in the pool, largest first; results come back in task order."""
+    order = sorted(range(len(tasks)), key=lambda k: -(len(tasks[k][0]) + len(tasks[k][1])))
+    try:
+        pool = get_shard_pool()
+        futures = {k: pool.submit(_solve_shard, *tasks[k]) for k in order}
+        return [futures[k].result() for k in range(len(tasks))]
+    except BrokenProcessPool as e:
+        logger.error(f"Shard pool failed, solving shards in-process: {e}")
+        close_shard_pool()
+        return [_solve_shard(*task) for task in tasks]
+
+def solve_reverse_logistics(deliveries: List[Dict[str, Any]], returns: List[Dict[str, Any]],
+                            mode: str = "greedy", vehicle: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Solve a /reverse-logistics batch, spreading large ones over the worker
+    pool by region.
+
+    Args:
+        mode: "greedy", "optimal" or "bundled"
+        vehicle: Spare capacity per route in bundled mode
+
+    Returns:
+        dict: The optimize_reverse_pickup (or bundle_reverse_pickups) result,
+        plus the number of shards solved
+
+    Raises:
+        ValueError: If the mode, a size, a capacity or a route_id is invalid
+    """
+    if mode not in SOLVE_MODES:
+        raise ValueError(f"Unknown pairing mode '{mode}'. Use one of: {', '.join(SOLVE_MODES)}")
+
+    if len(deliveries) + len(returns) < SHARD_MIN_ITEMS:
+        shards = [(list(range(len(deliveries))), list(range(len(returns))))]
+        results = [_solve_shard(deliveries, returns, mode, vehicle)]
+    else:
+        # Fail on bad input even if it sits in a part no shard covers
+        if mode == "bundled":
+            validate_bundling(deliveries, returns, vehicle)
+        shards = partition_shards(deliveries, returns, by_route=mode == "bundled")
+        results = _run_shards([([deliveries[i] for i in shard_deliveries], [returns[j] for j in shard_returns],
+                                mode, vehicle) for shard_deliveries, shard_returns in shards])
+
+    # Shards share no items, so merging is mapping indices back and sorting
+    solved, greedy = [], []
+    for (shard_deliveries, shard_returns), (shard_solved, shard_greedy) in zip(shards, results):
+        for i, picked, km in shard_solved:
+            picked = [shard_returns[j] for j in picked] if mode == "bundled" else shard_returns[picked]
+            solved.append((shard_deliveries[i], picked, km))
+        greedy.extend((shard_deliveries[i], shard_returns[j], km) for i, j, km in shard_greedy or [])
+    solved.sort(key=lambda item: item[0])
+    greedy.sort()
+
+    if mode == "bundled":
+        result = bundling_result(deliveries, returns, solved, vehicle)
+    else:
+        result = pairing_result(deliveries, returns, mode, solved, greedy if mode == "optimal" else None)
+    result["shards"] = len(shards)
+    if len(shards) > 1:
+        logger.info(f"Solved {mode} reverse logistics for {len(deliveries)} deliveries and "
+                    f"{len(returns)} returns in {len(shards)} shards")
+    return result
@@ -0,0 +1,137 @@
+"""
+Uniform latitude/longitude grid for radius queries on the sphere.
+
+Cells are square in degrees and sized so that every point within the
+search radius of a query lies in the few cells around it. Longitude reach
+widens with latitude (from the haversine bound) and columns wrap at the
+antimeridian, so near() never misses a point within the radius; callers
+still compute the exact distance for each candidate.
+"""
+
+import math
+from typing import Dict, Hashable, Iterator, Optional, Set, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+# Slack on the angular reach so rounding never drops a point on the boundary
+_REACH_SLACK_RAD = 1e-9
+
+class SpatialGrid:
+    """
+    Points keyed by any hashable id, bucketed into grid cells.
+
+    Points with non-finite or out-of-range coordinates are kept aside and
+    returned by every query, and queries from such points return every
+    point, so results stay exact for any input.
+    """
+
+    def __init__(self, radius_km: float):
+        """
+        Raises:
+            ValueError: If radius_km is not positive
+        """
+        if not radius_km > 0:
+            raise ValueError("radius_km must be positive")
+        self.radius_km = radius_km
+        self._reach_rad = radius_km / EARTH_RADIUS_KM + _REACH_SLACK_RAD
+        # Whole number of columns so the grid wraps exactly at 360 degrees
+        self.columns = max(1, int(360 / math.degrees(self._reach_rad)))
+        self.cell_deg = 360 / self.columns
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._points: Dict[Hashable, Tuple[int, int]] = {}
+        self._anywhere: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._points) + len(self._anywhere)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points or key in self._anywhere
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg),
+                math.floor(((lon + 180) % 360) / self.cell_deg) % self.columns)
+
+    @staticmethod
+    def _indexable(lat: float, lon: float) -> bool:
+        return -90 <= lat <= 90 and math.isfinite(lon)
+
+    def insert(self, key: Hashable, lat: float, lon: float) -> None:
+        """Add a point; an existing key is moved."""
+        self.remove(key)
+        if not self._indexable(lat, lon):
+            self._anywhere.add(key)
+            return
+        cell = self._cell(lat, lon)
+        self._points[key] = cell
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove a point; returns False if it was not present."""
+        cell = self._points.pop(key, None)
+        if cell is None:
+            if key in self._anywhere:
+                self._anywhere.discard(key)
+                return True
+            return False
+        bucket = self._cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self._cells[cell]
+        return True
+
+    def cell_of(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        """Grid cell of a point, or None if its coordinates cannot be indexed."""
+        return self._cell(lat, lon) if self._indexable(lat, lon) else None
+
+    def near(self, lat: float, lon: float) -> Iterator[Hashable]:
+        """
+        Keys of all points that may lie within radius_km of (lat, lon).
+        A superset: distances still have to be checked.
+        """
+        if not self._indexable(lat, lon):
+            return self.near_cell(None)
+        x = (lon + 180) % 360
+        return self._near_span(lat, lat, x, x)
+
+    def near_cell(self, cell: Optional[Tuple[int, int]]) -> Iterator[Hashable]:
+        """
+        Keys of all points that may lie within radius_km of any point in cell
+        (as returned by cell_of; None matches every point).
+        """
+        if cell is None:
+            yield from self._anywhere
+            yield from self._points
+            return
+        row, col = cell
+        yield from self._near_span(row * self.cell_deg, (row + 1) * self.cell_deg,
+                                   col * self.cell_deg, (col + 1) * self.cell_deg)
+
+    def _near_span(self, lat_lo: float, lat_hi: float, x_lo: float, x_hi: float) -> Iterator[Hashable]:
+        """Candidates for a latitude span and a span of degrees east of -180."""
+        yield from self._anywhere
+        reach_deg = math.degrees(self._reach_rad)
+        row_lo = math.floor((lat_lo - reach_deg) / self.cell_deg)
+        row_hi = math.floor((lat_hi + reach_deg) / self.cell_deg)
+
+        # sin^2(dlon/2) * cos(lat1) * cos(lat2) <= sin^2(reach/2), with lat1 the
+        # pole-most latitude of the span and lat2 the pole-most one reachable
+        polar = min(90.0, max(abs(lat_lo), abs(lat_hi)))
+        extreme = math.radians(min(90.0, polar + reach_deg))
+        bound = math.cos(math.radians(polar)) * math.cos(extreme)
+        ratio = math.sin(self._reach_rad / 2) / math.sqrt(bound) if bound > 0 else math.inf
+        if ratio >= 1:
+            columns = range(self.columns)
+        else:
+            dlon_deg = math.degrees(2 * math.asin(ratio)) + math.degrees(_REACH_SLACK_RAD)
+            col_lo = math.floor((x_lo - dlon_deg) / self.cell_deg)
+            col_hi = math.floor((x_hi + dlon_deg) / self.cell_deg)
+            if col_hi - col_lo + 1 >= self.columns:
+                columns = range(self.columns)
+            else:
+                columns = [c % self.columns for c in range(col_lo, col_hi + 1)]
+
+        for row in range(row_lo, row_hi + 1):
+            for col in columns:
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    yield from bucket
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for green carrier matching
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import numpy as np
+    from carrier_selector import match_green_carrier, match_green_carrier_batch
+    print("✓ Successfully imported carrier_selector")
+except ImportError as e:
+    print(f"✗ Failed to import carrier_selector: {e}")
+    sys.exit(1)
+
+EV_RANGE_KM, HYBRID_RANGE_KM = 300, 800
+
+def _reference_match(d):
+    """The original if/else ladder: (vehicle_type, feasibility_score, eco_impact)"""
+    if d <= 50:
+        return ("ev", 0.95, "minimal") if d <= EV_RANGE_KM else ("hybrid", 0.9, "low")
+    elif d <= 150:
+        return ("ev", 0.8, "minimal") if d <= EV_RANGE_KM else ("hybrid", 0.85, "low")
+    elif d <= 300:
+        return ("ev", 0.6, "minimal") if d <= EV_RANGE_KM else ("hybrid", 0.75, "medium")
+    return ("hybrid", 0.7, "medium") if d <= HYBRID_RANGE_KM else ("diesel", 0.9, "high")
+
+def test_band_boundaries():
+    """Test matches at and around every band and range boundary"""
+    print("\n--- Testing Band Boundaries ---")
+
+    for d in (0, 50, 50.001, 150, 150.001, 300, 300.001, 800, 800.001, 1200, -1, float("nan")):
+        match = match_green_carrier(d)
+        assert (match["vehicle_type"], match["feasibility_score"], match["eco_impact"]) == _reference_match(d), d
+        assert f"({d}km)" in match["reasoning"]
+    assert match_green_carrier(42)["reasoning"] == "EV optimal for short distance (42km)"
+    print("✓ Boundary distances match the original rules")
+
+def test_batch_matches_scalar():
+    """Test that the batch selector matches per-route results exactly"""
+    print("\n--- Testing Batch Matching ---")
+
+    rng = np.random.default_rng(5)
+    distances = np.concatenate([rng.uniform(0, 1500, 5000), [0.0, 50.0, 150.0, 300.0, 800.0, np.nan]])
+    batch = match_green_carrier_batch(distances)
+    for i, d in enumerate(distances.tolist()):
+        expected = match_green_carrier(d)
+        assert batch["vehicle_type"][i] == expected["vehicle_type"]
+        assert batch["feasibility_score"][i] == expected["feasibility_score"]
+        assert batch["eco_impact"][i] == expected["eco_impact"]
+        assert batch["reasoning"][i] == expected["reasoning"]
+
+    grid = match_green_carrier_batch(distances[:6].reshape(2, 3), with_reasoning=False)
+    assert grid["vehicle_type"].shape == (2, 3) and "reasoning" not in grid
+    print(f"✓ {distances.size} distances match the per-route selector")
+
+if __name__ == "__main__":
+    print("RouteZero Carrier Selector Test")
+    print("=" * 40)
+
+    try:
+        test_band_boundaries()
+        test_batch_matches_scalar()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
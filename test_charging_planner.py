@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for EV charging-stop planning
+"""
+
+import sys
+import os
+import math
+import heapq
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from charging_planner import ChargingNetwork, get_charging_network
+    from fleet_emissions import haversine_km_array
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported charging_planner")
+except ImportError as e:
+    print(f"✗ Failed to import charging_planner: {e}")
+    sys.exit(1)
+
+# ~440 km east-west line with chargers of mixed power every ~55 km
+ROUTE = [[76.0, 15.0], [80.1, 15.0]]
+CONFIG = {
+    "corridor_km": 5,
+    "stop_overhead_min": 5,
+    "profiles": {
+        "van": {"battery_kwh": 40, "consumption_kwh_per_km": 0.25, "max_charge_kw": 100,
+                "reserve_soc": 0.1, "taper_soc": 0.8, "taper_factor": 0.5}
+    },
+    "stations": [
+        {"id": f"s{i}", "name": f"Station {i}", "coordinates": [76.0 + 0.5 * i, 15.0 + 0.01 * (i % 3)],
+         "power_kw": [50, 150, 22][i % 3]}
+        for i in range(1, 9)
+    ] + [{"id": "far", "name": "Off corridor", "coordinates": [78.0, 16.0], "power_kw": 350}]
+}
+
+def _reference_total_min(network, coordinates, soc_start, profile):
+    """Dijkstra over (node, whole-percent charge) with explicit charging steps"""
+    stations, positions, detours = network.corridor(coordinates)
+    route_km = float(haversine_km_array(*coordinates[0], *coordinates[1]))
+    pos = [0.0] + positions.tolist() + [route_km]
+    det = [0.0] + detours.tolist() + [0.0]
+    pct_per_km = profile["consumption_kwh_per_km"] / profile["battery_kwh"] * 100
+    reserve = math.ceil(profile["reserve_soc"] * 100)
+    min_per_km = 60 / 50
+    last = len(pos) - 1
+
+    def charge_min(j, level):
+        power = min(network.power_kw[stations[j - 1]], profile["max_charge_kw"])
+        minutes = profile["battery_kwh"] / 100 / power * 60
+        return minutes / profile["taper_factor"] if level > profile["taper_soc"] * 100 else minutes
+
+    start = (0, int(soc_start * 100), True)
+    best = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        t, (j, level, may_drive) = heapq.heappop(heap)
+        if t > best[(j, level, may_drive)]:
+            continue
+        if j == last:
+            return t
+        moves = []
+        if may_drive:
+            for k in range(j + 1, len(pos)):
+                km = pos[k] - pos[j] + det[j] + det[k]
+                need = math.ceil(km * pct_per_km - 1e-9)
+                if level - need >= reserve:
+                    moves.append((t + km * min_per_km, (k, level - need, k == last)))
+        else:
+            elapsed = t + network.stop_overhead_min
+            moves.append((elapsed, (j, level, True)))
+            for target in range(level + 1, 101):
+                elapsed += charge_min(j, target)
+                moves.append((elapsed, (j, target, True)))
+        for cost, state in moves:
+            if cost < best.get(state, float("inf")):
+                best[state] = cost
+                heapq.heappush(heap, (cost, state))
+    return None
+
+def test_minimum_time_stops():
+    """Test that the planner matches an exhaustive state search"""
+    print("\n--- Testing Minimum-Time Stops ---")
+
+    network = ChargingNetwork(CONFIG)
+    profile = network.profile("van")
+    for soc_start in (1.0, 0.7, 0.5):
+        plan = network.plan(ROUTE, soc_start, profile)
+        expected = _reference_total_min(network, ROUTE, soc_start, profile)
+        assert plan["feasible"] and abs(plan["total_min"] - expected) < 0.05, f"{plan['total_min']} != {expected}"
+        assert all(stop["arrival_soc"] >= 0.1 for stop in plan["stops"])
+        assert plan["arrival_soc"] >= 0.1
+        assert "far" not in [stop["station_id"] for stop in plan["stops"]]
+        print(f"✓ SoC {soc_start}: {len(plan['stops'])} stops, {plan['total_min']} min")
+
+def test_no_stop_when_range_suffices():
+    """Test that a trip within range gets no stops"""
+    print("\n--- Testing Trip Within Range ---")
+
+    network = ChargingNetwork(CONFIG)
+    plan = network.plan([[76.0, 15.0], [76.9, 15.0]], 0.9, network.profile("van"))
+    assert plan["feasible"] and plan["stops"] == [] and not plan["needs_charging"]
+    assert plan["total_min"] == plan["drive_min"]
+    print(f"✓ {plan['distance_km']} km without charging")
+
+def test_infeasible_gap():
+    """Test that a gap longer than the usable range is reported"""
+    print("\n--- Testing Infeasible Route ---")
+
+    network = ChargingNetwork({**CONFIG, "stations": CONFIG["stations"][:1]})
+    plan = network.plan(ROUTE, 1.0, network.profile("van"))
+    assert plan["feasible"] is False and plan["stops"] == []
+
+    try:
+        network.profile("truck")
+        assert False, "Unknown profile should be rejected"
+    except ValueError:
+        pass
+    print("✓ Infeasible route and unknown profile reported")
+
+def test_corridor_cache_and_speed():
+    """Test that corridor lookups are cached and plans only search the corridor"""
+    print("\n--- Testing Corridor Cache ---")
+
+    network = get_charging_network()
+    route = [[77.5946, 12.9716], [78.4867, 17.3850], [79.0882, 21.1458]]
+    profile = network.profile("ev")
+    network.plan(route, 0.9, profile)
+    before = network.stats()
+
+    start = time.perf_counter()
+    plan = network.plan(route, 0.9, profile)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    after = network.stats()
+    assert after["corridor_cache_misses"] == before["corridor_cache_misses"]
+    assert after["corridor_cache_hits"] == before["corridor_cache_hits"] + 1
+    assert plan["feasible"] and plan["stops"]
+    # The stop search runs over corridor stations, not the whole network
+    assert plan["stations_in_corridor"] < after["stations"] / 2, plan["stations_in_corridor"]
+    if BENCHMARKS:
+        assert elapsed_ms < 100, f"Cached plan took {elapsed_ms:.1f}ms"
+    print(f"✓ {plan['distance_km']} km, {len(plan['stops'])} stops, planned in {elapsed_ms:.1f}ms")
+
+if __name__ == "__main__":
+    print("RouteZero Charging Planner Test")
+    print("=" * 40)
+
+    try:
+        test_minimum_time_stops()
+        test_no_stop_when_range_suffices()
+        test_infeasible_gap()
+        test_corridor_cache_and_speed()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the eco-points ledger and leaderboard
+"""
+
+import sys
+import os
+import random
+import math
+import tempfile
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import eco_ledger
+    from eco_ledger import EcoPointsLedger, RankedSet, get_eco_ledger, close_eco_ledger
+    from conftest import BENCHMARKS
+    print("✓ Successfully imported eco_ledger")
+except ImportError as e:
+    print(f"✗ Failed to import eco_ledger: {e}")
+    sys.exit(1)
+
+def test_ranked_set_matches_sorted_list():
+    """Rank and slices agree with a sorted list under random inserts and removes"""
+    print("\nTesting ranked set against a sorted list...")
+    ranked, reference = RankedSet(), []
+    rng = random.Random(7)
+    for step in range(5000):
+        key = (rng.randint(-100, 0), f"c{rng.randint(0, 400)}")
+        if key in reference and rng.random() < 0.6:
+            ranked.remove(key)
+            reference.remove(key)
+        elif key not in reference:
+            ranked.insert(key)
+            reference.append(key)
+        reference.sort()
+        if step % 50 == 0:
+            for key in reference[:3] + reference[-3:]:
+                assert ranked.rank(key) == reference.index(key)
+            start = rng.randint(0, len(reference))
+            assert ranked.slice(start, 10) == reference[start:start + 10]
+    assert len(ranked) == len(reference)
+    print(f"✓ {len(reference)} keys consistent after 5000 operations")
+
+def test_award_redeem_and_rank():
+    """Balances, ties, redemptions and idempotent retries"""
+    print("\nTesting awards and ranks...")
+    ledger = EcoPointsLedger(None)
+    ledger.award("alice", 50)
+    ledger.award("bob", 30)
+    ledger.award("carol", 50)
+    result = ledger.award("bob", 30, award_id="order-1")
+    assert result == {"customer_id": "bob", "balance": 60, "rank": 1, "applied": True}
+    assert ledger.award("bob", 30, award_id="order-1")["applied"] is False
+    assert ledger.standing("bob")["balance"] == 60
+
+    board = ledger.leaderboard(limit=3)
+    assert [(e["customer_id"], e["balance"], e["rank"]) for e in board] == [
+        ("bob", 60, 1), ("alice", 50, 2), ("carol", 50, 3)
+    ]
+    assert ledger.leaderboard(limit=2, offset=1)[0]["customer_id"] == "alice"
+
+    ledger.award("alice", -20, reason="coupon")
+    assert ledger.standing("alice") == {"customer_id": "alice", "balance": 30, "rank": 3}
+    try:
+        ledger.award("alice", -31)
+        assert False, "Overdrawn redemption should fail"
+    except ValueError:
+        pass
+    assert ledger.standing("dave") == {"customer_id": "dave", "balance": 0, "rank": None}
+    print("✓ Ranks follow balances, overdrafts rejected, retries ignored")
+
+def test_replay_from_log():
+    """A reopened ledger rebuilds balances and skips a torn final line"""
+    print("\nTesting replay from the log...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.jsonl")
+        ledger = EcoPointsLedger(path)
+        rng = random.Random(3)
+        for i in range(500):
+            ledger.award(f"c{rng.randint(0, 50)}", rng.randint(0, 50), award_id=f"a{i}")
+        expected = ledger.leaderboard(limit=100)
+        ledger.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"customer_id": "c1", "poi')
+
+        reopened = EcoPointsLedger(path)
+        assert reopened.leaderboard(limit=100) == expected
+        assert reopened.stats()["replayed"] == 500
+        assert reopened.stats()["skipped_lines"] == 1
+        assert reopened.award("c1", 5, award_id="a0")["applied"] is False
+        balance = reopened.award("c1", 5)["balance"]
+        reopened.close()
+        assert EcoPointsLedger(path).standing("c1")["balance"] == balance
+    print(f"✓ {len(expected)} customers restored")
+
+def test_process_ledger_lifecycle():
+    """The API ledger opens at the configured path on first use, not on import"""
+    print("\nTesting the process-wide ledger...")
+    default_path = eco_ledger.ECO_LEDGER_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        eco_ledger.ECO_LEDGER_PATH = os.path.join(tmp, "ledger.jsonl")
+        try:
+            close_eco_ledger()
+            ledger = get_eco_ledger()
+            assert get_eco_ledger() is ledger and ledger.path == eco_ledger.ECO_LEDGER_PATH
+            ledger.award("alice", 7)
+            close_eco_ledger()
+            assert get_eco_ledger() is not ledger
+            assert get_eco_ledger().standing("alice")["balance"] == 7
+        finally:
+            close_eco_ledger()
+            eco_ledger.ECO_LEDGER_PATH = default_path
+    print("✓ Ledger reopened from its log after close")
+
+def test_leaderboard_speed():
+    """Awards and top-N take logarithmic work with many customers"""
+    print("\nTesting leaderboard speed...")
+    ledger = EcoPointsLedger(None)
+    rng = random.Random(11)
+    start = time.perf_counter()
+    for i in range(50000):
+        ledger.award(f"c{rng.randint(0, 20000)}", rng.randint(0, 50))
+    elapsed = time.perf_counter() - start
+    award_steps = ledger.stats()["leaderboard_steps"]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        ledger.leaderboard(limit=10)
+        ledger.standing("c42")
+    query_ms = (time.perf_counter() - start) * 1000
+    query_steps = ledger.stats()["leaderboard_steps"] - award_steps
+
+    top = ledger.leaderboard(limit=10)
+    expected = sorted(ledger.balances.items(), key=lambda item: (-item[1], item[0]))[:10]
+    assert [(e["customer_id"], e["balance"]) for e in top] == expected
+    # Each award is a removal and an insertion in the skip list
+    log_n = math.log2(len(ledger.balances))
+    assert award_steps / 50000 < 6 * log_n, f"{award_steps / 50000:.0f} steps per award"
+    assert query_steps / 2000 < 3 * log_n, f"{query_steps / 2000:.0f} steps per query"
+    if BENCHMARKS:
+        assert elapsed < 10, f"50000 awards took {elapsed:.1f}s"
+    print(f"✓ 50000 awards in {elapsed:.2f}s ({award_steps / 50000:.0f} steps each), "
+          f"1000 queries in {query_ms:.1f}ms")
+
+if __name__ == "__main__":
+    print("RouteZero Eco-Points Ledger Test")
+    print("=" * 40)
+
+    try:
+        test_ranked_set_matches_sorted_list()
+        test_award_redeem_and_rank()
+        test_replay_from_log()
+        test_process_ledger_lifecycle()
+        test_leaderboard_speed()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for freight route and emissions calculations
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import numpy as np
+    from fleet_emissions import get_freight_routes, get_freight_routes_batch
+    print("✓ Successfully imported fleet_emissions")
+except ImportError as e:
+    print(f"✗ Failed to import fleet_emissions: {e}")
+    sys.exit(1)
+
+FIELDS = (
+    "distance_km", "duration_min", "emissions_grams", "freight_emission_level", "vehicle_type",
+    "recommended_mode", "emissions_saved_grams", "percent_emissions_saved", "best_emissions_grams"
+)
+
+def test_batch_matches_single_pair():
+    """Test that the vectorized batch reproduces get_freight_routes for every pair"""
+    print("\n--- Testing Batch Freight Routes ---")
+
+    rng = np.random.default_rng(11)
+    n = 500
+    sources = np.c_[rng.uniform(68, 90, n), rng.uniform(8, 30, n)]
+    destinations = np.c_[rng.uniform(68, 90, n), rng.uniform(8, 30, n)]
+    # Include identical endpoints and a mode outside the factor table
+    destinations[:5] = sources[:5]
+    modes = rng.choice(["heavy_truck", "rail_freight", "ship_barge", "hyperloop"], n)
+
+    batch = get_freight_routes_batch(sources, destinations, modes)
+    for i in range(n):
+        single = get_freight_routes(sources[i].tolist(), destinations[i].tolist(), str(modes[i]))
+        for field in FIELDS:
+            assert single[field] == batch[field][i], f"pair {i} {field}: {single[field]} != {batch[field][i]}"
+
+    assert batch["emissions_by_mode"].shape == (n, len(batch["modes"]))
+    print(f"✓ {n} pairs match the single-pair results field by field")
+
+def test_batch_validates_shapes():
+    """Test that mismatched source/destination arrays are rejected"""
+    print("\n--- Testing Batch Validation ---")
+
+    try:
+        get_freight_routes_batch([[77.6, 12.9], [72.8, 19.0]], [[72.8, 19.0]])
+        assert False, "Mismatched lengths should be rejected"
+    except ValueError:
+        pass
+    print("✓ Mismatched inputs rejected")
+
+if __name__ == "__main__":
+    print("RouteZero Fleet Emissions Test")
+    print("=" * 40)
+
+    try:
+        test_batch_matches_single_pair()
+        test_batch_validates_shapes()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for reverse-logistics pairing
+"""
+
+import sys
+import os
+import random
+import time
+import functools
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from reverse_logistics import optimize_reverse_pickup, haversine_distance, candidate_pairs
+    from spatial_index import SpatialGrid
+    from conftest import BENCHMARKS, random_points
+    print("✓ Successfully imported reverse_logistics")
+except ImportError as e:
+    print(f"✗ Failed to import reverse_logistics: {e}")
+    sys.exit(1)
+
+def _full_scan_pairs(deliveries, returns):
+    """The original greedy: every delivery against every unused return"""
+    pairs, unpaired, used_deliveries, used_returns = [], [], set(), set()
+    for delivery in deliveries:
+        if delivery["id"] in used_deliveries:
+            continue
+        best, best_distance = None, float("inf")
+        for return_item in returns:
+            if return_item["id"] in used_returns:
+                continue
+            distance = haversine_distance(delivery["lat"], delivery["lon"], return_item["lat"], return_item["lon"])
+            if distance <= 3.0 and distance < best_distance:
+                best, best_distance = return_item, distance
+        if best:
+            pairs.append((delivery["id"], best["id"], round(best_distance, 2)))
+            used_deliveries.add(delivery["id"])
+            used_returns.add(best["id"])
+        else:
+            unpaired.append(delivery)
+    return pairs, unpaired
+
+def test_matches_full_scan():
+    """Indexed pairing reproduces the full scan, including ties and duplicate ids"""
+    print("\nTesting indexed pairing against the full scan...")
+    rng = random.Random(5)
+    for trial in range(20):
+        deliveries = random_points(rng, "d", 300, 12.97, 77.59, 0.15)
+        returns = random_points(rng, "r", 200, 12.97, 77.59, 0.15)
+        # Exact ties and repeated ids
+        returns.append(dict(returns[0], id="r-tie"))
+        deliveries.append(dict(deliveries[3]))
+        returns.append(dict(returns[7], lat=returns[7]["lat"] + 0.001))
+        # A repeated id whose earlier copy has no return in reach
+        deliveries.insert(0, dict(deliveries[10], lat=13.5))
+        rng.shuffle(returns)
+
+        result = optimize_reverse_pickup(deliveries, returns)
+        got = [(p["delivery_id"], p["return_id"], p["distance_km"]) for p in result["paired_routes"]]
+        expected, unpaired = _full_scan_pairs(deliveries, returns)
+        assert got == expected, f"Mismatch in trial {trial}"
+        assert result["unpaired_deliveries"] == unpaired, f"Unpaired mismatch in trial {trial}"
+        paired = {p[1] for p in got}
+        assert result["unpaired_returns"] == [r for r in returns if r["id"] not in paired]
+    # The earlier copy of a repeated id found no return, so it stays unpaired
+    deliveries = [{"id": "d1", "lat": 13.5, "lon": 77.59}, {"id": "d1", "lat": 12.97, "lon": 77.59}]
+    result = optimize_reverse_pickup(deliveries, [{"id": "r1", "lat": 12.971, "lon": 77.59}])
+    assert result["total_pairs"] == 1
+    assert result["unpaired_deliveries"] == deliveries[:1]
+    print("✓ Identical pairs and unpaired deliveries over 20 random trials")
+
+def test_grid_wraps_and_poles():
+    """Candidates are found across the antimeridian and near the poles"""
+    print("\nTesting grid edge cases...")
+    cases = [
+        ((0.0, 179.99), (0.0, -179.995)),
+        ((89.99, 10.0), (89.99, -170.0)),
+        ((-45.0, -180.0), (-45.01, 179.99)),
+    ]
+    for (lat1, lon1), (lat2, lon2) in cases:
+        assert haversine_distance(lat1, lon1, lat2, lon2) <= 3.0
+        grid = SpatialGrid(3.0)
+        grid.insert("r", lat2, lon2)
+        assert "r" in set(grid.near(lat1, lon1)), f"Missed {(lat2, lon2)} from {(lat1, lon1)}"
+    result = optimize_reverse_pickup(
+        [{"id": "d", "lat": 0.0, "lon": 179.99}],
+        [{"id": "r", "lat": 0.0, "lon": -179.995}]
+    )
+    assert result["total_pairs"] == 1
+    print("✓ Antimeridian and polar neighbours found")
+
+def _best_matching(deliveries, returns):
+    """Exhaustive search: (most pairs, least total distance)"""
+    @functools.lru_cache(None)
+    def best(i, used):
+        if i == len(deliveries):
+            return (0, 0.0)
+        result = best(i + 1, used)
+        for j, return_item in enumerate(returns):
+            if used >> j & 1:
+                continue
+            distance = haversine_distance(deliveries[i]["lat"], deliveries[i]["lon"],
+                                          return_item["lat"], return_item["lon"])
+            if distance <= 3.0:
+                pairs, total = best(i + 1, used | 1 << j)
+                result = min(result, (pairs - 1, total + distance))
+        return result
+    pairs, total = best(0, 0)
+    return -pairs, total
+
+def test_optimal_matches_exhaustive_search():
+    """Optimal mode finds the most pairs, then the least total distance"""
+    print("\nTesting optimal mode against exhaustive search...")
+    rng = random.Random(1)
+    improved = 0
+    for trial in range(150):
+        deliveries = random_points(rng, "d", rng.randint(1, 7), 12.97, 77.59, 0.03)
+        returns = random_points(rng, "r", rng.randint(1, 7), 12.97, 77.59, 0.03)
+        result = optimize_reverse_pickup(deliveries, returns, mode="optimal")
+        pairs, total = _best_matching(deliveries, returns)
+        got = sum(haversine_distance(*p["delivery_coords"], *p["return_coords"]) for p in result["paired_routes"])
+        assert result["total_pairs"] == pairs, f"Trial {trial}: {result['total_pairs']} pairs, best is {pairs}"
+        assert abs(got - total) < 1e-9, f"Trial {trial}: {got} km, best is {total}"
+        assert result["extra_pairs"] == pairs - result["greedy_pairs"] >= 0
+        improved += result["extra_pairs"] > 0 or result["distance_saved_km"] > 0
+    print(f"✓ Optimal in 150 trials, better than greedy in {improved}")
+
+def test_optimal_ignores_input_order():
+    """Shuffling the input does not change the optimal pairing"""
+    print("\nTesting optimal mode is order independent...")
+    rng = random.Random(4)
+    deliveries = random_points(rng, "d", 400, 12.97, 77.59, 0.1)
+    returns = random_points(rng, "r", 300, 12.97, 77.59, 0.1)
+    first = optimize_reverse_pickup(deliveries, returns, mode="optimal")
+    rng.shuffle(deliveries)
+    rng.shuffle(returns)
+    second = optimize_reverse_pickup(deliveries, returns, mode="optimal")
+    assert first["total_pairs"] == second["total_pairs"]
+    assert first["total_distance_km"] == second["total_distance_km"]
+    try:
+        optimize_reverse_pickup(deliveries, returns, mode="fastest")
+        assert False, "Unknown mode should fail"
+    except ValueError:
+        pass
+    print(f"✓ {first['total_pairs']} pairs, {first['total_distance_km']} km either way")
+
+def test_city_scale():
+    """20k deliveries and 5k returns pair quickly"""
+    print("\nTesting city-scale input...")
+    rng = random.Random(9)
+    deliveries = random_points(rng, "d", 20000, 19.07, 72.88, 0.25)
+    returns = random_points(rng, "r", 5000, 19.07, 72.88, 0.25)
+    start = time.perf_counter()
+    result = optimize_reverse_pickup(deliveries, returns)
+    elapsed = time.perf_counter() - start
+    assert result["total_pairs"] > 4000
+    # The grid keeps distance checks to nearby pairs, not all 100M
+    checked = len(candidate_pairs(deliveries, returns)[0])
+    assert checked < 0.02 * len(deliveries) * len(returns), f"{checked} candidate pairs"
+    if BENCHMARKS:
+        assert elapsed < 10, f"Pairing took {elapsed:.1f}s"
+    print(f"✓ {result['total_pairs']} pairs from {checked} candidates in {elapsed:.2f}s")
+
+    start = time.perf_counter()
+    optimal = optimize_reverse_pickup(deliveries, returns, mode="optimal")
+    elapsed = time.perf_counter() - start
+    assert optimal["total_pairs"] >= result["total_pairs"]
+    assert optimal["total_distance_km"] <= result["total_distance_km"] or optimal["extra_pairs"] > 0
+    if BENCHMARKS:
+        assert elapsed < 30, f"Optimal pairing took {elapsed:.1f}s"
+    print(f"✓ Optimal: {optimal['extra_pairs']} extra pairs, {optimal['distance_saved_km']} km saved in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    print("RouteZero Reverse Logistics Test")
+    print("=" * 40)
+
+    try:
+        test_matches_full_scan()
+        test_grid_wraps_and_poles()
+        test_optimal_matches_exhaustive_search()
+        test_optimal_ignores_input_order()
+        test_city_scale()
+
+        print("\n" + "=" * 40)
+        print("✓ All tests completed successfully!")
+
+    except Exception as e:
+        print(f"\n✗ Test failed with error: {e}")
+        sys.exit(1)